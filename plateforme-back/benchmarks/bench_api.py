@@ -0,0 +1,212 @@
+"""Charge HTTP de l'API complète (`main.app`) sur un jeu de données synthétique.
+
+Le serveur uvicorn tourne dans un thread du processus (sa propre boucle asyncio) pour que
+les requêtes SQL émises par scénario soient comptées via les évènements du moteur ; les
+clients httpx tournent dans la boucle principale. Client et serveur partagent donc le GIL :
+comparer des commits entre eux, pas avec un déploiement réel.
+
+Usage :
+    python -m benchmarks.bench_api [--scale 1] [--scenarios me_hot_loop list_executions ...]
+                                   [--requests 1000] [--concurrency 32] [--output rapport.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("api")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+from db.database import async_engine, engine  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_):
+        self.count += 1
+
+
+# ================= SCÉNARIOS =================
+# Chaque scénario renvoie (méthode, url, kwargs httpx) pour la i-ème requête.
+def sign_in_storm(ctx, i):
+    user = ctx["users"][i % len(ctx["users"])]
+    return "POST", "/auth/sign_in", {"data": {"username": user["email"], "password": ctx["password"]}}
+
+
+def me_hot_loop(ctx, i):
+    return "GET", "/auth/me", {"headers": ctx["auth"][i % len(ctx["auth"])]}
+
+
+def project_tree(ctx, i):
+    projet_id = ctx["projet_ids"][i % len(ctx["projet_ids"])]
+    return "GET", f"/projets/{projet_id}/tree", {"headers": ctx["auth"][0]}
+
+
+def list_executions(ctx, i):
+    params = {"limit": 50}
+    if i % 2:
+        params["test_id"] = ctx["test_ids"][i % len(ctx["test_ids"])]
+    return "GET", "/executions", {"headers": ctx["auth"][0], "params": params}
+
+
+def list_anomalies(ctx, i):
+    return "GET", "/anomalies", {"headers": ctx["auth"][0], "params": {"limit": 50}}
+
+
+def bulk_ingest(ctx, i):
+    test_ids = ctx["test_ids"]
+    items = [
+        {"test_id": test_ids[(i * 100 + k) % len(test_ids)], "statut": "FAILED" if k % 9 == 0 else "PASSED",
+         "dureeExecution": k, "resultat": {"statut": "PASSED", "logs": f"bench {i}.{k}"}}
+        for k in range(ctx["bulk_size"])
+    ]
+    return "POST", "/executions/bulk", {"headers": ctx["auth"][0], "json": items}
+
+
+def unread_count(ctx, i):
+    return "GET", "/notifications/unread-count", {"headers": ctx["auth"][i % len(ctx["auth"])]}
+
+
+SCENARIOS = {
+    "sign_in_storm": sign_in_storm,
+    "me_hot_loop": me_hot_loop,
+    "project_tree": project_tree,
+    "list_executions": list_executions,
+    "list_anomalies": list_anomalies,
+    "bulk_ingest": bulk_ingest,
+    "unread_count": unread_count,
+}
+
+# La connexion est dominée par bcrypt : moins de requêtes par défaut
+DEFAULT_REQUESTS = {"sign_in_storm": 200, "bulk_ingest": 100}
+
+
+# ================= SERVEUR =================
+def start_server(port: int) -> tuple[uvicorn.Server, threading.Thread]:
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", backlog=2048))
+    thread = threading.Thread(target=server.run, name="bench-api-server", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, ctx: dict, requests: int, concurrency: int,
+                       counter: QueryCounter) -> dict:
+    build = SCENARIOS[name]
+    latencies, statuses = [], {}
+    indexes = itertools.count()
+
+    async def worker():
+        while (i := next(indexes)) < requests:
+            method, url, kwargs = build(ctx, i)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    queries_before = counter.count
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    queries = counter.count - queries_before
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "req_per_s": round(requests / elapsed, 1),
+        "latency_ms": {k: round(v * 1000, 2) for k, v in percentiles(latencies).items()},
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": sum(v for k, v in statuses.items() if k >= 400),
+        "db_queries": queries,
+        "db_queries_per_request": round(queries / requests, 2),
+    }
+
+
+async def run(args, ctx: dict, counter: QueryCounter) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        # Un jeton par utilisateur (au plus 50), obtenu par la vraie route de connexion
+        ctx["auth"] = []
+        for user in ctx["users"][:50]:
+            response = await client.post("/auth/sign_in", data={"username": user["email"], "password": ctx["password"]})
+            response.raise_for_status()
+            ctx["auth"].append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+        results = {}
+        for name in args.scenarios:
+            requests = args.requests or DEFAULT_REQUESTS.get(name, 1000)
+            if args.warmup:
+                await run_scenario(client, name, ctx, min(args.warmup, requests), args.concurrency, counter)
+            results[name] = await run_scenario(client, name, ctx, requests, args.concurrency, counter)
+        return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="facteur appliqué à la taille par défaut du jeu")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=None, help="requêtes par scénario (défaut : 1000)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default=None, help="fichier JSON de sortie (en plus de stdout)")
+    args = parser.parse_args()
+
+    reset_schema()
+    seed_start = time.perf_counter()
+    dataset = seed_dataset(engine, DatasetSize().scaled(args.scale))
+    seed_seconds = time.perf_counter() - seed_start
+    ctx = {**dataset, "bulk_size": args.bulk_size}
+
+    counter = QueryCounter()
+    server, thread = start_server(args.port)
+    try:
+        results = asyncio.run(run(args, ctx, counter))
+    finally:
+        server.should_exit = True
+        thread.join(10)
+
+    report = {
+        "revision": git_revision(),
+        "database": engine.url.get_backend_name(),
+        "dataset": {"scale": args.scale, "seed_seconds": round(seed_seconds, 2), **dataset["counts"]},
+        "scenarios": results,
+    }
+    emit(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    sys.exit(1 if any(r["errors"] for r in results.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Regroupement des échecs (services/clusters_echec.py) : débit, latence et qualité.
+
+Les messages d'échec de la base seedée sont remplacés par des messages synthétiques issus de
+--families gabarits (exceptions, timeouts, connexions refusées...) dont les parties variables
+(identifiants, horodatages, chemins, adresses, durées) changent à chaque occurrence, avec
+parfois un contexte ajouté en fin de message. Mesures :
+- rattrapage complet (`backfill`) : résultats par seconde ;
+- recherche dans l'index chaud : latence par message en microsecondes ;
+- qualité : pureté (part des résultats dont le cluster est dominé par leur famille) et
+  fragmentation (clusters par famille, 1 idéalement).
+
+Usage : python -m benchmarks.bench_clusters [--scale 1] [--families 40] [--queries 20000]
+"""
+import argparse
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from sqlalchemy import bindparam, select, update
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("clusters")
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+from db.database import engine  # noqa: E402
+from models.execution import ResultatTest  # noqa: E402
+from services.clusters_echec import backfill, failure_index, fingerprint, minhash, normalize  # noqa: E402
+
+SUJETS = ["commande", "panier", "facture", "utilisateur", "session", "paiement", "stock", "livraison",
+          "catalogue", "remise", "compte", "adresse", "notification", "export", "import", "rapport"]
+GABARITS = [
+    "AssertionError: expected status 200 but got {code} for /api/{sujet}/{id} at {ts}",
+    "TimeoutError: {sujet} service did not respond after {ms} ms (request {uuid})",
+    "ConnectionRefusedError: [Errno 111] could not connect to {sujet}-db on 10.0.{a}.{b}:5432",
+    "KeyError: '{sujet}_id' in /home/ci/build-{id}/src/{sujet}/handlers.py line {line}",
+    "NullPointerException at com.app.{sujet}.Service.process(Service.java:{line}) object 0x{addr}",
+    "ElementNotInteractable: bouton #{sujet}-valider masqué par la bannière cookies après {ms} ms",
+    "ValueError: montant négatif {amount} pour {sujet} {uuid} le {date}",
+]
+
+
+def families(count: int, rng: random.Random) -> list[str]:
+    """Couples (gabarit, sujet) distincts : deux familles ne diffèrent parfois que d'un mot."""
+    pairs = [(gabarit, sujet) for gabarit in GABARITS for sujet in SUJETS]
+    return [gabarit.replace("{sujet}", sujet) for gabarit, sujet in rng.sample(pairs, min(count, len(pairs)))]
+
+
+CONTEXTES = ["", "", "", " (retry)", " during teardown", " in fixture setup"]
+
+
+def message(template: str, rng: random.Random) -> str:
+    """Une occurrence : parties variables tirées au hasard, parfois un contexte ajouté (quasi-doublon)."""
+    return template.format(
+        code=rng.choice([400, 404, 500, 502, 503]), id=rng.randrange(10**6), ts=f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T0{rng.randint(0, 9)}:1{rng.randint(0, 9)}:00Z",
+        ms=rng.randrange(100, 60000), uuid=uuid.UUID(int=rng.getrandbits(128)), a=rng.randrange(256),
+        b=rng.randrange(256), line=rng.randrange(1, 900), addr=f"{rng.getrandbits(48):x}",
+        amount=-rng.randrange(1, 10**5) / 100, date=f"{rng.randint(1, 28)}/0{rng.randint(1, 9)}/2024",
+    ) + rng.choice(CONTEXTES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--families", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    reset_schema()
+    dataset = seed_dataset(engine, DatasetSize().scaled(args.scale))
+    rng = random.Random(7)
+    templates = families(args.families, rng)
+
+    # Messages synthétiques sur les échecs seedés, famille connue par résultat
+    family_of = {}
+    with engine.begin() as connection:
+        failed_ids = connection.scalars(
+            select(ResultatTest.id).where(ResultatTest.messageErreur.is_not(None)).order_by(ResultatTest.id)
+        ).all()
+        rows = []
+        for resultat_id in failed_ids:
+            family_of[resultat_id] = rng.randrange(len(templates))
+            rows.append({"rid": resultat_id, "message": message(templates[family_of[resultat_id]], rng)})
+        connection.execute(
+            update(ResultatTest.__table__).where(ResultatTest.__table__.c.id == bindparam("rid"))
+            .values(messageErreur=bindparam("message")),
+            rows,
+        )
+
+    failure_index.clear()
+    start = time.perf_counter()
+    summary = backfill(engine)
+    backfill_seconds = time.perf_counter() - start
+
+    with engine.connect() as connection:
+        assigned = dict(connection.execute(
+            select(ResultatTest.id, ResultatTest.clusterEchecId).where(ResultatTest.clusterEchecId.is_not(None))
+        ).all())
+    members = defaultdict(Counter)
+    for resultat_id, cluster_id in assigned.items():
+        members[cluster_id][family_of[resultat_id]] += 1
+    pure = sum(counter.most_common(1)[0][1] for counter in members.values())
+    clusters_per_family = Counter(family for counter in members.values() for family in counter)
+
+    # Latence d'une recherche (normalisation + signature + index) sur l'index chaud
+    latencies = []
+    for _ in range(args.queries):
+        text = message(templates[rng.randrange(len(templates))], rng)
+        start = time.perf_counter()
+        normalized = normalize(text)
+        failure_index.query(minhash(normalized), fingerprint(normalized))
+        latencies.append(time.perf_counter() - start)
+
+    emit({
+        "dataset": dataset["counts"],
+        "families": len(templates),
+        "backfill": {
+            "resultats": summary["resultats"],
+            "seconds": round(backfill_seconds, 3),
+            "resultats_per_s": round(summary["resultats"] / backfill_seconds) if backfill_seconds else None,
+        },
+        "quality": {
+            "clusters": len(members),
+            "purete": round(pure / len(assigned), 4) if assigned else None,
+            "clusters_par_famille": round(sum(clusters_per_family.values()) / len(clusters_per_family), 2)
+            if clusters_per_family else None,
+        },
+        "query_us": {k: round(v * 1e6, 1) for k, v in percentiles(latencies).items()},
+        "index": failure_index.stats(),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Tableau de bord de sprint (services/tableau_bord.py) : calcul, instantané, 304.
+
+Pour chaque sprint de la base seedée, trois façons de servir la même vue via l'API :
+- calcul complet à chaque requête (instantané invalidé avant chaque appel) ;
+- instantané à jour, contenu renvoyé (200) ;
+- revalidation avec If-None-Match (304, sans contenu).
+Latences en millisecondes et nombre de requêtes SQL par appel.
+
+Usage : python -m benchmarks.bench_dashboard [--scale 1] [--requests 300]
+"""
+import argparse
+import time
+
+from sqlalchemy import event, update
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("dashboard")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.dataset import PASSWORD, DatasetSize, seed_dataset  # noqa: E402
+from db.database import async_engine, engine  # noqa: E402
+from models import TableauDeBordSprint  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    reset_schema()
+    dataset = seed_dataset(engine, DatasetSize().scaled(args.scale))
+    from main import app
+
+    queries = [0]
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *_: queries.__setitem__(0, queries[0] + 1))
+
+    report = {"dataset": dataset["counts"]}
+    with TestClient(app) as client:
+        token = client.post("/auth/sign_in", data={"username": dataset["users"][0]["email"],
+                                                   "password": PASSWORD}).json()["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        sprint_ids = dataset["sprint_ids"]
+        etags = {}
+
+        def run(name, prepare=None, conditional=False):
+            samples, counts, statuses = [], [], set()
+            for i in range(args.requests):
+                sprint_id = sprint_ids[i % len(sprint_ids)]
+                if prepare:
+                    prepare(sprint_id)
+                headers = {**auth, "If-None-Match": etags[sprint_id]} if conditional else auth
+                queries[0] = 0
+                start = time.perf_counter()
+                response = client.get(f"/dashboard/sprints/{sprint_id}", headers=headers)
+                samples.append(time.perf_counter() - start)
+                counts.append(queries[0])
+                statuses.add(response.status_code)
+                etags[sprint_id] = response.headers["etag"]
+            report[name] = {"statuts": sorted(statuses), "requetes_sql": round(sum(counts) / len(counts), 1),
+                            **{k: round(v * 1000, 2) for k, v in percentiles(samples).items()}}
+
+        def invalidate(sprint_id):
+            with engine.begin() as connection:
+                connection.execute(update(TableauDeBordSprint).where(TableauDeBordSprint.sprintId == sprint_id)
+                                   .values(generation=TableauDeBordSprint.generation + 1))
+
+        run("calcul_complet", prepare=invalidate)
+        run("instantane_200")
+        run("revalidation_304", conditional=True)
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
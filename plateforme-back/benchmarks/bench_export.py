@@ -0,0 +1,141 @@
+"""Export en flux (services/export.py) : débit et mémoire sur un gros volume.
+
+--rows exécutions synthétiques (10 millions par défaut), chacune avec son résultat ; une sur
+cinq échoue, avec message d'erreur, et une anomalie est rattachée à un échec sur quatre. Les
+lignes sont générées côté base (CTE récursive) par lots de --batch. Mesures, par format
+disponible (Parquet seulement si pyarrow est installé) :
+- lignes par seconde et octets produits (sortie jetée au fil de l'eau) ;
+- mémoire résidente du processus, échantillonnée pendant l'export : au départ, au pic.
+À titre de comparaison, chargement complet (`.all()`) des --baseline-rows premières lignes,
+ce que ferait un export naïf ; à lancer en dernier, la mémoire n'étant pas rendue au système.
+
+Usage : python -m benchmarks.bench_export [--rows 10000000] [--batch 1000000] [--baseline-rows 1000000]
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, literal, select
+
+from benchmarks.common import emit, reset_schema, use_database
+
+use_database("export")
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+from db.database import engine  # noqa: E402
+from models import Anomalie, ExecutionTest, ResultatTest  # noqa: E402
+from services.export import EXPORT_CHUNK_SIZE, FORMATS, export_query, stream_export  # noqa: E402
+
+
+def rss_mb() -> float | None:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:  # hors Linux
+        return None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_mb = rss_mb()
+        self.peak_mb = self.start_mb
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            current = rss_mb()
+            if current is not None:
+                self.peak_mb = max(self.peak_mb, current)
+
+    def stop(self) -> dict:
+        self.done.set()
+        self.join()
+        if self.start_mb is None:
+            return {}
+        return {"rss_debut_mo": round(self.start_mb, 1), "rss_pic_mo": round(self.peak_mb, 1),
+                "croissance_mo": round(self.peak_mb - self.start_mb, 1)}
+
+
+def generate(rows: int, batch: int, test_ids: list[int], user_ids: list[int]):
+    first_test, first_user = min(test_ids), min(user_ids)
+    when = datetime(2024, 1, 1)
+    for offset in range(0, rows, batch):
+        count = min(batch, rows - offset)
+        numbers = select(literal(1).label("n")).cte("numbers", recursive=True)
+        numbers = numbers.union_all(select(numbers.c.n + 1).where(numbers.c.n < count))
+        failed = (numbers.c.n % 5) == 0
+        with engine.begin() as connection:
+            start_execution = connection.scalar(select(func.coalesce(func.max(ExecutionTest.id), 0)))
+            connection.execute(insert(ExecutionTest).from_select(
+                ["test_id", "executeurId", "statut", "dureeExecution", "dateExecution"],
+                select(first_test + numbers.c.n % len(test_ids), first_user + numbers.c.n % len(user_ids),
+                       case((failed, "FAILED"), else_="PASSED"), numbers.c.n % 120, literal(when)),
+            ))
+            start_resultat = connection.scalar(select(func.coalesce(func.max(ResultatTest.id), 0)))
+            connection.execute(insert(ResultatTest).from_select(
+                ["execution_id", "statut", "messageErreur"],
+                select(ExecutionTest.id, ExecutionTest.statut,
+                       case((ExecutionTest.statut == "FAILED",
+                             literal("AssertionError: attendu 200, obtenu 500 sur /api/commande")), else_=None))
+                .where(ExecutionTest.id > start_execution),
+            ))
+            connection.execute(insert(Anomalie).from_select(
+                ["resultat_id", "titre", "severite", "statut", "dateCreation"],
+                select(ResultatTest.id, literal("Erreur 500 sur commande"), literal("MAJEURE"),
+                       literal("OUVERTE"), literal(when))
+                .where(ResultatTest.id > start_resultat, ResultatTest.statut == "FAILED",
+                       ResultatTest.id % 4 == 0),
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("--baseline-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    reset_schema()
+    dataset = seed_dataset(engine, DatasetSize().scaled(0.1))
+    start = time.perf_counter()
+    generate(args.rows, args.batch, dataset["test_ids"], [user["id"] for user in dataset["users"]])
+    report = {"generation_s": round(time.perf_counter() - start, 1), "chunk": args.chunk}
+    with engine.connect() as connection:
+        report["executions"] = connection.scalar(select(func.count(ExecutionTest.id)))
+        report["anomalies"] = connection.scalar(select(func.count(Anomalie.id)))
+
+    query = export_query()
+    for format_ in FORMATS:
+        sampler = RssSampler()
+        sampler.start()
+        written, lines = 0, 0
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            for data in stream_export(connection, query, format_, args.chunk):
+                written += len(data)
+                if format_ != "parquet":
+                    lines += data.count(b"\n")
+        elapsed = time.perf_counter() - start
+        lines -= 1 if format_ == "csv" else 0  # en-tête
+        report[format_] = {"secondes": round(elapsed, 1), "octets": written,
+                           **({"lignes": lines, "lignes_par_s": round(lines / elapsed)} if lines else {}),
+                           **sampler.stop()}
+
+    if args.baseline_rows:
+        sampler = RssSampler()
+        sampler.start()
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            rows = connection.execute(query.limit(args.baseline_rows)).all()
+        report["chargement_complet"] = {"lignes": len(rows), "secondes": round(time.perf_counter() - start, 1),
+                                        **sampler.stop()}
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
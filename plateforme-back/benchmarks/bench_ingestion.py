@@ -0,0 +1,82 @@
+"""Ingestion CI : débit ensembliste (ingest_chunk) vs. db.add objet par objet.
+
+Usage : python -m benchmarks.bench_ingestion [--rows 20000] [--chunk 1000]
+"""
+import argparse
+import time
+
+from benchmarks.common import emit, reset_schema, use_database
+
+use_database("ingestion")
+
+from db.database import SessionLocal  # noqa: E402
+from models import ExecutionTest, ResultatTest, TestAutomatise  # noqa: E402
+from services.ingestion import ingest_chunk  # noqa: E402
+
+
+def make_items(rows: int, test_ids: list[int]) -> list[dict]:
+    return [
+        {
+            "test_id": test_ids[i % len(test_ids)],
+            "statut": "FAILED" if i % 7 == 0 else "PASSED",
+            "dureeExecution": i % 120,
+            "dateExecution": None,
+            "executeurId": None,
+            "resultat": {
+                "statut": "FAILED" if i % 7 == 0 else "PASSED",
+                "messageErreur": "AssertionError" if i % 7 == 0 else None,
+                "logs": f"run {i}",
+                "captureEcran": None,
+                "commentaire": None,
+            },
+        }
+        for i in range(rows)
+    ]
+
+
+def naive(items: list[dict], chunk: int) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        for offset in range(0, len(items), chunk):
+            for item in items[offset:offset + chunk]:
+                execution = ExecutionTest(
+                    test_id=item["test_id"], statut=item["statut"], dureeExecution=item["dureeExecution"]
+                )
+                execution.resultat = ResultatTest(**item["resultat"])
+                db.add(execution)
+            db.commit()
+    return time.perf_counter() - start
+
+
+def bulk(items: list[dict], chunk: int) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        for offset in range(0, len(items), chunk):
+            ingest_chunk(db, list(enumerate(items[offset:offset + chunk], start=offset)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--chunk", type=int, default=1000)
+    args = parser.parse_args()
+
+    report = {"rows": args.rows, "chunk": args.chunk}
+    for name, runner in (("naive_db_add", naive), ("bulk_ingest", bulk)):
+        reset_schema()
+        with SessionLocal() as db:
+            tests = [TestAutomatise(nom=f"test {i}") for i in range(50)]
+            db.add_all(tests)
+            db.commit()
+            test_ids = [t.id for t in tests]
+        seconds = runner(make_items(args.rows, test_ids), args.chunk)
+        # Chaque élément insère une exécution et un résultat
+        report[name] = {"seconds": round(seconds, 3), "rows_per_second": round(2 * args.rows / seconds)}
+
+    report["speedup"] = round(report["naive_db_add"]["seconds"] / report["bulk_ingest"]["seconds"], 2)
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
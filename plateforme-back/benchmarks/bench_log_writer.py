@@ -0,0 +1,77 @@
+"""Coût côté handler d'une ligne d'audit : INSERT + commit synchrone vs. enqueue.
+
+Usage : python -m benchmarks.bench_log_writer [--rows 20000]
+"""
+import argparse
+import time
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("log_writer")
+
+from db.database import engine  # noqa: E402
+from models import AuditLog  # noqa: E402
+from services.log_writer import BufferedLogWriter  # noqa: E402
+
+
+def row(i: int) -> dict:
+    return {"action": "UPDATE", "entityType": "Test", "entityId": i, "changes": '{"statut": "PASSED"}'}
+
+
+def synchronous(rows: int) -> list[float]:
+    latencies = []
+    for i in range(rows):
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            connection.execute(insert(AuditLog.__table__), row(i))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def buffered(rows: int) -> tuple[list[float], dict, float]:
+    writer = BufferedLogWriter(engine, maxsize=rows)
+    writer.start()
+    latencies = []
+    for i in range(rows):
+        start = time.perf_counter()
+        writer.audit(**row(i))
+        latencies.append(time.perf_counter() - start)
+    drain_start = time.perf_counter()
+    writer.stop()
+    return latencies, writer.metrics(), time.perf_counter() - drain_start
+
+
+def summary(latencies: list[float]) -> dict:
+    return {
+        "total_seconds": round(sum(latencies), 3),
+        **{k: round(v * 1e6, 1) for k, v in percentiles(latencies).items()},
+        "unit": "µs",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    reset_schema()
+    sync_latencies = synchronous(args.rows)
+    reset_schema()
+    buffered_latencies, metrics, drain = buffered(args.rows)
+    with engine.connect() as connection:
+        written = connection.scalar(select(func.count()).select_from(AuditLog.__table__))
+
+    emit({
+        "rows": args.rows,
+        "synchronous_commit": summary(sync_latencies),
+        "buffered_enqueue": summary(buffered_latencies),
+        "buffered_drain_seconds": round(drain, 3),
+        "buffered_rows_written": written,
+        "writer_metrics": metrics,
+    })
+
+
+if __name__ == "__main__":
+    main()
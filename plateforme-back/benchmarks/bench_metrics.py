@@ -0,0 +1,106 @@
+"""Surcoût de l'instrumentation /metrics : middleware ASGI, hooks SQL, rendu du scrape.
+
+Les requêtes sont envoyées directement à l'application ASGI (sans réseau ni client HTTP)
+pour isoler le coût du middleware ; les hooks SQL sont mesurés sur SQLite en mémoire,
+le pire cas relatif puisque la requête elle-même y est quasi gratuite.
+
+Usage : python -m benchmarks.bench_metrics [--requests 20000] [--queries 50000]
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from benchmarks.common import emit
+from services.metrics import MetricsMiddleware, http_latency, instrument_engine, registry
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i):
+        path = f"/items/{i}"
+        return {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+                "headers": [], "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 80)}
+
+    for i in range(200):  # chauffe (construction de la pile de middlewares)
+        await app(scope(i), receive, send)
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def sql_seconds(instrumented: bool, queries: int) -> float:
+    engine = create_engine("sqlite://")
+    if instrumented:
+        instrument_engine(engine, f"bench-{id(engine)}")
+    with engine.connect() as connection:
+        statement = text("SELECT 1")
+        for _ in range(200):
+            connection.execute(statement)
+        start = time.perf_counter()
+        for _ in range(queries):
+            connection.execute(statement)
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed / queries
+
+
+def render_seconds(series: int, repeat: int = 50) -> float:
+    for i in range(series):
+        http_latency.observe(("GET", f"/bench/route/{i}"), 0.01 * (i % 7))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        registry.render()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50000)
+    parser.add_argument("--series", type=int, default=200, help="séries de latence pour le rendu du scrape")
+    args = parser.parse_args()
+
+    bare = asyncio.run(drive(make_app(False), args.requests))
+    instrumented = asyncio.run(drive(make_app(True), args.requests))
+    sql_bare = sql_seconds(False, args.queries)
+    sql_instrumented = sql_seconds(True, args.queries)
+
+    emit({
+        "http": {
+            "bare_us": round(bare * 1e6, 2),
+            "instrumented_us": round(instrumented * 1e6, 2),
+            "overhead_us": round((instrumented - bare) * 1e6, 2),
+        },
+        "sql": {
+            "bare_us": round(sql_bare * 1e6, 2),
+            "instrumented_us": round(sql_instrumented * 1e6, 2),
+            "overhead_us": round((sql_instrumented - sql_bare) * 1e6, 2),
+        },
+        "scrape_render_ms": round(render_seconds(args.series) * 1000, 3),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Charge SSE : N clients connectés à /notifications/stream sur un seul worker uvicorn.
+
+Chaque tour diffuse une notification à tous les clients (fan_out + commit depuis un
+thread, comme une route synchrone ou un job) et mesure le délai commit → réception.
+Le serveur et les clients tournent dans le même processus : le RSS rapporté couvre
+les deux.
+
+Usage : python -m benchmarks.bench_notifications [--clients 2000] [--rounds 5] [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+from datetime import timedelta
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("notifications")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from db.database import SessionLocal  # noqa: E402
+from models import Utilisateur  # noqa: E402
+from routes.auth import create_access_token  # noqa: E402
+from services.notifications import fan_out, notification_hub  # noqa: E402
+
+
+def seed(clients: int) -> list[int]:
+    with SessionLocal() as db:
+        db.execute(insert(Utilisateur), [
+            {"nom": f"client {i}", "email": f"client{i}@bench.local", "motDePasse": "-"} for i in range(clients)
+        ])
+        db.commit()
+        return list(db.scalars(select(Utilisateur.id).order_by(Utilisateur.id)))
+
+
+def send_round(user_ids: list[int], round_no: int) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        fan_out(db, user_ids, f"Tour {round_no}")
+        db.commit()
+    return time.perf_counter() - start
+
+
+class Receiver:
+    def __init__(self, clients: int, rounds: int):
+        self.ready = 0
+        self.all_ready = asyncio.Event()
+        self.clients = clients
+        self.received = [0] * rounds
+        self.round_done = [asyncio.Event() for _ in range(rounds)]
+        self.sent_at = [0.0] * rounds
+        self.latencies: list[float] = []
+
+    async def listen(self, client: httpx.AsyncClient, url: str, token: str):
+        async with client.stream("GET", url, params={"access_token": token}) as response:
+            kind = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    kind = line[7:]
+                elif line.startswith("data: ") and kind == "unread" and not self.all_ready.is_set():
+                    self.ready += 1
+                    if self.ready == self.clients:
+                        self.all_ready.set()
+                elif line.startswith("data: ") and kind == "notification":
+                    round_no = int(json.loads(line[6:])["titre"].split()[-1])
+                    self.latencies.append(time.perf_counter() - self.sent_at[round_no])
+                    self.received[round_no] += 1
+                    if self.received[round_no] == self.clients:
+                        self.round_done[round_no].set()
+
+
+async def run(args) -> dict:
+    from main import app  # application complète : routes et hooks de session
+
+    user_ids = seed(args.clients)
+    tokens = [create_access_token(user_id, timedelta(hours=1)) for user_id in user_ids]
+
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning", backlog=args.clients))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    receiver = Receiver(args.clients, args.rounds)
+    limits = httpx.Limits(max_connections=args.clients + 10, max_keepalive_connections=args.clients + 10)
+    url = f"http://127.0.0.1:{args.port}/notifications/stream"
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        connect_start = time.perf_counter()
+        listeners = [asyncio.create_task(receiver.listen(client, url, token)) for token in tokens]
+        await asyncio.wait_for(receiver.all_ready.wait(), args.timeout)
+        connect_seconds = time.perf_counter() - connect_start
+        connected = notification_hub.stats()["connections"]
+        rss_connected = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        fan_out_seconds = []
+        for round_no in range(args.rounds):
+            receiver.sent_at[round_no] = time.perf_counter()
+            fan_out_seconds.append(await asyncio.to_thread(send_round, user_ids, round_no))
+            await asyncio.wait_for(receiver.round_done[round_no].wait(), args.timeout)
+
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    server.should_exit = True
+    await server_task
+
+    return {
+        "clients": args.clients,
+        "connected": connected,
+        "connect_seconds": round(connect_seconds, 3),
+        "rounds": args.rounds,
+        "fan_out_commit_ms": {k: round(v * 1000, 2) for k, v in percentiles(fan_out_seconds).items()},
+        "delivery_latency_ms": {k: round(v * 1000, 2) for k, v in percentiles(receiver.latencies).items()},
+        "delivered": len(receiver.latencies),
+        "rss_mb": {"before": rss_before // 1024, "connected": rss_connected // 1024},
+        "hub": notification_hub.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    reset_schema()
+    emit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
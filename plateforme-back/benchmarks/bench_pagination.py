@@ -0,0 +1,81 @@
+"""Latence d'une page selon sa profondeur : OFFSET vs. curseur keyset.
+
+Usage : python -m benchmarks.bench_pagination [--rows 200000] [--page-size 50]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import emit, reset_schema, use_database
+
+use_database("pagination")
+
+from db.database import SessionLocal  # noqa: E402
+from db.pagination import apply_keyset, encode_cursor  # noqa: E402
+from models import ExecutionTest, TestAutomatise  # noqa: E402
+
+
+def seed(rows: int):
+    with SessionLocal() as db:
+        test = TestAutomatise(nom="bench")
+        db.add(test)
+        db.flush()
+        start = datetime(2025, 1, 1)
+        batch = 10000
+        for offset in range(0, rows, batch):
+            db.execute(insert(ExecutionTest), [
+                # Plusieurs lignes partagent le même horodatage : le départage se fait sur l'id
+                {"test_id": test.id, "statut": "PASSED", "dureeExecution": i % 60,
+                 "dateExecution": start + timedelta(seconds=i // 3)}
+                for i in range(offset, min(rows, offset + batch))
+            ])
+        db.commit()
+
+
+def timed(db, query, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(query).all()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reset_schema()
+    seed(args.rows)
+
+    base = select(ExecutionTest.id, ExecutionTest.dateExecution, ExecutionTest.statut)
+    ordered = base.order_by(ExecutionTest.dateExecution.desc(), ExecutionTest.id.desc())
+    depths = [d for d in (0, 1000, 10000, 50000, 100000, args.rows - 2 * args.page_size) if 0 <= d < args.rows]
+
+    results = []
+    with SessionLocal() as db:
+        for depth in sorted(set(depths)):
+            cursor = None
+            if depth:
+                # Clé de la dernière ligne de la page précédente (ce que renverrait l'API)
+                row = db.execute(ordered.offset(depth - 1).limit(1)).one()
+                cursor = encode_cursor(row.dateExecution, row.id)
+            offset_query = ordered.offset(depth).limit(args.page_size)
+            keyset_query = apply_keyset(base, ExecutionTest.dateExecution, ExecutionTest.id, cursor, args.page_size)
+            assert [r.id for r in db.execute(offset_query)] == [r.id for r in db.execute(keyset_query)][:args.page_size]
+            results.append({
+                "depth": depth,
+                "offset_ms": round(timed(db, offset_query, args.repeat), 3),
+                "keyset_ms": round(timed(db, keyset_query, args.repeat), 3),
+            })
+
+    emit({"rows": args.rows, "page_size": args.page_size, "results": results})
+
+
+if __name__ == "__main__":
+    main()
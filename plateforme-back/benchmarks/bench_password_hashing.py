@@ -0,0 +1,92 @@
+"""Débit de connexion (bcrypt verify) selon le nombre de workers du PasswordHasher.
+
+Usage : python -m benchmarks.bench_password_hashing [--logins 200] [--max-workers N]
+
+Pour chaque taille de pool, lance `--logins` vérifications concurrentes et mesure
+le débit ainsi que la latence maximale de la boucle d'événements pendant la rafale
+(un ticker à 10 ms doit continuer à tourner si le hachage est bien hors boucle).
+Mesure aussi le temps de réponse d'un rejet quand la file est pleine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from services.password_hashing import HasherSaturated, PasswordHasher, bcrypt_context
+
+
+async def _loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_storm(workers: int, logins: int, kind: str, hashed: str) -> dict:
+    hasher = PasswordHasher(workers=workers, queue_size=logins, kind=kind)
+    # Préchauffe le pool pour ne pas mesurer la création des workers
+    await asyncio.gather(*(hasher.verify("motdepasse", hashed) for _ in range(workers)))
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_loop_lag(stop))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(hasher.verify("motdepasse", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag = await ticker
+    hasher.shutdown()
+
+    assert all(results)
+    return {
+        "workers": workers,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 1),
+        "max_event_loop_lag_ms": round(lag * 1000, 2),
+    }
+
+
+async def run_rejection(hashed: str, burst: int) -> dict:
+    hasher = PasswordHasher(workers=1, queue_size=0)
+    first = asyncio.ensure_future(hasher.verify("motdepasse", hashed))
+    await asyncio.sleep(0)
+    latencies = []
+    for _ in range(burst):
+        start = time.perf_counter()
+        try:
+            await hasher.verify("motdepasse", hashed)
+        except HasherSaturated:
+            latencies.append(time.perf_counter() - start)
+    await first
+    hasher.shutdown()
+    return {
+        "burst": burst,
+        "rejected": len(latencies),
+        "max_rejection_ms": round(max(latencies) * 1000, 3) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    args = parser.parse_args()
+
+    hashed = bcrypt_context.hash("motdepasse")
+    sizes = sorted({1, *(2 ** i for i in range(1, 8) if 2 ** i <= args.max_workers), args.max_workers})
+
+    report = {
+        "cpu_count": os.cpu_count(),
+        "executor": args.executor,
+        "storms": [asyncio.run(run_storm(n, args.logins, args.executor, hashed)) for n in sizes],
+        "rejection": asyncio.run(run_rejection(hashed, burst=50)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
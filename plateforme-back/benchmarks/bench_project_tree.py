@@ -0,0 +1,72 @@
+"""Arbre projet : le nombre de requêtes doit rester constant quand l'arbre grossit.
+
+Usage : python -m benchmarks.bench_project_tree [--scales 1 4 16]
+
+Pour chaque échelle, génère un projet (modules x epics x stories x tests) puis compte
+les requêtes émises par load_project_tree. Sort en erreur si le compte varie.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import emit, reset_schema, use_database
+
+use_database("project_tree")
+
+from db.database import SessionLocal, engine  # noqa: E402
+from models import (  # noqa: E402
+    CahierDeTests, Epic, Module, Projet, ScenarioTest, Sprint, TestAutomatise, TestManuel, TestUnitaire,
+    UserStory, ValidationTest,
+)
+from services.project_tree import load_project_tree  # noqa: E402
+
+
+def seed(db, scale: int) -> int:
+    projet = Projet(nom=f"Projet x{scale}")
+    sprint = Sprint(nom="Sprint 1", projet=projet)
+    for m in range(scale):
+        module = Module(nom=f"Module {m}", projet=projet)
+        for e in range(2):
+            epic = Epic(titre=f"Epic {m}.{e}", module=module)
+            for u in range(scale):
+                story = UserStory(titre=f"Story {m}.{e}.{u}", epic=epic, sprints=[sprint])
+                cahier = CahierDeTests(userstory=story, nombreTests=3)
+                for kind in (TestUnitaire, TestAutomatise, TestManuel):
+                    test = kind(nom=f"{kind.__name__} {m}.{e}.{u}", cahier=cahier)
+                    test.scenarios.append(ScenarioTest(nom="scénario"))
+                    test.validations.append(ValidationTest(statut="OK"))
+    db.add(projet)
+    db.commit()
+    return projet.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    queries = [0]
+    event.listen(engine, "before_cursor_execute", lambda *_: queries.__setitem__(0, queries[0] + 1))
+
+    reset_schema()
+    results = []
+    for scale in args.scales:
+        with SessionLocal() as db:
+            projet_id = seed(db, scale)
+        with SessionLocal() as db:
+            queries[0] = 0
+            start = time.perf_counter()
+            tree = load_project_tree(db, projet_id)
+            elapsed = time.perf_counter() - start
+        tests = sum(len(s["cahier_tests"]["tests"]) for m in tree["modules"] for e in m["epics"] for s in e["userstories"])
+        results.append({"scale": scale, "tests": tests, "queries": queries[0], "ms": round(elapsed * 1000, 2)})
+
+    constant = len({r["queries"] for r in results}) == 1
+    emit({"results": results, "constant_query_count": constant})
+    return 0 if constant else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
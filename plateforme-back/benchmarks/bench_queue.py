@@ -0,0 +1,113 @@
+"""File d'exécution (services/file_execution.py) : débit avec N workers locaux.
+
+Pour chaque nombre de workers de --workers, --tasks tâches sont mises en file puis vidées par
+autant de processus (`Worker.run(drain=True)`, --concurrency tâches à la fois chacun). Le runner
+ne lance rien : il attend --task-ms puis rend PASSED, ou lève une exception avec la probabilité
+--fail-rate (tâche retentée après backoff, raccourci ici à quelques dizaines de ms). Mesures :
+tâches terminées par seconde, et vérifications — chaque tâche terminée une seule fois, une
+ExecutionTest par tâche terminée.
+
+Sous SQLite toutes les réclamations passent par le verrou d'écriture de la base ; c'est sous
+PostgreSQL (DATABASE_URL) que SKIP LOCKED laisse les workers réclamer en parallèle.
+
+Usage : python -m benchmarks.bench_queue [--tasks 5000] [--workers 1,2,4,8] [--concurrency 4]
+                                         [--task-ms 0] [--fail-rate 0]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+from sqlalchemy import delete, distinct, func, select
+
+from benchmarks.common import emit, reset_schema, use_database
+
+use_database("queue")
+os.environ.setdefault("QUEUE_BACKOFF_BASE_SECONDS", "0.02")
+os.environ.setdefault("QUEUE_BACKOFF_MAX_SECONDS", "0.2")
+
+from sqlalchemy.orm import Session  # noqa: E402
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+from db.database import engine  # noqa: E402
+from models import ExecutionTest, ResultatTest, TacheExecution, TestAutomatise  # noqa: E402
+from services.file_execution import TERMINEE, Worker, enqueue  # noqa: E402
+
+
+def _runner(task_ms: float, fail_rate: float):
+    def run(tache):
+        if task_ms:
+            time.sleep(task_ms / 1000)
+        if random.random() < fail_rate:
+            raise RuntimeError("agent de test indisponible")
+        return {"statut": "PASSED", "dureeExecution": 0, "resultat": {"statut": "PASSED"}}
+    return run
+
+
+def _worker_main(worker_id: str, concurrency: int, task_ms: float, fail_rate: float, results):
+    engine.dispose(close=False)  # connexions héritées du parent inutilisables
+    worker = Worker(engine, _runner(task_ms, fail_rate), worker_id=worker_id, concurrency=concurrency,
+                    poll_seconds=0.05)
+    results.put(worker.run(drain=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--task-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    reset_schema()
+    dataset = seed_dataset(engine, DatasetSize().scaled(0.1))
+    with Session(engine) as session:
+        tests = [TestAutomatise(nom=f"E2E {i}", framework="playwright", outil="npx", typeTest="e2e")
+                 for i in range(200)]
+        session.add_all(tests)
+        session.commit()
+        test_ids = [test.id for test in tests]
+    requester = dataset["users"][0]["id"]
+
+    report = {"tasks": args.tasks, "concurrency": args.concurrency, "task_ms": args.task_ms,
+              "fail_rate": args.fail_rate, "dialect": engine.dialect.name}
+    context = multiprocessing.get_context("spawn")
+    for workers in (int(n) for n in args.workers.split(",")):
+        with engine.begin() as connection:
+            connection.execute(delete(TacheExecution))
+            connection.execute(delete(ResultatTest))
+            connection.execute(delete(ExecutionTest))
+            enqueue(connection, [test_ids[i % len(test_ids)] for i in range(args.tasks)],
+                    priorite=0, demandeur_id=requester)
+
+        results = context.Queue()
+        processes = [context.Process(target=_worker_main,
+                                     args=(f"bench-{n}", args.concurrency, args.task_ms, args.fail_rate, results))
+                     for n in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        counters = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+        with engine.connect() as connection:
+            done = connection.scalar(select(func.count()).where(TacheExecution.statut == TERMINEE))
+            executions = connection.scalar(select(func.count(ExecutionTest.id)))
+            linked = connection.scalar(select(func.count(distinct(TacheExecution.executionId))))
+        report[f"{workers}_workers"] = {
+            "secondes": round(elapsed, 2),
+            "taches_par_s": round(done / elapsed, 1),
+            "terminees": done,
+            "executions": executions,
+            "coherent": done == executions == linked,
+            **{name: sum(c[name] for c in counters) for name in counters[0]},
+        }
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
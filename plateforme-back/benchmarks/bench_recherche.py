@@ -0,0 +1,136 @@
+"""Recherche plein texte (services/recherche.py) sur un corpus synthétique.
+
+--documents documents (1 million par défaut) répartis entre user stories, tests et
+anomalies ; titres de 4 à 8 mots et champs de corps de 10 à 30 mots tirés d'un vocabulaire à
+distribution de Zipf. Mesures :
+- insertion du corpus ;
+- construction de l'index (index inversé en mémoire sous SQLite, qui relit toute la base ;
+  sous PostgreSQL les index GIN sont maintenus à l'insertion et rien n'est à construire) ;
+- latence de `search` (classement + extraits) par forme de requête : mot fréquent, mot rare,
+  deux mots moyens, fréquent + rare, trois mots, exclusion ;
+- à titre de comparaison, `LIKE '%mot%'` sur les user stories (toutes les correspondances,
+  comme il faut les voir toutes pour les classer).
+
+Usage : python -m benchmarks.bench_recherche [--documents 1000000] [--queries 200] [--like-runs 3]
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import insert, or_, select
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("recherche")
+
+from db.database import engine  # noqa: E402
+from models import Anomalie, Test, UserStory  # noqa: E402
+from services.recherche import search, search_index, uses_postgres  # noqa: E402
+
+SYLLABES = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "zo", "cha", "pre",
+            "tra", "lon", "mar", "sel", "dur", "qui", "ver", "blo", "cri", "fen", "gar", "pul", "ton", "vex"]
+REPARTITION = ((UserStory, "titre", ("description", "criteresAcceptation"), 0.5),
+               (Test, "nom", ("description",), 0.3),
+               (Anomalie, "titre", ("description",), 0.2))
+
+
+def vocabulary(size: int, rng: np.random.Generator) -> np.ndarray:
+    words = set()
+    while len(words) < size:
+        count = rng.integers(2, 5)
+        words.add("".join(SYLLABES[i] for i in rng.integers(0, len(SYLLABES), count)))
+    return np.array(sorted(words, key=lambda w: (len(w), w)))
+
+
+def sentences(words: np.ndarray, count: int, low: int, high: int, rng: np.random.Generator) -> list[str]:
+    lengths = rng.integers(low, high + 1, count)
+    # Zipf tronqué : rang r tiré avec une probabilité ∝ 1 / r
+    ranks = np.minimum(rng.zipf(1.15, lengths.sum()) - 1, len(words) - 1)
+    tokens = words[ranks]
+    bounds = np.cumsum(lengths)[:-1]
+    return [" ".join(chunk) for chunk in np.split(tokens, bounds)]
+
+
+def seed_corpus(documents: int, words: np.ndarray, rng: np.random.Generator, batch: int = 20000) -> dict:
+    counts = {}
+    with engine.begin() as connection:
+        for model, title, body, share in REPARTITION:
+            total = int(documents * share)
+            counts[model.__tablename__] = total
+            for start in range(0, total, batch):
+                size = min(batch, total - start)
+                rows = [{title: t} for t in sentences(words, size, 4, 8, rng)]
+                for field in body:
+                    for row, text in zip(rows, sentences(words, size, 10, 30, rng)):
+                        row[field] = text
+                connection.execute(insert(model.__table__), rows)
+    return counts
+
+
+def query_shapes(words: np.ndarray) -> dict[str, list[str]]:
+    frequent, medium, rare = words[5:40], words[200:2000], words[20000:40000]
+    return {
+        "frequent": [f"{w}" for w in frequent],
+        "rare": [f"{w}" for w in rare[:200]],
+        "deux_moyens": [f"{a} {b}" for a, b in zip(medium[::2], medium[1::2])],
+        "frequent_rare": [f"{a} {b}" for a, b in zip(np.resize(frequent, 200), rare[200:400])],
+        "trois_mots": [f"{a} {b} {c}" for a, b, c in zip(np.resize(frequent, 300), medium[::3], medium[1::3])],
+        "exclusion": [f"{a} -{b}" for a, b in zip(medium[::2], np.resize(frequent, 900))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=60000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--like-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    reset_schema()
+    rng = np.random.default_rng(3)
+    words = vocabulary(args.vocabulary, rng)
+    start = time.perf_counter()
+    counts = seed_corpus(args.documents, words, rng)
+    seed_seconds = time.perf_counter() - start
+
+    report = {"documents": counts, "insertion_s": round(seed_seconds, 1)}
+    with engine.connect() as connection:
+        postgres = uses_postgres(connection)
+        report["moteur"] = "postgresql" if postgres else "memoire"
+        if not postgres:
+            start = time.perf_counter()
+            search_index.ensure_loaded(connection)
+            report["construction_index"] = {
+                "secondes": round(time.perf_counter() - start, 1),
+                **search_index.stats(),
+            }
+
+        latencies = {}
+        for shape, queries in query_shapes(words).items():
+            samples, hits = [], 0
+            for query in queries[:args.queries]:
+                start = time.perf_counter()
+                result = search(connection, query, limit=20)
+                samples.append(time.perf_counter() - start)
+                hits += bool(result["items"])
+            latencies[shape] = {"requetes_avec_resultats": hits,
+                                **{k: round(v * 1000, 2) for k, v in percentiles(samples).items()}}
+        report["search_ms"] = latencies
+
+        like = []
+        for word in words[[10, 500, 25000]][:args.like_runs]:
+            pattern = f"%{word}%"
+            start = time.perf_counter()
+            connection.execute(
+                select(UserStory.id).where(or_(UserStory.titre.like(pattern), UserStory.description.like(pattern),
+                                               UserStory.criteresAcceptation.like(pattern)))
+            ).all()
+            like.append(time.perf_counter() - start)
+        report["like_userstory_ms"] = [round(s * 1000, 1) for s in like]
+
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Latence de la sélection de tests (services/selection.py) et rejeu sur l'historique seedé.
+
+Les statistiques par test sont calculées une fois (services/statistiques.py), puis
+`select_tests` est appelée pour des changements tirés au hasard (une user story, un epic
+ou un module) avec un budget égal à une fraction de la durée de la suite complète.
+Le jeu seedé a des verdicts aléatoires : le rejeu y mesure surtout le coût du calcul, les
+chiffres de rappel n'ont de sens que sur un historique réel.
+
+Usage : python -m benchmarks.bench_selection [--scale 1] [--calls 500] [--budget-ratio 0.3]
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import select
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("selection")
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+from db.database import engine  # noqa: E402
+from models import Epic, Module, UserStory  # noqa: E402
+from services.selection import replay, select_tests  # noqa: E402
+from services.statistiques import compute_statistics, load_history  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--executions-per-test", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--budget-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    reset_schema()
+    size = DatasetSize().scaled(args.scale)
+    size.executions_per_test = args.executions_per_test
+    dataset = seed_dataset(engine, size)
+    with engine.begin() as connection:
+        compute_statistics(connection)
+
+    rng = random.Random(1)
+    with engine.connect() as connection:
+        changes = {
+            "userstory_ids": connection.scalars(select(UserStory.id)).all(),
+            "epic_ids": connection.scalars(select(Epic.id)).all(),
+            "module_ids": connection.scalars(select(Module.id)).all(),
+        }
+        full = select_tests(connection, module_ids=changes["module_ids"])["dureeEstimee"]
+        budget = args.budget_ratio * full / len(dataset["projet_ids"])
+
+        latencies, selected = [], []
+        for _ in range(args.calls):
+            kind = rng.choice(list(changes))
+            start = time.perf_counter()
+            result = select_tests(connection, budget=budget, **{kind: [rng.choice(changes[kind])]})
+            latencies.append(time.perf_counter() - start)
+            selected.append(len(result["tests"]))
+
+        start = time.perf_counter()
+        historique = load_history(connection)
+    replay_result = replay(historique, run_hours=6, budget_ratio=args.budget_ratio)
+    replay_seconds = time.perf_counter() - start
+
+    emit({
+        "dataset": dataset["counts"],
+        "select_tests": {
+            "calls": args.calls,
+            "budget_s": round(budget, 1),
+            "selected_avg": round(sum(selected) / len(selected), 1),
+            "latency_ms": {k: round(v * 1000, 2) for k, v in percentiles(latencies).items()},
+        },
+        "replay": {"seconds": round(replay_seconds, 3), **replay_result},
+    })
+
+
+if __name__ == "__main__":
+    main()
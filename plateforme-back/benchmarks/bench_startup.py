@@ -0,0 +1,103 @@
+"""Temps de démarrage : import de `models` / `main`, contrôle de schéma, première requête servie.
+
+Chaque mesure d'import et de première requête est faite dans un nouveau processus. Les
+options --max-* font échouer le benchmark (code 1) au-delà d'un budget, pour la CI.
+
+Usage : python -m benchmarks.bench_startup [--repeat 5] [--max-import-ms 1500] [--max-first-request-ms 4000]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import emit, percentiles, reset_schema, use_database
+
+use_database("startup")
+
+from db.database import Base, engine  # noqa: E402
+from db.schema import check_schema  # noqa: E402
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def import_seconds(module: str) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+                            capture_output=True, text=True, check=True, env=os.environ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_request_seconds(timeout: float = 30) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError("le serveur n'a pas répondu")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def in_process(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def boot_check():
+    with engine.connect() as connection:
+        check_schema(connection)
+
+
+def ms(samples: list[float]) -> dict:
+    return {k: round(v * 1000, 2) for k, v in percentiles(samples).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None, help="budget p50 pour `import main`")
+    parser.add_argument("--max-first-request-ms", type=float, default=None, help="budget p50 de la première requête")
+    args = parser.parse_args()
+
+    reset_schema()
+    report = {
+        "import_models_ms": ms([import_seconds("models") for _ in range(args.repeat)]),
+        "import_main_ms": ms([import_seconds("main") for _ in range(args.repeat)]),
+        "schema_check_ms": ms(in_process(boot_check, args.repeat * 10)),
+        "create_all_ms": ms(in_process(lambda: Base.metadata.create_all(bind=engine), args.repeat * 10)),
+        "first_request_ms": ms([first_request_seconds() for _ in range(args.repeat)]),
+    }
+
+    failures = []
+    if args.max_import_ms is not None and report["import_main_ms"]["p50"] > args.max_import_ms:
+        failures.append(f"import main {report['import_main_ms']['p50']} ms > {args.max_import_ms} ms")
+    if args.max_first_request_ms is not None and report["first_request_ms"]["p50"] > args.max_first_request_ms:
+        failures.append(f"première requête {report['first_request_ms']['p50']} ms > {args.max_first_request_ms} ms")
+    report["budget_failures"] = failures
+    emit(report)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Calcul des statistiques d'historique par test (services/statistiques.py).
+
+Deux mesures :
+- bout en bout sur une base seedée (chargement par blocs, calcul, écriture des lignes et
+  des recommandations), avec comparaison à une boucle Python par exécution sur le même
+  historique, qui sert aussi de contrôle d'exactitude ;
+- calcul seul sur un historique synthétique de plusieurs millions d'exécutions.
+
+Usage : python -m benchmarks.bench_statistiques [--executions-per-test 500] [--synthetic 5000000]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from benchmarks.common import emit, reset_schema, use_database
+
+use_database("statistiques")
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+from db.database import engine  # noqa: E402
+from services.statistiques import (  # noqa: E402
+    STATS_RECENT_WINDOW, compute_statistics, load_history, segment_stats, test_segments,
+)
+
+COMPARED = ("nombreEchecs", "tauxBascule", "serieEchecsMax", "serieEchecsCourante", "echecsRecents",
+            "dureeMoyenne", "dureeP50", "dureeP95")
+
+
+def reference_stats(echec: np.ndarray, duree: np.ndarray, counts: np.ndarray) -> dict[str, list]:
+    """Même calcul, exécution par exécution."""
+    result = {name: [] for name in COMPARED}
+    position = 0
+    for count in counts.tolist():
+        verdicts = echec[position:position + count].tolist()
+        durations = [d for d in duree[position:position + count].tolist() if not math.isnan(d)]
+        position += count
+
+        bascules, serie, serie_max = 0, 0, 0
+        for i, failed in enumerate(verdicts):
+            if i and failed != verdicts[i - 1]:
+                bascules += 1
+            serie = serie + 1 if failed else 0
+            serie_max = max(serie_max, serie)
+        result["nombreEchecs"].append(sum(verdicts))
+        result["tauxBascule"].append(bascules / max(count - 1, 1))
+        result["serieEchecsMax"].append(serie_max)
+        result["serieEchecsCourante"].append(serie)
+        result["echecsRecents"].append(sum(verdicts[-STATS_RECENT_WINDOW:]))
+        result["dureeMoyenne"].append(sum(durations) / len(durations) if durations else math.nan)
+        result["dureeP50"].append(float(np.percentile(durations, 50)) if durations else math.nan)
+        result["dureeP95"].append(float(np.percentile(durations, 95)) if durations else math.nan)
+    return result
+
+
+def mismatches(vectorized: dict, reference: dict) -> dict:
+    return {
+        name: int((~np.isclose(np.asarray(vectorized[name], dtype=float), np.asarray(reference[name], dtype=float),
+                               equal_nan=True)).sum())
+        for name in COMPARED
+    }
+
+
+def synthetic(executions: int, tests: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(executions - tests, np.full(tests, 1 / tests)) + 1
+    failure_rate = np.repeat(rng.beta(0.5, 8, tests), counts)
+    echec = rng.random(executions) < failure_rate
+    duree = np.where(rng.random(executions) < 0.02, np.nan, rng.gamma(2.0, 15.0, executions))
+    date = np.arange(executions, dtype=np.float64)
+    return echec, duree, date, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="facteur appliqué à la taille du jeu seedé")
+    parser.add_argument("--executions-per-test", type=int, default=500)
+    parser.add_argument("--synthetic", type=int, default=5_000_000, help="exécutions de l'historique synthétique")
+    parser.add_argument("--synthetic-tests", type=int, default=50_000)
+    args = parser.parse_args()
+
+    reset_schema()
+    size = DatasetSize().scaled(args.scale)
+    size.executions_per_test = args.executions_per_test
+    seed_start = time.perf_counter()
+    dataset = seed_dataset(engine, size)
+    seed_seconds = time.perf_counter() - seed_start
+
+    with engine.begin() as connection:
+        summary = compute_statistics(connection)
+
+    with engine.connect() as connection:
+        historique = load_history(connection)
+    _, counts = test_segments(historique)
+    start = time.perf_counter()
+    vectorized = segment_stats(historique.echec, historique.duree, historique.date, counts)
+    vectorized_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = reference_stats(historique.echec, historique.duree, counts)
+    loop_seconds = time.perf_counter() - start
+
+    echec, duree, date, synthetic_counts = synthetic(args.synthetic, args.synthetic_tests)
+    start = time.perf_counter()
+    segment_stats(echec, duree, date, synthetic_counts)
+    synthetic_seconds = time.perf_counter() - start
+
+    emit({
+        "database": engine.url.get_backend_name(),
+        "dataset": {"seed_seconds": round(seed_seconds, 2), **dataset["counts"]},
+        "end_to_end": summary,
+        "compute": {
+            "executions": len(historique),
+            "vectorized_ms": round(vectorized_seconds * 1000, 2),
+            "python_loop_ms": round(loop_seconds * 1000, 2),
+            "speedup": round(loop_seconds / vectorized_seconds, 1) if vectorized_seconds else None,
+            "mismatches": mismatches(vectorized, reference),
+        },
+        "synthetic": {
+            "executions": args.synthetic,
+            "tests": args.synthetic_tests,
+            "compute_seconds": round(synthetic_seconds, 3),
+            "executions_per_s": round(args.synthetic / synthetic_seconds),
+        },
+    })
+
+
+if __name__ == "__main__":
+    main()
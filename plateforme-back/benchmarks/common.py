@@ -0,0 +1,37 @@
+"""Outils partagés par les benchmarks.
+
+`use_database` doit être appelé avant tout import de `db.database` : il pointe
+DATABASE_URL vers un fichier SQLite jetable si aucune base n'est configurée.
+"""
+import json
+import os
+import statistics
+import tempfile
+
+
+def use_database(name: str) -> str:
+    if not os.environ.get("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(prefix="bench-"), f"{name}.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return os.environ["DATABASE_URL"]
+
+
+def reset_schema():
+    import models  # noqa: F401  (enregistre toutes les tables)
+    from db.database import Base, engine
+    from db.schema import migrate
+
+    Base.metadata.drop_all(bind=engine)
+    migrate(engine)
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def emit(report: dict):
+    print(json.dumps(report, indent=2, default=str, ensure_ascii=False))
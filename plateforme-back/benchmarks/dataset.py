@@ -0,0 +1,153 @@
+"""Jeu de données synthétique (insertion ensembliste) partagé par les benchmarks API.
+
+La taille est pilotée par `DatasetSize`. Tous les utilisateurs ont le même mot de passe,
+haché une seule fois, et le rôle BENCH qui porte toutes les permissions des routes.
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from models import (
+    Anomalie, CahierDeTests, Epic, ExecutionTest, Module, Permission, Projet, ResultatTest, Role, Sprint,
+    Test, UserStory, Utilisateur,
+)
+from db.associations import role_permission, sprint_userstory
+from services.password_hashing import bcrypt_context
+
+PASSWORD = "bench-password"
+PERMISSIONS = [
+    ("projet", "read"), ("execution", "read"), ("execution", "create"), ("anomalie", "read"), ("anomalie", "create"),
+    ("audit", "read"), ("log", "read"), ("notification", "create"), ("rapport", "read"), ("rapport", "update"),
+]
+STATUTS = ["PASSED"] * 8 + ["FAILED", "ERROR"]
+SEVERITES = ["MINEURE", "MAJEURE", "CRITIQUE", "BLOQUANTE"]
+
+
+@dataclass
+class DatasetSize:
+    users: int = 50
+    projects: int = 2
+    sprints_per_project: int = 4
+    stories_per_project: int = 40
+    tests_per_story: int = 3
+    executions_per_test: int = 10
+    anomalies_per_failure: float = 0.5
+
+    def scaled(self, factor: float) -> "DatasetSize":
+        return DatasetSize(
+            users=max(1, int(self.users * factor)),
+            projects=max(1, int(self.projects * factor)),
+            sprints_per_project=self.sprints_per_project,
+            stories_per_project=self.stories_per_project,
+            tests_per_story=self.tests_per_story,
+            executions_per_test=max(1, int(self.executions_per_test * factor)),
+            anomalies_per_failure=self.anomalies_per_failure,
+        )
+
+
+def _insert(connection, model, rows: list[dict], batch: int = 5000) -> list[int]:
+    ids = []
+    for offset in range(0, len(rows), batch):
+        result = connection.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), rows[offset:offset + batch]
+        )
+        ids += list(result.scalars())
+    return ids
+
+
+def seed_dataset(engine, size: DatasetSize, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = bcrypt_context.hash(PASSWORD)
+
+    with engine.begin() as connection:
+        role_id, = _insert(connection, Role, [{"nom": "Bench", "code": "BENCH", "niveau_acces": 100}])
+        permission_ids = _insert(connection, Permission, [
+            {"nom": f"{resource}:{action}", "resource": resource, "action": action} for resource, action in PERMISSIONS
+        ])
+        connection.execute(insert(role_permission), [
+            {"role_id": role_id, "permission_id": permission_id} for permission_id in permission_ids
+        ])
+        user_ids = _insert(connection, Utilisateur, [
+            {"nom": f"Utilisateur {i}", "email": f"user{i}@bench.local", "motDePasse": password_hash,
+             "role_id": role_id, "actif": True}
+            for i in range(size.users)
+        ])
+
+        projet_ids = _insert(connection, Projet, [
+            {"nom": f"Projet {p}", "statut": "EN_COURS", "productOwnerId": rng.choice(user_ids)}
+            for p in range(size.projects)
+        ])
+        sprint_rows, module_rows = [], []
+        for projet_id in projet_ids:
+            for s in range(size.sprints_per_project):
+                sprint_rows.append({"nom": f"Sprint {s + 1}", "projet_id": projet_id, "statut": "EN_COURS",
+                                    "dateDebut": now - timedelta(days=14 * (size.sprints_per_project - s)),
+                                    "scrumMasterId": rng.choice(user_ids)})
+            module_rows.append({"nom": "Module principal", "projet_id": projet_id})
+        sprint_ids = _insert(connection, Sprint, sprint_rows)
+        module_ids = _insert(connection, Module, module_rows)
+        epic_ids = _insert(connection, Epic, [{"titre": "Epic", "module_id": m} for m in module_ids])
+
+        story_rows, story_sprints = [], []
+        for p, epic_id in enumerate(epic_ids):
+            project_sprints = sprint_ids[p * size.sprints_per_project:(p + 1) * size.sprints_per_project]
+            for u in range(size.stories_per_project):
+                story_rows.append({"titre": f"Story {p}.{u}", "epic_id": epic_id, "points": rng.randint(1, 8),
+                                   "statut": "A_FAIRE", "developerId": rng.choice(user_ids)})
+                story_sprints.append(project_sprints[u % len(project_sprints)])
+        story_ids = _insert(connection, UserStory, story_rows)
+        connection.execute(insert(sprint_userstory), [
+            {"sprint_id": sprint_id, "userstory_id": story_id} for story_id, sprint_id in zip(story_ids, story_sprints)
+        ])
+        cahier_ids = _insert(connection, CahierDeTests, [
+            {"userstory_id": story_id, "statut": "GENERE", "nombreTests": size.tests_per_story} for story_id in story_ids
+        ])
+
+        test_ids = _insert(connection, Test, [
+            {"nom": f"Test {story_id}.{t}", "type": "test", "cahier_id": cahier_id, "userStoryId": story_id}
+            for story_id, cahier_id in zip(story_ids, cahier_ids) for t in range(size.tests_per_story)
+        ])
+
+        execution_rows = []
+        for test_id in test_ids:
+            for e in range(size.executions_per_test):
+                execution_rows.append({
+                    "test_id": test_id, "statut": rng.choice(STATUTS), "dureeExecution": rng.randint(1, 120),
+                    "dateExecution": now - timedelta(hours=e * 6, seconds=rng.randint(0, 3600)),
+                    "executeurId": rng.choice(user_ids),
+                })
+        execution_ids = _insert(connection, ExecutionTest, execution_rows)
+        resultat_ids = _insert(connection, ResultatTest, [
+            {"execution_id": execution_id, "statut": row["statut"],
+             "messageErreur": "AssertionError: valeur inattendue" if row["statut"] != "PASSED" else None,
+             "logs": f"run {execution_id}"}
+            for execution_id, row in zip(execution_ids, execution_rows)
+        ])
+
+        anomaly_rows = [
+            {"titre": f"Anomalie {resultat_id}", "severite": rng.choice(SEVERITES), "statut": "OUVERTE",
+             "resultat_id": resultat_id, "reporterId": rng.choice(user_ids), "dateCreation": row["dateExecution"]}
+            for resultat_id, row in zip(resultat_ids, execution_rows)
+            if row["statut"] != "PASSED" and rng.random() < size.anomalies_per_failure
+        ]
+        if anomaly_rows:
+            _insert(connection, Anomalie, anomaly_rows)
+
+        users = [{"id": user_id, "email": email} for user_id, email in connection.execute(
+            select(Utilisateur.id, Utilisateur.email).order_by(Utilisateur.id))]
+
+    return {
+        "size": asdict(size),
+        "users": users,
+        "password": PASSWORD,
+        "projet_ids": projet_ids,
+        "sprint_ids": sprint_ids,
+        "test_ids": test_ids,
+        "counts": {
+            "projets": len(projet_ids), "sprints": len(sprint_ids), "userstories": len(story_ids),
+            "tests": len(test_ids), "executions": len(execution_ids), "anomalies": len(anomaly_rows),
+        },
+    }
@@ -0,0 +1,42 @@
+"""Expressions de recherche plein texte PostgreSQL partagées par les modèles et la recherche.
+
+Chaque table indexée déclare un index GIN sur l'expression `search_vector(titre, *corps)` ;
+la requête de recherche reconstruit exactement la même expression pour que le planificateur
+l'utilise. L'index n'est créé que sous PostgreSQL (SQLite : index inversé en mémoire, voir
+services/recherche.py).
+
+Changer SEARCH_TS_CONFIG impose de recréer les index (`python -m scripts.recherche reindex`).
+"""
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import Index, func, literal_column
+from sqlalchemy.dialects import postgresql  # noqa: F401  (enregistre to_tsvector & co.)
+
+# ================= CONFIG =================
+load_dotenv()
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "french")
+
+
+def ts_config():
+    return literal_column(f"'{SEARCH_TS_CONFIG}'::regconfig")
+
+
+def search_vector(title, *body):
+    """Titre de poids A, autres champs de poids B.
+
+    Constantes en littéraux SQL, jamais en paramètres liés : sous asyncpg un paramètre devient
+    `$1::VARCHAR` et l'expression ne correspond plus à celle de l'index.
+    """
+    empty, space = literal_column("''"), literal_column("' '")
+    vector = func.setweight(func.to_tsvector(ts_config(), func.coalesce(title, empty)), literal_column("'A'"))
+    if body:
+        text = func.coalesce(body[0], empty)
+        for column in body[1:]:
+            text = text.op("||")(space).op("||")(func.coalesce(column, empty))
+        vector = vector.op("||")(func.setweight(func.to_tsvector(ts_config(), text), literal_column("'B'")))
+    return vector
+
+
+def fulltext_index(name: str, title, *body) -> Index:
+    return Index(name, search_vector(title, *body), postgresql_using="gin").ddl_if(dialect="postgresql")
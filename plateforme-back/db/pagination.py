@@ -0,0 +1,66 @@
+"""Pagination par curseur (keyset) sur (colonne horodatage, id), du plus récent au plus ancien.
+
+Le curseur est opaque pour le client : c'est la clé (horodatage, id) de la dernière
+ligne renvoyée, encodée en base64. La page suivante filtre `(ts, id) < curseur`, ce qui
+reste un simple parcours d'index quelle que soit la profondeur, contrairement à OFFSET.
+Les colonnes horodatage paginées ne doivent pas être NULL (elles ont toutes un défaut).
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class Page:
+    items: list[dict]
+    next_cursor: str | None
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Curseur invalide") from e
+
+
+def apply_keyset(stmt: Select, timestamp_column, id_column, cursor: str | None, limit: int) -> Select:
+    """Ajoute tri, borne de curseur et limite (une ligne de plus pour savoir s'il reste une page)."""
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id))
+    return stmt.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def build_page(rows: list[dict], timestamp_key: str, id_key: str, limit: int) -> Page:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[timestamp_key], last[id_key])
+    return Page(items=rows, next_cursor=next_cursor)
+
+
+async def paginate(db: AsyncSession, stmt: Select, timestamp_column, id_column,
+                   cursor: str | None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    result = await db.execute(apply_keyset(stmt, timestamp_column, id_column, cursor, limit))
+    rows = [dict(row) for row in result.mappings()]
+    return build_page(rows, timestamp_column.key, id_column.key, limit)
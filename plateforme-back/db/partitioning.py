@@ -0,0 +1,452 @@
+"""Partitionnement temporel, agrégation et rétention de audit_log / log_systems.
+
+PostgreSQL : la table parente est partitionnée nativement par plage (RANGE) sur sa
+colonne horodatage. `convert_to_partitioned` convertit une table existante (à lancer
+hors charge via `python -m scripts.partitions init`), puis la maintenance crée les
+partitions à venir. Le planificateur élague les partitions dès qu'une requête borne
+l'horodatage.
+
+SQLite : une table par période. La table de base ne garde que la période courante ; la
+maintenance déplace les périodes closes dans `<table>_pAAAAMM` (ou `_pAAAAMMJJ`) et les
+requêtes d'historique et les listes paginées (`keyset_page`) n'interrogent que les tables
+dont la plage recoupe la fenêtre.
+
+Dans les deux cas, les partitions closes depuis LOG_ROLLUP_AFTER_DAYS sont agrégées par
+jour dans les tables *_journalier, et celles closes depuis LOG_RETENTION_DAYS sont
+supprimées (après agrégation).
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, literal, select, text, union_all
+from sqlalchemy.schema import AddConstraint
+
+from db.database import engine as default_engine
+from db.pagination import Page, apply_keyset, build_page, decode_cursor
+from models.log_systems import AuditLog, AuditLogJournalier, LogSystems, LogSystemsJournalier
+
+# ================= CONFIG =================
+load_dotenv()
+LOG_PARTITIONING = os.getenv("LOG_PARTITIONING", "0") == "1"
+LOG_PARTITION_PERIOD = os.getenv("LOG_PARTITION_PERIOD", "month")
+LOG_PARTITIONS_AHEAD = int(os.getenv("LOG_PARTITIONS_AHEAD", 2))
+LOG_ROLLUP_AFTER_DAYS = int(os.getenv("LOG_ROLLUP_AFTER_DAYS", 30))
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", 365))
+LOG_MAINTENANCE_INTERVAL_S = int(os.getenv("LOG_MAINTENANCE_INTERVAL_S", 3600))
+
+PERIODS = ("month", "day")
+NIVEAUX_ERREUR = ("ERROR", "CRITICAL")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PartitionSpec:
+    table: Table
+    column: str
+    rollup: Table
+    dimensions: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+SPECS = {
+    "audit_log": PartitionSpec(AuditLog.__table__, "timestamp", AuditLogJournalier.__table__,
+                               ("action", "entityType")),
+    "log_systems": PartitionSpec(LogSystems.__table__, "date_time", LogSystemsJournalier.__table__,
+                                 ("niveau", "source")),
+}
+
+
+# ================= PÉRIODES =================
+def period_start(moment: datetime, period: str = LOG_PARTITION_PERIOD) -> datetime:
+    if period == "day":
+        return datetime(moment.year, moment.month, moment.day)
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_period(start: datetime, period: str = LOG_PARTITION_PERIOD) -> datetime:
+    if period == "day":
+        return start + timedelta(days=1)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(table_name: str, start: datetime, period: str = LOG_PARTITION_PERIOD) -> str:
+    return f"{table_name}_p{start:%Y%m%d}" if period == "day" else f"{table_name}_p{start:%Y%m}"
+
+
+def parse_partition(table_name: str, name: str) -> Partition | None:
+    """Retrouve la plage d'une partition à partir de son nom (indépendant de la période configurée)."""
+    suffix = name.removeprefix(f"{table_name}_p")
+    if suffix == name or not suffix.isdigit():
+        return None
+    if len(suffix) == 8:
+        start = datetime.strptime(suffix, "%Y%m%d")
+        return Partition(name, start, next_period(start, "day"))
+    if len(suffix) == 6:
+        start = datetime.strptime(suffix, "%Y%m")
+        return Partition(name, start, next_period(start, "month"))
+    return None
+
+
+def _sql_timestamp(moment: datetime) -> str:
+    return f"'{moment:%Y-%m-%d %H:%M:%S}'"
+
+
+# ================= CATALOGUE =================
+def _is_postgres(connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def partition_table(spec: PartitionSpec, name: str) -> Table:
+    """Table de même forme que la table de base (colonnes et index renommés, sans clés étrangères)."""
+    columns = [Column(c.name, c.type, primary_key=c.primary_key) for c in spec.table.columns]
+    indexes = [Index(index.name.replace(spec.table.name, name, 1), *[c.name for c in index.columns])
+               for index in spec.table.indexes]
+    return Table(name, MetaData(), *columns, *indexes)
+
+
+def is_partitioned(connection, spec: PartitionSpec) -> bool:
+    if not _is_postgres(connection):
+        return False
+    return connection.scalar(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": spec.table.name}) is not None
+
+
+def list_partitions(connection, spec: PartitionSpec) -> list[Partition]:
+    if _is_postgres(connection):
+        names = connection.scalars(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {"table": spec.table.name})
+    else:
+        names = connection.scalars(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :pattern"
+        ), {"pattern": f"{spec.table.name}_p%"})
+    partitions = [p for p in (parse_partition(spec.table.name, n) for n in names) if p is not None]
+    return sorted(partitions, key=lambda p: p.start)
+
+
+# ================= POSTGRESQL =================
+def ensure_partitions(connection, spec: PartitionSpec, now: datetime, period: str = LOG_PARTITION_PERIOD,
+                      ahead: int = LOG_PARTITIONS_AHEAD, since: datetime | None = None) -> list[str]:
+    """Crée les partitions de `since` (ou de la période courante) jusqu'à `ahead` périodes à venir."""
+    table_name = spec.table.name
+    existing = list_partitions(connection, spec)
+    start = period_start(since or now, period)
+    last = period_start(now, period)
+    for _ in range(ahead):
+        last = next_period(last, period)
+
+    created = []
+    while start <= last:
+        end = next_period(start, period)
+        # Une partition d'une autre granularité peut déjà couvrir la plage
+        if not any(p.start < end and p.end > start for p in existing):
+            name = partition_name(table_name, start, period)
+            connection.execute(text(
+                f'CREATE TABLE "{name}" PARTITION OF "{table_name}" '
+                f"FOR VALUES FROM ({_sql_timestamp(start)}) TO ({_sql_timestamp(end)})"
+            ))
+            created.append(name)
+        start = end
+    connection.execute(text(f'CREATE TABLE IF NOT EXISTS "{table_name}_pdefault" PARTITION OF "{table_name}" DEFAULT'))
+    return created
+
+
+def convert_to_partitioned(connection, spec: PartitionSpec, now: datetime,
+                           period: str = LOG_PARTITION_PERIOD) -> bool:
+    """Remplace la table ordinaire par une table partitionnée contenant les mêmes lignes.
+
+    Les lignes sont recopiées dans la même transaction : à exécuter en fenêtre de maintenance
+    sur une table volumineuse.
+    """
+    if not _is_postgres(connection) or is_partitioned(connection, spec):
+        return False
+    table_name, column = spec.table.name, spec.column
+    legacy = f"{table_name}_legacy"
+
+    connection.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{legacy}"'))
+    primary_key = connection.scalar(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:legacy AS regclass) AND contype = 'p'"
+    ), {"legacy": legacy})
+    if primary_key:
+        connection.execute(text(f'ALTER TABLE "{legacy}" RENAME CONSTRAINT "{primary_key}" TO "{legacy}_pkey"'))
+    for index in spec.table.indexes:
+        connection.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+
+    # La clé de partition doit faire partie de la clé primaire
+    connection.execute(text(
+        f'CREATE TABLE "{table_name}" (LIKE "{legacy}" INCLUDING DEFAULTS, PRIMARY KEY (id, "{column}")) '
+        f'PARTITION BY RANGE ("{column}")'
+    ))
+    for constraint in spec.table.foreign_key_constraints:
+        connection.execute(AddConstraint(constraint))
+    for index in spec.table.indexes:
+        index.create(connection)
+
+    oldest = connection.scalar(text(f'SELECT min("{column}") FROM "{legacy}"'))
+    ensure_partitions(connection, spec, now, period, since=oldest)
+
+    names = ", ".join(f'"{c.name}"' for c in spec.table.columns)
+    values = ", ".join(
+        f"COALESCE(\"{c.name}\", TIMESTAMP '1970-01-01')" if c.name == column else f'"{c.name}"'
+        for c in spec.table.columns
+    )
+    connection.execute(text(f'INSERT INTO "{table_name}" ({names}) SELECT {values} FROM "{legacy}"'))
+
+    sequence = connection.scalar(text("SELECT pg_get_serial_sequence(:legacy, 'id')"), {"legacy": legacy})
+    if sequence:
+        connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table_name}".id'))
+    connection.execute(text(f'DROP TABLE "{legacy}"'))
+    return True
+
+
+# ================= SQLITE =================
+def _uses_autoincrement(connection, table_name: str) -> bool:
+    ddl = connection.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table"),
+                            {"table": table_name})
+    return ddl is not None and "AUTOINCREMENT" in ddl.upper()
+
+
+def ensure_autoincrement(connection, spec: PartitionSpec) -> bool:
+    """Passe la table de base en AUTOINCREMENT (reconstruction) et cale sa séquence.
+
+    Sans AUTOINCREMENT, SQLite repart de max(id) + 1 : une fois la table vidée par
+    l'archivage, les nouveaux ids recouvrent ceux des tables de période. La séquence est
+    portée au plus grand id connu, table de base et tables de période confondues.
+    """
+    if _is_postgres(connection):
+        return False
+    table_name = spec.table.name
+    rebuilt = not _uses_autoincrement(connection, table_name)
+    if rebuilt:
+        legacy = f"{table_name}_legacy"
+        connection.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{legacy}"'))
+        for index in spec.table.indexes:
+            connection.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+        spec.table.create(connection)
+        names = ", ".join(f'"{c.name}"' for c in spec.table.columns)
+        connection.execute(text(f'INSERT INTO "{table_name}" ({names}) SELECT {names} FROM "{legacy}"'))
+        connection.execute(text(f'DROP TABLE "{legacy}"'))
+
+    highest = max([connection.scalar(select(func.max(table.c.id))) or 0 for table in
+                   (spec.table, *(partition_table(spec, p.name) for p in list_partitions(connection, spec)))])
+    if highest:
+        updated = connection.execute(text("UPDATE sqlite_sequence SET seq = max(seq, :seq) WHERE name = :table"),
+                                     {"seq": highest, "table": table_name}).rowcount
+        if not updated:
+            connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:table, :seq)"),
+                               {"seq": highest, "table": table_name})
+    return rebuilt
+
+
+def archive_closed_periods(connection, spec: PartitionSpec, now: datetime,
+                           period: str = LOG_PARTITION_PERIOD) -> int:
+    """Déplace les lignes des périodes closes de la table de base vers leur table de période."""
+    column = spec.table.c[spec.column]
+    current = period_start(now, period)
+    moved = 0
+    while (oldest := connection.scalar(select(func.min(column)).where(column < current))) is not None:
+        start = period_start(oldest, period)
+        end = next_period(start, period)
+        target = partition_table(spec, partition_name(spec.table.name, start, period))
+        target.create(connection, checkfirst=True)
+        window = (column >= start, column < end)
+        connection.execute(insert(target).from_select(
+            [c.name for c in spec.table.columns], select(spec.table).where(*window)
+        ))
+        moved += connection.execute(delete(spec.table).where(*window)).rowcount
+    return moved
+
+
+# ================= AGRÉGATION / RÉTENTION =================
+def is_rolled_up(connection, spec: PartitionSpec, partition: Partition) -> bool:
+    jour = spec.rollup.c.jour
+    return connection.scalar(
+        select(literal(1)).where(jour >= partition.start.date(), jour < partition.end.date()).limit(1)
+    ) is not None
+
+
+def rollup_partition(connection, spec: PartitionSpec, partition: Partition) -> None:
+    """(Re)calcule les agrégats journaliers de la partition ; idempotent."""
+    source = partition_table(spec, partition.name)
+    jour = func.date(source.c[spec.column])
+    dimensions = [source.c[d] for d in spec.dimensions]
+    connection.execute(delete(spec.rollup).where(
+        spec.rollup.c.jour >= partition.start.date(), spec.rollup.c.jour < partition.end.date()
+    ))
+    connection.execute(insert(spec.rollup).from_select(
+        ["jour", *spec.dimensions, "nombre"],
+        select(jour, *dimensions, func.count())
+        .where(source.c[spec.column].is_not(None))
+        .group_by(jour, *dimensions),
+    ))
+
+
+def drop_partition(connection, partition: Partition) -> None:
+    # Sous PostgreSQL, DROP TABLE détache aussi la partition de sa table parente
+    connection.execute(text(f'DROP TABLE "{partition.name}"'))
+
+
+def maintain(connection, spec: PartitionSpec, now: datetime, period: str = LOG_PARTITION_PERIOD,
+             ahead: int = LOG_PARTITIONS_AHEAD, rollup_after_days: int = LOG_ROLLUP_AFTER_DAYS,
+             retention_days: int = LOG_RETENTION_DAYS) -> dict:
+    report = {"created": [], "archived_rows": 0, "rolled_up": [], "dropped": []}
+    if _is_postgres(connection):
+        if not is_partitioned(connection, spec):
+            # Conversion automatique seulement si elle est gratuite ; sinon, passer par la CLI
+            if connection.scalar(select(literal(1)).select_from(spec.table).limit(1)) is not None:
+                logger.warning("%s n'est pas partitionnée : lancer `python -m scripts.partitions init`",
+                               spec.table.name)
+                return report
+            convert_to_partitioned(connection, spec, now, period)
+        report["created"] = ensure_partitions(connection, spec, now, period, ahead)
+    else:
+        report["archived_rows"] = archive_closed_periods(connection, spec, now, period)
+
+    rollup_before = now - timedelta(days=rollup_after_days)
+    drop_before = now - timedelta(days=retention_days)
+    for partition in list_partitions(connection, spec):
+        if partition.end <= drop_before:
+            rollup_partition(connection, spec, partition)
+            drop_partition(connection, partition)
+            report["dropped"].append(partition.name)
+        elif partition.end <= rollup_before and not is_rolled_up(connection, spec, partition):
+            rollup_partition(connection, spec, partition)
+            report["rolled_up"].append(partition.name)
+    return report
+
+
+def run_maintenance(engine=default_engine, now: datetime | None = None, **options) -> dict:
+    now = now or datetime.utcnow()
+    with engine.begin() as connection:
+        # Plusieurs workers peuvent planifier la maintenance : un seul l'exécute
+        if _is_postgres(connection) and not connection.scalar(
+                text("SELECT pg_try_advisory_xact_lock(hashtext('log_partitioning'))")):
+            return {"skipped": True}
+        return {name: maintain(connection, spec, now, **options) for name, spec in SPECS.items()}
+
+
+class PartitionMaintenance:
+    def __init__(self, engine=default_engine, interval_s: int = LOG_MAINTENANCE_INTERVAL_S):
+        if LOG_PARTITION_PERIOD not in PERIODS:
+            raise ValueError(f"LOG_PARTITION_PERIOD invalide: {LOG_PARTITION_PERIOD}")
+        self.engine = engine
+        self.interval = interval_s
+        self.last_report: dict | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.last_report = run_maintenance(self.engine)
+            except Exception:
+                logger.exception("Échec de la maintenance des partitions de logs")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="log-partitions", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+partition_maintenance = PartitionMaintenance()
+
+
+# ================= REQUÊTES =================
+def _sources(connection, spec: PartitionSpec, since: datetime | None, until: datetime | None) -> list:
+    """Tables à interroger pour la fenêtre, de la plus récente à la plus ancienne.
+
+    Sous PostgreSQL la table parente suffit (élagage natif) ; sous SQLite, la table de base
+    plus les tables de période dont la plage recoupe la fenêtre.
+    """
+    sources = [(spec.table, None)]
+    if _is_postgres(connection):
+        return sources
+    for partition in reversed(list_partitions(connection, spec)):
+        if (until is None or partition.start < until) and (since is None or partition.end > since):
+            sources.append((partition_table(spec, partition.name), partition.end))
+    return sources
+
+
+def _windowed(connection, spec: PartitionSpec, filters, since: datetime | None, until: datetime | None,
+              limit: int) -> list[dict]:
+    rows: list[dict] = []
+    for source, upper in _sources(connection, spec, since, until):
+        # Les sources suivantes sont plus anciennes que tout ce qui est déjà retenu
+        if len(rows) >= limit and upper is not None and upper <= rows[limit - 1][spec.column]:
+            break
+        column = source.c[spec.column]
+        stmt = select(source).where(column.is_not(None), *filters(source))
+        if since is not None:
+            stmt = stmt.where(column >= since)
+        if until is not None:
+            stmt = stmt.where(column < until)
+        stmt = stmt.order_by(column.desc(), source.c.id.desc()).limit(limit)
+        rows.extend(dict(row) for row in connection.execute(stmt).mappings())
+        rows.sort(key=lambda r: (r[spec.column], r["id"]), reverse=True)
+    return rows[:limit]
+
+
+def keyset_page(connection, spec: PartitionSpec, columns: list[str], filters, cursor: str | None,
+                limit: int) -> Page:
+    """Page keyset (horodatage, id) décroissante sur la table de base et ses tables de période.
+
+    Chaque source recoupant la fenêtre du curseur donne au plus `limit + 1` lignes, réunies
+    par UNION ALL puis triées : même résultat que `paginate` sur une table non découpée.
+    """
+    until = None
+    if cursor:
+        # Borne incluse : une ligne à l'horodatage exact du curseur peut encore suivre
+        until = decode_cursor(cursor)[0] + timedelta(microseconds=1)
+    pages = []
+    for source, _ in _sources(connection, spec, None, until):
+        stmt = select(*[source.c[name] for name in columns]).where(*filters(source))
+        pages.append(select(apply_keyset(stmt, source.c[spec.column], source.c.id, cursor, limit).subquery()))
+    merged = union_all(*pages).subquery() if len(pages) > 1 else pages[0].subquery()
+    stmt = select(merged).order_by(merged.c[spec.column].desc(), merged.c.id.desc()).limit(limit + 1)
+    rows = [dict(row) for row in connection.execute(stmt).mappings()]
+    return build_page(rows, spec.column, "id", limit)
+
+
+def entity_history(connection, entity_type: str, entity_id: int, since: datetime | None = None,
+                   until: datetime | None = None, limit: int = 100) -> list[dict]:
+    return _windowed(
+        connection, SPECS["audit_log"],
+        lambda t: (t.c.entityType == entity_type, t.c.entityId == entity_id),
+        since, until, limit,
+    )
+
+
+def recent_errors(connection, minutes: int = 60, niveaux: tuple[str, ...] = NIVEAUX_ERREUR,
+                  source: str | None = None, limit: int = 100, now: datetime | None = None) -> list[dict]:
+    since = (now or datetime.utcnow()) - timedelta(minutes=minutes)
+
+    def filters(t):
+        conditions = [t.c.niveau.in_(niveaux)]
+        if source is not None:
+            conditions.append(t.c.source == source)
+        return conditions
+
+    return _windowed(connection, SPECS["log_systems"], filters, since, None, limit)
@@ -0,0 +1,242 @@
+"""Réplicas en lecture : routage des sessions, suivi du retard, repli sur le primaire.
+
+REPLICA_DATABASE_URL (une ou plusieurs URL séparées par des virgules) déclare les réplicas.
+Les routes de lecture lourde (historique, statistiques, logs, exports) prennent leur session
+via `get_async_read_db` ; tout le reste, et toute écriture, reste sur le primaire :
+- `RoutingSession` envoie flush et INSERT / UPDATE / DELETE au primaire même depuis une
+  session de lecture ; seules les lectures partent sur le réplica choisi ;
+- lire ses propres écritures : après une requête d'écriture réussie, le client reçoit un
+  cookie qui l'envoie sur le primaire pendant READ_YOUR_WRITES_SECONDS (l'en-tête
+  `X-Read-Primary: 1` force aussi le primaire) ;
+- retard : un thread écrit un battement (table replication_heartbeat) sur le primaire toutes
+  les REPLICA_CHECK_SECONDS et le relit sur chaque réplica. Un réplica qui n'a pas encore
+  rejoué le dernier battement écrit a un retard égal à l'âge du battement qu'il voit ; au-delà
+  de REPLICA_MAX_LAG_SECONDS, ou injoignable, il est écarté et les lectures vont au primaire.
+
+Sans réplica configuré, `get_async_read_db` est équivalent à `get_async_db`.
+En local, deux fichiers SQLite suffisent : `python -m scripts.replicas sync` recopie le
+primaire sur les réplicas SQLite (réplication simulée), `status` affiche leur retard.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from dotenv import load_dotenv
+from fastapi import Request
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from db.database import AsyncSessionLocal, async_engine, engine, pool_options, to_async_url
+from models.log_systems import HeartbeatReplication
+
+# ================= CONFIG =================
+load_dotenv()
+REPLICA_DATABASE_URLS = [url.strip() for url in os.getenv("REPLICA_DATABASE_URL", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", 1))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 10))
+
+PRIMARY_COOKIE = "lecture_primaire"
+PRIMARY_HEADER = "x-read-primary"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+HEARTBEAT_ID = 1
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Replica:
+    name: str
+    url: str
+    engine: Engine
+    async_engine: AsyncEngine
+    lag: float | None = None  # None : pas encore mesuré, ou injoignable
+    reads: int = 0
+
+
+class RoutingSession(Session):
+    """Lectures sur le moteur de `info["replica"]` s'il est défini, écritures sur le primaire."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or getattr(clause, "is_dml", False):
+            return super().get_bind(mapper, clause, **kw)
+        return replica
+
+
+# ================= BATTEMENT =================
+def write_heartbeat(connection, now: datetime):
+    if connection.execute(update(HeartbeatReplication).where(HeartbeatReplication.id == HEARTBEAT_ID)
+                          .values(horodatage=now)).rowcount == 0:
+        connection.execute(HeartbeatReplication.__table__.insert().values(id=HEARTBEAT_ID, horodatage=now))
+
+
+def read_heartbeat(connection) -> datetime | None:
+    return connection.scalar(select(HeartbeatReplication.horodatage).where(HeartbeatReplication.id == HEARTBEAT_ID))
+
+
+# ================= ROUTEUR =================
+class ReplicaRouter:
+    def __init__(self, primary: Engine = engine, urls: list[str] = REPLICA_DATABASE_URLS,
+                 max_lag: float = REPLICA_MAX_LAG_SECONDS, interval: float = REPLICA_CHECK_SECONDS):
+        self.primary = primary
+        self.max_lag = max_lag
+        self.interval = interval
+        self.replicas = [
+            Replica(f"replica{i}", url, create_engine(url, **pool_options(url)),
+                    create_async_engine(to_async_url(url), **pool_options(to_async_url(url))))
+            for i, url in enumerate(urls)
+        ]
+        self.primary_reads = 0  # aucun réplica assez à jour
+        self.read_your_writes = 0
+        self._last_written: datetime | None = None
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, prefer_primary: bool = False) -> Replica | None:
+        """Un réplica dont le retard mesuré est acceptable (tourniquet), sinon None : primaire."""
+        if not self.replicas:
+            return None
+        fresh = [replica for replica in self.replicas if replica.lag is not None and replica.lag <= self.max_lag]
+        with self._lock:
+            if prefer_primary:
+                self.read_your_writes += 1
+                return None
+            if not fresh:
+                self.primary_reads += 1
+                return None
+            replica = fresh[next(self._round_robin) % len(fresh)]
+            replica.reads += 1
+        return replica
+
+    def check(self) -> dict:
+        """Mesure le retard de chaque réplica, puis écrit un nouveau battement sur le primaire."""
+        now = datetime.utcnow()
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    seen = read_heartbeat(connection)
+            except Exception as e:
+                if replica.lag is not None:
+                    logger.warning("Réplica %s injoignable : %s", replica.name, e)
+                replica.lag = None
+                continue
+            if seen is None:
+                replica.lag = None
+            elif self._last_written is not None and seen >= self._last_written:
+                replica.lag = 0.0  # a rejoué notre dernier battement, vieux d'au plus `interval`
+            else:
+                replica.lag = max(0.0, (now - seen).total_seconds())
+        with self.primary.begin() as connection:
+            write_heartbeat(connection, now)
+        self._last_written = now
+        return {replica.name: replica.lag for replica in self.replicas}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Échec de la mesure du retard des réplicas")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    async def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+            await replica.async_engine.dispose()
+
+    def stats(self) -> dict:
+        stats = {"max_lag_seconds": self.max_lag, "primary_reads": self.primary_reads,
+                 "read_your_writes": self.read_your_writes}
+        for replica in self.replicas:
+            # -1 : retard inconnu (jamais mesuré ou réplica injoignable)
+            stats[f"{replica.name}_lag_seconds"] = -1 if replica.lag is None else replica.lag
+            stats[f"{replica.name}_reads"] = replica.reads
+        return stats
+
+
+replica_router = ReplicaRouter()
+
+
+# ================= SESSIONS =================
+def wants_primary(request: Request) -> bool:
+    if request.headers.get(PRIMARY_HEADER, "").strip().lower() in ("1", "true"):
+        return True
+    until = request.cookies.get(PRIMARY_COOKIE, "")
+    return until.isdigit() and int(until) > time.time()
+
+
+def read_session(replica: Replica | None) -> AsyncSession:
+    if replica is None:
+        return AsyncSessionLocal()
+    return AsyncSession(bind=async_engine, sync_session_class=RoutingSession, autoflush=False,
+                        expire_on_commit=False, info={"replica": replica.async_engine.sync_engine})
+
+
+def read_engine() -> Engine:
+    """Moteur synchrone pour une lecture lourde hors requête (scripts, exports).
+
+    Hors de l'application, aucun thread ne mesure le retard : une mesure est faite ici d'abord.
+    """
+    if replica_router.enabled and replica_router._thread is None:
+        replica_router.check()
+    replica = replica_router.choose()
+    return replica.engine if replica is not None else engine
+
+
+async def get_async_read_db(request: Request):
+    """Session pour les routes en lecture seule : réplica assez à jour, sinon primaire."""
+    replica = replica_router.choose(prefer_primary=replica_router.enabled and wants_primary(request))
+    async with read_session(replica) as db:
+        yield db
+
+
+# ================= MIDDLEWARE =================
+class ReadYourWritesMiddleware:
+    """Après une requête d'écriture réussie, cookie qui renvoie le client sur le primaire."""
+
+    def __init__(self, app, window: int = READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (f"{PRIMARY_COOKIE}={int(time.time()) + self.window}; Max-Age={self.window}; "
+                          f"Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
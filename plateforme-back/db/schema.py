@@ -0,0 +1,240 @@
+"""Version du schéma et migrations explicites.
+
+Le démarrage de l'application ne fait plus de DDL : `check_schema` lit une seule ligne
+(`schema_version`) et refuse de démarrer si la base est en retard sur HEAD. Le DDL est
+fait par `python -m scripts.migrate` (ou au démarrage si DB_AUTO_MIGRATE=1) :
+
+- base vide : `create_all` du schéma courant, puis version = HEAD ;
+- base antérieure au versionnage (tables présentes, pas de `schema_version`) : version 1,
+  puis application des migrations suivantes ;
+- sinon : application des migrations de version > version courante.
+
+Chaque migration est idempotente (colonnes / index / tables créés seulement s'ils manquent)
+et toutes sont appliquées, avec la nouvelle version, dans une seule transaction.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, DateTime, Integer, Table, delete, func, inspect, select, text, update
+
+from db.database import Base
+
+# ================= CONFIG =================
+load_dotenv()
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+schema_version = Table(
+    "schema_version", Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("dateMaj", DateTime, default=datetime.utcnow),
+)
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable
+
+
+# ================= HELPERS =================
+def _tables(*names: str) -> list[Table]:
+    import models  # noqa: F401  (enregistre toutes les tables)
+    return [Base.metadata.tables[name] for name in names]
+
+
+def create_tables(connection, *names: str):
+    for table in _tables(*names):
+        table.create(connection, checkfirst=True)
+
+
+def add_columns(connection, table_name: str, *column_names: str):
+    table, = _tables(table_name)
+    existing = {c["name"] for c in inspect(connection).get_columns(table_name)}
+    for name in column_names:
+        if name not in existing:
+            column_type = table.c[name].type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN "{name}" {column_type}'))
+
+
+def create_indexes(connection, *table_names: str):
+    """Crée les index déclarés sur les modèles qui n'existent pas encore."""
+    for table in _tables(*table_names):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+# ================= MIGRATIONS =================
+def _log_partitioning(connection):
+    create_tables(connection, "audit_log_journalier", "log_systems_journalier")
+    create_indexes(connection, "audit_log")
+
+
+def _test_statistics(connection):
+    create_tables(connection, "statistique_test")
+    create_indexes(connection, "resultat_test")
+
+
+def _failure_clusters(connection):
+    create_tables(connection, "cluster_echec")
+    add_columns(connection, "resultat_test", "clusterEchecId")
+    create_indexes(connection, "resultat_test")
+
+
+def _fulltext_indexes(connection):
+    # Index GIN déclarés avec ddl_if(dialect="postgresql") : rien n'est créé sous SQLite
+    create_indexes(connection, "userstory", "test", "scenario_test", "anomalie")
+
+
+def _screenshot_store(connection):
+    add_columns(connection, "resultat_test", "captureEcranHash")
+    create_indexes(connection, "resultat_test")
+
+
+def _unique_rapports(connection):
+    """Un RapportQA par sprint, un IndicateurQualite par rapport.
+
+    Les doublons créés par des ingestions concurrentes sont fusionnés dans le plus ancien
+    rapport (celui que lit le tableau de bord), puis les compteurs des sprints concernés
+    sont recalculés depuis les tables sources.
+    """
+    from sqlalchemy.orm import Session
+
+    from models.rapports import IndicateurQualite, RapportQA, RecommandationQualite
+    from services.rapport_aggregation import rebuild
+
+    keepers = dict(connection.execute(
+        select(RapportQA.sprintId, func.min(RapportQA.id)).where(RapportQA.sprintId.is_not(None))
+        .group_by(RapportQA.sprintId).having(func.count() > 1)
+    ).all())
+    for sprint_id, keeper in keepers.items():
+        duplicates = select(RapportQA.id).where(RapportQA.sprintId == sprint_id, RapportQA.id != keeper)
+        connection.execute(update(RecommandationQualite).where(RecommandationQualite.rapportId.in_(duplicates))
+                           .values(rapportId=keeper))
+        connection.execute(delete(IndicateurQualite).where(IndicateurQualite.rapportId.in_(duplicates)))
+        connection.execute(delete(RapportQA).where(RapportQA.id.in_(duplicates)))
+
+    first_indicateurs = (select(func.min(IndicateurQualite.id)).where(IndicateurQualite.rapportId.is_not(None))
+                         .group_by(IndicateurQualite.rapportId))
+    connection.execute(delete(IndicateurQualite).where(IndicateurQualite.rapportId.is_not(None),
+                                                       IndicateurQualite.id.not_in(first_indicateurs)))
+    create_indexes(connection, "rapport_qa", "indicateur_qualite")
+    if keepers:
+        rebuild(Session(bind=connection), list(keepers))
+
+
+def _log_ids_autoincrement(connection):
+    from db.partitioning import SPECS, ensure_autoincrement
+
+    for spec in SPECS.values():
+        ensure_autoincrement(connection, spec)
+
+
+def _cluster_anomalie_fk(connection):
+    # La contrainte, désormais nommée (use_alter), portait le nom par défaut de PostgreSQL
+    if connection.dialect.name != "postgresql":
+        return
+    names = {fk["name"] for fk in inspect(connection).get_foreign_keys("cluster_echec")}
+    if "cluster_echec_anomalieId_fkey" in names and "fk_cluster_echec_anomalie" not in names:
+        connection.execute(text('ALTER TABLE cluster_echec RENAME CONSTRAINT "cluster_echec_anomalieId_fkey" '
+                                'TO fk_cluster_echec_anomalie'))
+
+
+# Version 1 : schéma initial (tables créées par create_all avant le versionnage)
+MIGRATIONS = [
+    Migration(2, "Version des permissions RBAC (jetons à masque compilé)",
+              lambda c: create_tables(c, "permission_version")),
+    Migration(3, "Journaux de ResultatTest stockés hors ligne",
+              lambda c: add_columns(c, "resultat_test", "messageErreurHash", "messageErreurTaille",
+                                    "logsHash", "logsTaille")),
+    Migration(4, "Index de pagination par curseur",
+              lambda c: create_indexes(c, "execution_test", "anomalie", "notification", "log_systems", "audit_log")),
+    Migration(5, "Historique d'entité et agrégats journaliers des logs", _log_partitioning),
+    Migration(6, "Statistiques d'historique par test", _test_statistics),
+    Migration(7, "Clusters d'échecs quasi identiques (MinHash / LSH)", _failure_clusters),
+    Migration(8, "Index de recherche plein texte (tsvector / GIN)", _fulltext_indexes),
+    Migration(9, "Instantanés de tableau de bord par sprint",
+              lambda c: create_tables(c, "tableau_bord_sprint")),
+    Migration(10, "Captures d'écran dédupliquées (store adressé par contenu)", _screenshot_store),
+    Migration(11, "File d'exécution des tests automatisés",
+              lambda c: create_tables(c, "tache_execution")),
+    Migration(12, "Battement de réplication (retard des réplicas en lecture)",
+              lambda c: create_tables(c, "replication_heartbeat")),
+    Migration(13, "Un rapport QA par sprint (index unique)", _unique_rapports),
+    Migration(14, "Ids des logs jamais réutilisés après archivage (SQLite AUTOINCREMENT)",
+              _log_ids_autoincrement),
+    Migration(15, "Contrainte cluster_echec -> anomalie nommée (cycle de clés étrangères)",
+              _cluster_anomalie_fk),
+]
+
+HEAD = MIGRATIONS[-1].version if MIGRATIONS else 1
+
+
+def current_version(connection) -> int | None:
+    """Version enregistrée, ou None si la table de version n'existe pas."""
+    if not inspect(connection).has_table(schema_version.name):
+        return None
+    return connection.scalar(select(schema_version.c.version).where(schema_version.c.id == 1))
+
+
+def _stamp(connection, version: int):
+    updated = connection.execute(
+        schema_version.update().where(schema_version.c.id == 1)
+        .values(version=version, dateMaj=datetime.utcnow())
+    ).rowcount
+    if not updated:
+        connection.execute(schema_version.insert().values(id=1, version=version, dateMaj=datetime.utcnow()))
+
+
+def migrate(engine) -> list[int]:
+    """Amène la base à HEAD en une transaction ; renvoie les versions appliquées."""
+    import models  # noqa: F401  (enregistre toutes les tables)
+
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # Plusieurs workers avec DB_AUTO_MIGRATE : un seul applique, les autres attendent
+            connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_version'))"))
+        version = current_version(connection)
+        if version is None:
+            schema_version.create(connection, checkfirst=True)
+            if not inspect(connection).has_table("utilisateur"):
+                Base.metadata.create_all(connection)
+                _stamp(connection, HEAD)
+                return [HEAD]
+            version = 1
+
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            logger.info("Migration %d : %s", migration.version, migration.description)
+            migration.upgrade(connection)
+            applied.append(migration.version)
+        _stamp(connection, max(version, HEAD))
+        return applied
+
+
+def check_schema(connection) -> int:
+    """Contrôle de démarrage : une lecture d'une ligne, sans réflexion du schéma."""
+    try:
+        version = connection.scalar(select(schema_version.c.version).where(schema_version.c.id == 1))
+    except Exception as e:
+        connection.rollback()
+        raise SchemaOutdated("Schéma non initialisé : lancer `python -m scripts.migrate`") from e
+    if version is None or version < HEAD:
+        raise SchemaOutdated(f"Schéma en version {version}, attendu {HEAD} : lancer `python -m scripts.migrate`")
+    if version > HEAD:
+        # Déploiement progressif : l'ancien code tourne sur un schéma déjà migré (migrations additives)
+        logger.warning("Schéma en version %d, plus récent que le code (%d)", version, HEAD)
+    return version
@@ -1,23 +1,54 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from db.database import engine, get_db, Base
+from db.database import engine, async_engine, get_db
+from db.pagination import InvalidCursor
+from db.partitioning import LOG_PARTITIONING, partition_maintenance
+from db.replicas import ReadYourWritesMiddleware, replica_router
+from db.schema import DB_AUTO_MIGRATE, check_schema, migrate
 
 # Import all models to register them with SQLAlchemy
 from models import (
-    Utilisateur, Role, Permission,
+    Utilisateur, Role, Permission, PermissionVersion,
     Projet, Module, Epic, UserStory, Sprint,
     CahierDeTests, Test, TestUnitaire, TestAutomatise, TestManuel, ScenarioTest, ValidationTest,
-    ExecutionTest, ResultatTest,
+    ExecutionTest, ResultatTest, ClusterEchec, TacheExecution,
     Anomalie,
-    RapportQA, IndicateurQualite, RecommandationQualite,
+    RapportQA, IndicateurQualite, RecommandationQualite, TableauDeBordSprint,
     Notification, TypeNotification,
-    LogSystems, AuditLog
+    LogSystems, AuditLog, AuditLogJournalier, LogSystemsJournalier, HeartbeatReplication,
+    StatistiqueTest
 )
 
 # Import routes
 from routes.auth import router as auth_router
+from routes.executions import router as executions_router
+from routes.resultats import router as resultats_router
+from routes.projets import router as projets_router
+from routes.anomalies import router as anomalies_router
+from routes.notifications import router as notifications_router
+from routes.logs import router as logs_router
+from routes.metrics import router as metrics_router
+from routes.statistiques import router as statistiques_router
+from routes.selection import router as selection_router
+from routes.clusters import router as clusters_router
+from routes.recherche import router as recherche_router
+from routes.tableau_bord import router as tableau_bord_router
+from routes.captures import router as captures_router
+from routes.taches import router as taches_router
+from services.captures import screenshot_store, thumbnailer
+from services.clusters_echec import failure_index
+from services.recherche import search_index
+from services.tableau_bord import snapshot_stats
+from services.log_writer import log_writer
+from services.password_hashing import password_hasher
+from services.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, register_stats
+from services.notifications import notification_hub, unread_counters
+from services.principal_cache import principal_cache
+from services.query_diagnostics import QUERY_DIAGNOSTICS, QueryDiagnosticsMiddleware
+from services.query_diagnostics import instrument_engine as instrument_diagnostics
 
 app = FastAPI(
     title="Plateforme Intelligente Tests Logiciels",
@@ -26,25 +57,44 @@ app = FastAPI(
 )
 
 
-# 🔹 Initialize database and create tables on startup
+# 🔹 Check the schema version on startup (DDL is done by `python -m scripts.migrate`)
 @app.on_event("startup")
 def startup():
     try:
-        # Test database connection
+        if DB_AUTO_MIGRATE:
+            migrate(engine)
         with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))
+            version = check_schema(connection)
         print("✓ Database connection successful!")
-        print(f"✓ Connected to: {engine.url.database}")
-        
-        # Create all tables (will only create new ones, skip existing)
-        Base.metadata.create_all(bind=engine)
-        print("✓ All database tables created successfully!")
+        print(f"✓ Connected to: {engine.url.database} (schema v{version})")
+
+        # Background flusher for audit / system log rows
+        log_writer.start()
+
+        # Periodic creation / rollup / retention of audit and system log partitions
+        if LOG_PARTITIONING:
+            partition_maintenance.start()
+
+        # Replica lag measurement (heartbeat written on the primary, read back on each replica)
+        replica_router.start()
         
     except Exception as e:
         print(f"✗ Database initialization failed: {e}")
         raise
 
 
+# 🔹 Release background executors and pooled connections on shutdown
+@app.on_event("shutdown")
+async def shutdown():
+    password_hasher.shutdown()
+    thumbnailer.shutdown()
+    log_writer.stop()
+    partition_maintenance.stop()
+    replica_router.stop()
+    await replica_router.dispose()
+    await async_engine.dispose()
+
+
 # 🔹 Simple test route
 @app.get("/")
 def read_root():
@@ -53,6 +103,63 @@ def read_root():
 
 # 🔹 Include routers
 app.include_router(auth_router)
+app.include_router(executions_router)
+app.include_router(resultats_router)
+app.include_router(projets_router)
+app.include_router(anomalies_router)
+app.include_router(notifications_router)
+app.include_router(logs_router)
+app.include_router(statistiques_router)
+app.include_router(selection_router)
+app.include_router(clusters_router)
+app.include_router(recherche_router)
+app.include_router(tableau_bord_router)
+app.include_router(captures_router)
+app.include_router(taches_router)
+
+
+# 🔹 Request / SQL / pool instrumentation exposed on /metrics
+if METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+    register_stats("audit_buffer", log_writer.metrics)
+    register_stats("password_hasher", password_hasher.stats)
+    register_stats("principal_cache", principal_cache.stats)
+    register_stats("notification_hub", notification_hub.stats)
+    register_stats("notification_unread_counters", unread_counters.stats)
+    register_stats("failure_clusters", failure_index.stats)
+    register_stats("search_index", search_index.stats)
+    register_stats("dashboard_snapshots", snapshot_stats.stats)
+    register_stats("screenshot_store", screenshot_store.stats)
+    register_stats("thumbnailer", thumbnailer.stats)
+    for replica in replica_router.replicas:
+        instrument_engine(replica.engine, f"{replica.name}_sync")
+        instrument_engine(replica.async_engine.sync_engine, f"{replica.name}_async")
+    if replica_router.enabled:
+        register_stats("replicas", replica_router.stats)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+
+# 🔹 Slow-query / N+1 detection (QUERY_DIAGNOSTICS=header|on), findings go to LogSystems
+if QUERY_DIAGNOSTICS != "off":
+    instrument_diagnostics(engine)
+    instrument_diagnostics(async_engine.sync_engine)
+    for replica in replica_router.replicas:
+        instrument_diagnostics(replica.async_engine.sync_engine)
+    app.add_middleware(QueryDiagnosticsMiddleware)
+
+
+# 🔹 Read-only routes use replicas (REPLICA_DATABASE_URL); after a write, the client reads the primary
+if replica_router.enabled:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+
+# 🔹 Malformed pagination cursors are a client error
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 
 # 🔹 Test DB route
 @app.get("/test-db")
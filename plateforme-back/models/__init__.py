@@ -1,18 +1,20 @@
 # Import all models for easy access
-from models.user import Utilisateur, Role, Permission
+from models.user import Utilisateur, Role, Permission, PermissionVersion
 from models.scrum import Projet, Module, Epic, UserStory, Sprint
 from models.tests import CahierDeTests, Test, TestUnitaire, TestAutomatise, TestManuel, ScenarioTest, ValidationTest
-from models.execution import ExecutionTest, ResultatTest
+from models.execution import ExecutionTest, ResultatTest, ClusterEchec, TacheExecution
 from models.anomalie import Anomalie
-from models.rapports import RapportQA, IndicateurQualite, RecommandationQualite
+from models.rapports import RapportQA, IndicateurQualite, RecommandationQualite, TableauDeBordSprint
 from models.notification import Notification, TypeNotification
-from models.log_systems import LogSystems, AuditLog
+from models.log_systems import LogSystems, AuditLog, AuditLogJournalier, LogSystemsJournalier, HeartbeatReplication
+from models.statistiques import StatistiqueTest
 
 __all__ = [
     # User models
     "Utilisateur",
     "Role",
     "Permission",
+    "PermissionVersion",
     # Scrum models
     "Projet",
     "Module",
@@ -30,16 +32,24 @@ __all__ = [
     # Execution models
     "ExecutionTest",
     "ResultatTest",
+    "ClusterEchec",
+    "TacheExecution",
     # Anomalie models
     "Anomalie",
     # Rapport models
     "RapportQA",
     "IndicateurQualite",
     "RecommandationQualite",
+    "TableauDeBordSprint",
     # Notification models
     "Notification",
     "TypeNotification",
     # Log models
     "LogSystems",
     "AuditLog",
+    "AuditLogJournalier",
+    "LogSystemsJournalier",
+    "HeartbeatReplication",
+    # Statistiques models
+    "StatistiqueTest",
 ]
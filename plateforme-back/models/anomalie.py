@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
+from db.fulltext import fulltext_index
 
 
 class Anomalie(Base):
@@ -25,3 +26,10 @@ class Anomalie(Base):
     reporter = relationship("Utilisateur", back_populates="anomalies_reportees", foreign_keys=[reporterId])
     assigned = relationship("Utilisateur", back_populates="anomalies_assignees", foreign_keys=[assignedTo])
 
+    # Pagination par curseur (db/pagination.py), recherche plein texte (PostgreSQL)
+    __table_args__ = (
+        Index("ix_anomalie_date_id", "dateCreation", "id"),
+        Index("ix_anomalie_severite_date_id", "severite", "dateCreation", "id"),
+        fulltext_index("ix_anomalie_fts", titre, description),
+    )
+
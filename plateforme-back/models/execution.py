@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from db.database import Base
 
@@ -20,20 +20,99 @@ class ExecutionTest(Base):
     executeur = relationship("Utilisateur", back_populates="executions", foreign_keys=[executeurId])
     resultat = relationship("ResultatTest", back_populates="execution", uselist=False, cascade="all, delete-orphan")
 
+    # Pagination par curseur (db/pagination.py)
+    __table_args__ = (
+        Index("ix_execution_test_date_id", "dateExecution", "id"),
+        Index("ix_execution_test_test_date_id", "test_id", "dateExecution", "id"),
+    )
+
 
 class ResultatTest(Base):
     __tablename__ = "resultat_test"
 
     id = Column(Integer, primary_key=True)
     statut = Column(String)
-    messageErreur = Column(Text)
-    logs = Column(Text)
-    captureEcran = Column(String)  # chemin vers le fichier
+    # Différés : au-delà de LOG_INLINE_MAX_BYTES ne contiennent qu'un aperçu,
+    # le texte complet est dans le store de logs (services/log_store.py)
+    messageErreur = deferred(Column(Text))
+    logs = deferred(Column(Text))
+    messageErreurHash = Column(String(64), nullable=True)
+    messageErreurTaille = Column(Integer, nullable=True)
+    logsHash = Column(String(64), nullable=True)
+    logsTaille = Column(Integer, nullable=True)
+    captureEcran = Column(String)  # chemin vers le fichier (ancien format)
+    captureEcranHash = Column(String(64), nullable=True)  # SHA-256 dans le store de captures
     commentaire = Column(Text)
 
     execution_id = Column(Integer, ForeignKey("execution_test.id"))
+    clusterEchecId = Column(Integer, ForeignKey("cluster_echec.id"), nullable=True)
 
     # Relations
     execution = relationship("ExecutionTest", back_populates="resultat")
     anomalies = relationship("Anomalie", back_populates="resultat", cascade="all, delete-orphan")
+    cluster_echec = relationship("ClusterEchec", back_populates="resultats")
+
+    # Jointure exécution -> verdict (rapports, statistiques)
+    __table_args__ = (
+        Index("ix_resultat_test_execution_id", "execution_id"),
+        Index("ix_resultat_test_cluster_id", "clusterEchecId", "id"),
+        Index("ix_resultat_test_capture_hash", "captureEcranHash"),
+    )
+
+
+# Échecs dont le message normalisé est quasi identique (services/clusters_echec.py)
+class ClusterEchec(Base):
+    __tablename__ = "cluster_echec"
+
+    id = Column(Integer, primary_key=True)
+    empreinte = Column(String(64), index=True)  # SHA-256 du message normalisé du premier échec
+    signature = Column(LargeBinary)  # MinHash : CLUSTER_NUM_PERM entiers uint32
+    messageNormalise = Column(Text)
+    nombreResultats = Column(Integer, default=0)
+    premiereOccurrence = Column(DateTime, default=datetime.utcnow)
+    derniereOccurrence = Column(DateTime, default=datetime.utcnow)
+
+    # Cycle anomalie -> resultat_test -> cluster_echec -> anomalie : contrainte ajoutée par ALTER
+    # après la création des tables (et retirée avant leur suppression)
+    anomalieId = Column(Integer, ForeignKey("anomalie.id", ondelete="SET NULL", use_alter=True,
+                                            name="fk_cluster_echec_anomalie"), nullable=True)
+
+    # Relations
+    resultats = relationship("ResultatTest", back_populates="cluster_echec")
+    anomalie = relationship("Anomalie")
+
+    __table_args__ = (
+        Index("ix_cluster_echec_derniere_id", "derniereOccurrence", "id"),
+    )
+
+
+
+# File d'exécution des tests automatisés, consommée par les workers (services/file_execution.py)
+class TacheExecution(Base):
+    __tablename__ = "tache_execution"
+
+    id = Column(Integer, primary_key=True)
+    statut = Column(String(16), default="EN_ATTENTE")  # EN_ATTENTE, EN_COURS, TERMINEE, ECHOUEE, ANNULEE
+    priorite = Column(Integer, default=0)  # la plus haute d'abord
+    parametres = Column(Text, nullable=True)  # JSON transmis au runner
+    tentatives = Column(Integer, default=0)
+    maxTentatives = Column(Integer, default=3)
+    disponibleA = Column(DateTime, default=datetime.utcnow)  # pas réclamée avant (backoff)
+    workerId = Column(String(128), nullable=True)
+    bailExpireA = Column(DateTime, nullable=True)  # sans heartbeat d'ici là, la tâche est reprise
+    derniereErreur = Column(Text, nullable=True)
+    dateCreation = Column(DateTime, default=datetime.utcnow)
+    dateDebut = Column(DateTime, nullable=True)
+    dateFin = Column(DateTime, nullable=True)
+
+    test_id = Column(Integer, ForeignKey("test.id", ondelete="CASCADE"))
+    demandeurId = Column(Integer, ForeignKey("utilisateur.id"), nullable=True)
+    executionId = Column(Integer, ForeignKey("execution_test.id", ondelete="SET NULL"), nullable=True)
 
+    __table_args__ = (
+        # Réclamation : tâches en attente par priorité puis ancienneté
+        Index("ix_tache_execution_file", "statut", "priorite", "disponibleA", "id"),
+        # Reprise des baux expirés
+        Index("ix_tache_execution_bail", "statut", "bailExpireA"),
+        Index("ix_tache_execution_creation_id", "dateCreation", "id"),
+    )
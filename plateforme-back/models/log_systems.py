@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
@@ -14,6 +14,14 @@ class LogSystems(Base):
     source = Column(String)
     details = Column(Text)
 
+    # Pagination par curseur (db/pagination.py)
+    __table_args__ = (
+        Index("ix_log_systems_date_id", "date_time", "id"),
+        Index("ix_log_systems_niveau_date_id", "niveau", "date_time", "id"),
+        # SQLite : ids jamais réutilisés quand l'archivage vide la table (db/partitioning.py)
+        {"sqlite_autoincrement": True},
+    )
+
 
 class AuditLog(Base):
     __tablename__ = "audit_log"
@@ -32,7 +40,41 @@ class AuditLog(Base):
     # Relations
     user = relationship("Utilisateur", back_populates="audit_logs", foreign_keys=[userId])
 
-    
+    # Pagination par curseur (db/pagination.py)
+    __table_args__ = (
+        Index("ix_audit_log_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_log_user_timestamp_id", "userId", "timestamp", "id"),
+        # Historique d'une entité (db/partitioning.py)
+        Index("ix_audit_log_entity_timestamp", "entityType", "entityId", "timestamp"),
+        # SQLite : ids jamais réutilisés quand l'archivage vide la table (db/partitioning.py)
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Agrégats journaliers conservés après purge des partitions expirées (db/partitioning.py)
+class AuditLogJournalier(Base):
+    __tablename__ = "audit_log_journalier"
+
+    id = Column(Integer, primary_key=True)
+    jour = Column(Date, index=True)
+    action = Column(String)
+    entityType = Column(String)
+    nombre = Column(Integer, default=0)
+
 
+class LogSystemsJournalier(Base):
+    __tablename__ = "log_systems_journalier"
 
+    id = Column(Integer, primary_key=True)
+    jour = Column(Date, index=True)
+    niveau = Column(String)
+    source = Column(String)
+    nombre = Column(Integer, default=0)
 
+
+# Battement écrit sur le primaire et relu sur chaque réplica pour en mesurer le retard (db/replicas.py)
+class HeartbeatReplication(Base):
+    __tablename__ = "replication_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    horodatage = Column(DateTime, default=datetime.utcnow)
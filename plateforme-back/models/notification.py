@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum as SQLEnum, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -31,3 +31,8 @@ class Notification(Base):
 
     # Relations
     destinataire = relationship("Utilisateur", back_populates="notifications", foreign_keys=[destinataireId])
+
+    # Pagination par curseur (db/pagination.py)
+    __table_args__ = (
+        Index("ix_notification_destinataire_date_id", "destinataireId", "dateEnvoi", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
@@ -23,6 +23,11 @@ class RapportQA(Base):
     indicateurs = relationship("IndicateurQualite", back_populates="rapport", uselist=False, cascade="all, delete-orphan")
     recommandations_qualite = relationship("RecommandationQualite", back_populates="rapport", cascade="all, delete-orphan")
 
+    # Un seul rapport par sprint : les compteurs incrémentaux ne doivent pas se répartir entre deux
+    __table_args__ = (
+        Index("ix_rapport_qa_sprint", "sprintId", unique=True),
+    )
+
 
 class IndicateurQualite(Base):
     __tablename__ = "indicateur_qualite"
@@ -40,6 +45,10 @@ class IndicateurQualite(Base):
     # Relations
     rapport = relationship("RapportQA", back_populates="indicateurs")
 
+    __table_args__ = (
+        Index("ix_indicateur_qualite_rapport", "rapportId", unique=True),
+    )
+
 
 class RecommandationQualite(Base):
     __tablename__ = "recommandation_qualite"
@@ -56,3 +65,17 @@ class RecommandationQualite(Base):
 
     # Relations
     rapport = relationship("RapportQA", back_populates="recommandations_qualite")
+
+
+class TableauDeBordSprint(Base):
+    __tablename__ = "tableau_bord_sprint"
+
+    sprintId = Column(Integer, ForeignKey("sprint.id", ondelete="CASCADE"), primary_key=True)
+    # Incrémentée dans la transaction de toute modification d'une donnée du sprint
+    generation = Column(Integer, nullable=False, default=0)
+    # Génération reflétée par `contenu` : l'instantané est à jour si elle vaut `generation`
+    generationContenu = Column(Integer, nullable=False, default=-1)
+    version = Column(Integer, nullable=False, default=0)
+    contenu = Column(LargeBinary)  # JSON sérialisé, servi tel quel
+    etag = Column(String(64))  # SHA-256 du contenu
+    dateCalcul = Column(DateTime)
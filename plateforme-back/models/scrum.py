@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Floa
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
+from db.fulltext import fulltext_index
 from db.associations import sprint_userstory
 
 
@@ -79,6 +80,11 @@ class UserStory(Base):
     sprints = relationship("Sprint", secondary=sprint_userstory, back_populates="userstories")
     cahier_tests = relationship("CahierDeTests", back_populates="userstory", uselist=False, cascade="all, delete-orphan")
 
+    # Recherche plein texte (PostgreSQL)
+    __table_args__ = (
+        fulltext_index("ix_userstory_fts", titre, description, criteresAcceptation),
+    )
+
 
 class Sprint(Base):
     __tablename__ = "sprint"
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, Boolean, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from db.database import Base
+
+
+class StatistiqueTest(Base):
+    __tablename__ = "statistique_test"
+
+    id = Column(Integer, primary_key=True)
+    dateCalcul = Column(DateTime, default=datetime.utcnow)
+    nombreExecutions = Column(Integer, default=0)
+    nombreEchecs = Column(Integer, default=0)
+    tauxEchec = Column(Float)
+    tauxBascule = Column(Float)  # part des exécutions dont le verdict diffère de la précédente
+    scoreInstabilite = Column(Float)  # 0 : stable (toujours vert ou toujours rouge), 1 : alterne à chaque exécution
+    serieEchecsMax = Column(Integer, default=0)
+    serieEchecsCourante = Column(Integer, default=0)
+    echecsRecents = Column(Integer, default=0)  # échecs parmi les STATS_RECENT_WINDOW dernières exécutions
+    dureeMoyenne = Column(Float)
+    dureeP50 = Column(Float)
+    dureeP95 = Column(Float)
+    regressionEchec = Column(Boolean, default=False)
+    regressionDuree = Column(Boolean, default=False)
+    derniereExecution = Column(DateTime)
+
+    testId = Column(Integer, ForeignKey("test.id", ondelete="CASCADE"))
+    sprintId = Column(Integer, ForeignKey("sprint.id", ondelete="CASCADE"), nullable=True)  # NULL : tout l'historique
+
+    # Relations
+    test = relationship("Test")
+    sprint = relationship("Sprint")
+
+    __table_args__ = (
+        Index("ix_statistique_test_test_sprint", "testId", "sprintId"),
+        Index("ix_statistique_test_sprint_score", "sprintId", "scoreInstabilite"),
+    )
@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Bool
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from db.database import Base
+from db.fulltext import fulltext_index
 
 
 class CahierDeTests(Base):
@@ -36,6 +37,11 @@ class Test(Base):
     validations = relationship("ValidationTest", back_populates="test", cascade="all, delete-orphan")
     executions = relationship("ExecutionTest", back_populates="test", cascade="all, delete-orphan")
 
+    # Recherche plein texte (PostgreSQL)
+    __table_args__ = (
+        fulltext_index("ix_test_fts", nom, description),
+    )
+
     __mapper_args__ = {
         "polymorphic_on": type,
         "polymorphic_identity": "test",
@@ -96,6 +102,11 @@ class ScenarioTest(Base):
     # Relations
     test = relationship("Test", back_populates="scenarios")
 
+    # Recherche plein texte (PostgreSQL)
+    __table_args__ = (
+        fulltext_index("ix_scenario_test_fts", nom, description),
+    )
+
 
 class ValidationTest(Base):
     __tablename__ = "validation_test"
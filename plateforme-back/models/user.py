@@ -71,3 +71,11 @@ class Permission(Base):
     # Relations
     roles = relationship("Role", secondary=role_permission, back_populates="permissions")
 
+
+# Ligne unique (id = 1) incrémentée à chaque changement de rôles / permissions
+class PermissionVersion(Base):
+    __tablename__ = "permission_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    dateMaj = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
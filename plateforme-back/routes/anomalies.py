@@ -0,0 +1,51 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from models.anomalie import Anomalie
+from models.execution import ExecutionTest, ResultatTest
+from routes.auth import require_permission
+from services.scope import tests_of_sprint
+
+router = APIRouter(
+    prefix="/anomalies",
+    tags=["anomalies"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+# ================= LISTING =================
+@router.get("")
+async def list_anomalies(db: db_dependency,
+                         user_id: Annotated[int, Depends(require_permission("anomalie", "read"))],
+                         severite: str | None = None,
+                         statut: str | None = None,
+                         sprint_id: int | None = None,
+                         test_id: int | None = None,
+                         assigned_to: int | None = None,
+                         reporter_id: int | None = None,
+                         cursor: str | None = None,
+                         limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    query = select(Anomalie.id, Anomalie.titre, Anomalie.severite, Anomalie.statut, Anomalie.priorite,
+                   Anomalie.dateCreation, Anomalie.dateResolution, Anomalie.resultat_id,
+                   Anomalie.reporterId, Anomalie.assignedTo)
+    if severite is not None:
+        query = query.where(Anomalie.severite == severite)
+    if statut is not None:
+        query = query.where(Anomalie.statut == statut)
+    if assigned_to is not None:
+        query = query.where(Anomalie.assignedTo == assigned_to)
+    if reporter_id is not None:
+        query = query.where(Anomalie.reporterId == reporter_id)
+    if sprint_id is not None or test_id is not None:
+        query = (query.join(ResultatTest, ResultatTest.id == Anomalie.resultat_id)
+                 .join(ExecutionTest, ExecutionTest.id == ResultatTest.execution_id))
+        if test_id is not None:
+            query = query.where(ExecutionTest.test_id == test_id)
+        if sprint_id is not None:
+            query = query.where(ExecutionTest.test_id.in_(tests_of_sprint(sprint_id)))
+    return await paginate(db, query, Anomalie.dateCreation, Anomalie.id, cursor, limit)
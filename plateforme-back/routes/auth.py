@@ -3,24 +3,28 @@ import os
 from typing import Annotated
 
 from dotenv import load_dotenv
-from passlib.context import CryptContext
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from db.database import get_db
+from db.database import get_async_db
 from models.user import Utilisateur
+from services.log_writer import log_writer
+from services.password_hashing import HasherSaturated, password_hasher
+from services.permissions import decode_mask, encode_mask, permission_registry
+from services.principal_cache import Principal, resolve_principal
 
 # ================= CONFIG =================
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/sign_in")
+oauth2_bearer_optional = OAuth2PasswordBearer(tokenUrl="auth/sign_in", auto_error=False)
 
 router = APIRouter(
     prefix="/auth",
@@ -39,13 +43,26 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+def client_info(http_request: Request) -> dict:
+    return {
+        "ipAddress": http_request.client.host if http_request.client else None,
+        "userAgent": http_request.headers.get("user-agent")
+    }
+
+def hasher_unavailable():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Service d'authentification saturé, réessayez plus tard",
+        headers={"Retry-After": "1"}
+    )
 
 # ================= SIGN UP =================
 @router.post("/sign_up", status_code=status.HTTP_201_CREATED)
-async def create_user(db: db_dependency, request: CreateUserRequest):
+async def create_user(db: db_dependency, request: CreateUserRequest, http_request: Request):
     # Check email unique
-    existing_user = db.query(Utilisateur).filter(Utilisateur.email == request.email).first()
+    existing_user = await db.scalar(select(Utilisateur).where(Utilisateur.email == request.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,17 +72,23 @@ async def create_user(db: db_dependency, request: CreateUserRequest):
     # bcrypt limite 72 bytes
     password = request.motDePasse[:72]
 
+    try:
+        hashed_password = await password_hasher.hash(password)
+    except HasherSaturated:
+        raise hasher_unavailable()
+
     new_user = Utilisateur(
         nom=request.nom,
         email=request.email,
-        motDePasse=bcrypt_context.hash(password),
+        motDePasse=hashed_password,
         telephone=request.telephone,
         role_id=request.role_id
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+
+    await log_writer.aaudit("SIGN_UP", "Utilisateur", new_user.id, userId=new_user.id, **client_info(http_request))
 
     return {
         "message": "Utilisateur créé avec succès",
@@ -74,60 +97,109 @@ async def create_user(db: db_dependency, request: CreateUserRequest):
     }
 
 # ================= AUTH =================
-def authenticate_user(email: str, password: str, db: db_dependency):
-    user = db.query(Utilisateur).filter(Utilisateur.email == email).first()
+async def authenticate_user(email: str, password: str, db: db_dependency):
+    user = await db.scalar(select(Utilisateur).where(Utilisateur.email == email))
     if not user:
         return False
 
     # même fix 72 bytes
     password = password[:72]
 
-    if not bcrypt_context.verify(password, user.motDePasse):
+    if not await password_hasher.verify(password, user.motDePasse):
         return False
     return user
 
-def create_access_token(user_id: int, expires_delta: timedelta):
+def create_access_token(user_id: int, expires_delta: timedelta,
+                        perm_version: int | None = None, perm_mask: int | None = None):
     encode = {"sub": str(user_id)}
+    # Masque RBAC compilé, vérifiable sans accès DB tant que la version ne change pas
+    if perm_version is not None and perm_mask is not None:
+        encode.update({"pv": perm_version, "pm": encode_mask(perm_mask)})
     expire = datetime.utcnow() + expires_delta
     encode.update({"exp": expire})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 # ================= SIGN IN =================
 @router.post("/sign_in", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(),
-                db: Session = Depends(get_db)):
-    user = authenticate_user(form_data.username, form_data.password, db)
+async def login(http_request: Request,
+                form_data: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_async_db)):
+    try:
+        user = await authenticate_user(form_data.username, form_data.password, db)
+    except HasherSaturated:
+        raise hasher_unavailable()
 
     if not user:
+        await log_writer.alog("WARNING", "Échec de connexion", source="auth/sign_in",
+                             details={"email": form_data.username, **client_info(http_request)})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect"
         )
 
-    token = create_access_token(user.id, timedelta(days=30))
+    principal = await resolve_principal(db, user.id)
+    compiled = await permission_registry.current(db)
+    token = create_access_token(
+        user.id,
+        timedelta(days=30),
+        perm_version=compiled.version,
+        perm_mask=compiled.mask_for_roles(principal.role_ids)
+    )
+    await log_writer.aaudit("SIGN_IN", "Utilisateur", user.id, userId=user.id, **client_info(http_request))
     return {"access_token": token, "token_type": "bearer"}
 
 # ================= CURRENT USER =================
-async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+async def get_token_payload(token: Annotated[str, Depends(oauth2_bearer)]) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token invalide")
-        return int(user_id)
     except JWTError:
         raise HTTPException(status_code=401, detail="Token invalide")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Token invalide")
+    return payload
 
-@router.get("/me")
-async def get_me(db: db_dependency, user_id: Annotated[int, Depends(get_current_user)]):
-    user = db.query(Utilisateur).filter(Utilisateur.id == user_id).first()
-    if not user:
+async def get_current_user(payload: Annotated[dict, Depends(get_token_payload)]):
+    return int(payload["sub"])
+
+# EventSource ne peut pas envoyer d'en-tête Authorization : jeton accepté aussi en paramètre
+async def get_stream_user(token: Annotated[str | None, Depends(oauth2_bearer_optional)],
+                          access_token: str | None = None) -> int:
+    payload = await get_token_payload(token or access_token or "")
+    return int(payload["sub"])
+
+async def get_current_principal(db: db_dependency,
+                                user_id: Annotated[int, Depends(get_current_user)]) -> Principal:
+    principal = await resolve_principal(db, user_id)
+    if principal is None:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    return principal
 
+@router.get("/me")
+async def get_me(principal: Annotated[Principal, Depends(get_current_principal)]):
     return {
-        "id": user.id,
-        "nom": user.nom,
-        "email": user.email,
-        "telephone": user.telephone,
-        "role_id": user.role_id
-    }
\ No newline at end of file
+        "id": principal.id,
+        "nom": principal.nom,
+        "email": principal.email,
+        "telephone": principal.telephone,
+        "role_id": principal.role_id
+    }
+
+# ================= PERMISSIONS =================
+def require_permission(resource: str, action: str):
+    async def checker(db: db_dependency, payload: Annotated[dict, Depends(get_token_payload)]) -> int:
+        user_id = int(payload["sub"])
+        compiled = await permission_registry.current(db)
+
+        # Chemin rapide : masque du token compilé pour la version courante
+        if payload.get("pv") == compiled.version and "pm" in payload:
+            if compiled.allows(decode_mask(payload["pm"]), resource, action):
+                return user_id
+            raise HTTPException(status_code=403, detail="Permission refusée")
+
+        # Token émis avant le dernier changement RBAC : vérification en base
+        principal = await resolve_principal(db, user_id)
+        if principal is None or not principal.has_permission(resource, action):
+            raise HTTPException(status_code=403, detail="Permission refusée")
+        return user_id
+
+    return checker
@@ -0,0 +1,102 @@
+import os
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import Response
+from starlette import status
+
+from routes.auth import require_permission
+from services.captures import (SCREENSHOT_MAX_BYTES, StoredScreenshot, UnsupportedMediaType, UploadTooLarge,
+                               is_digest, receive, screenshot_store, thumbnailer)
+from services.http_range import FileRangeResponse, RangeNotSatisfiable, etag_matches, parse_range
+
+router = APIRouter(
+    prefix="/captures",
+    tags=["captures"]
+)
+
+# Contenu adressé par son hash : une URL ne change jamais de contenu
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"
+# Miniature pas encore calculée : la capture d'origine est servie, à redemander plus tard
+CACHE_REVALIDATE = "private, no-cache"
+
+# ================= ENVOI =================
+async def store_upload(request: Request) -> StoredScreenshot:
+    """Corps brut de la requête (image PNG, JPEG, GIF ou WebP) -> store, miniature planifiée."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > SCREENSHOT_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Capture trop volumineuse (max {SCREENSHOT_MAX_BYTES} octets)")
+    try:
+        stored = await receive(request.stream())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    thumbnailer.submit(stored.digest)
+    return stored
+
+
+def describe(stored: StoredScreenshot) -> dict:
+    return {"hash": stored.digest, "taille": stored.size, "media_type": stored.media_type,
+            "existant": stored.existing}
+
+# Envoi seul : le hash est ensuite référencé par l'ingestion (captureEcranHash)
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def upload_capture(request: Request,
+                         user_id: Annotated[int, Depends(require_permission("execution", "create"))]):
+    return describe(await store_upload(request))
+
+# ================= LECTURE =================
+def serve_file(path: str, etag: str, media_type: str, cache_control: str,
+               range_header: str | None, if_none_match: str | None) -> Response:
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{etag}"', "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Capture introuvable")
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    start, end = byte_range or (0, size - 1)
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(path, start, end, status_code=status_code, headers=headers, media_type=media_type)
+
+
+def _existing_digest(digest: str) -> str:
+    if not is_digest(digest) or not screenshot_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Capture introuvable")
+    return digest
+
+@router.get("/{digest}")
+async def get_capture(digest: str,
+                      user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                      range_header: Annotated[str | None, Header(alias="Range")] = None,
+                      if_none_match: Annotated[str | None, Header()] = None):
+    digest = _existing_digest(digest)
+    return serve_file(screenshot_store.path_for(digest), digest, screenshot_store.media_type(digest),
+                      CACHE_IMMUTABLE, range_header, if_none_match)
+
+@router.get("/{digest}/miniature")
+async def get_thumbnail(digest: str,
+                        user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                        range_header: Annotated[str | None, Header(alias="Range")] = None,
+                        if_none_match: Annotated[str | None, Header()] = None):
+    digest = _existing_digest(digest)
+    path = screenshot_store.thumbnail_path(digest)
+    if os.path.exists(path):
+        return serve_file(path, f"{digest}-miniature", "image/webp", CACHE_IMMUTABLE, range_header, if_none_match)
+    # Pas encore calculée (ou Pillow absent) : relance le calcul, sert l'original en attendant
+    thumbnailer.submit(digest)
+    return serve_file(screenshot_store.path_for(digest), digest, screenshot_store.media_type(digest),
+                      CACHE_REVALIDATE, range_header, if_none_match)
@@ -0,0 +1,64 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from models.execution import ClusterEchec, ExecutionTest, ResultatTest
+from routes.auth import require_permission
+from services.clusters_echec import anomaly_for_cluster
+
+router = APIRouter(
+    prefix="/clusters",
+    tags=["clusters"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+# ================= SCHEMAS =================
+class AnomalieClusterIn(BaseModel):
+    severite: str = "MAJEURE"
+
+
+# ================= LISTING =================
+@router.get("")
+async def list_clusters(db: db_dependency,
+                        user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                        sans_anomalie: bool = False,
+                        cursor: str | None = None,
+                        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    query = select(ClusterEchec.id, ClusterEchec.messageNormalise, ClusterEchec.nombreResultats,
+                   ClusterEchec.premiereOccurrence, ClusterEchec.derniereOccurrence, ClusterEchec.anomalieId)
+    if sans_anomalie:
+        query = query.where(ClusterEchec.anomalieId.is_(None))
+    return await paginate(db, query, ClusterEchec.derniereOccurrence, ClusterEchec.id, cursor, limit)
+
+
+@router.get("/{cluster_id}/resultats")
+async def list_cluster_resultats(cluster_id: int, db: db_dependency,
+                                 user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                                 cursor: str | None = None,
+                                 limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    if await db.scalar(select(ClusterEchec.id).where(ClusterEchec.id == cluster_id)) is None:
+        raise HTTPException(status_code=404, detail="Cluster non trouvé")
+    query = (
+        select(ResultatTest.id, ResultatTest.statut, ResultatTest.execution_id,
+               ExecutionTest.test_id, ExecutionTest.dateExecution)
+        .join(ExecutionTest, ExecutionTest.id == ResultatTest.execution_id)
+        .where(ResultatTest.clusterEchecId == cluster_id)
+    )
+    return await paginate(db, query, ExecutionTest.dateExecution, ResultatTest.id, cursor, limit)
+
+
+# ================= ANOMALIE =================
+@router.post("/{cluster_id}/anomalie")
+async def create_cluster_anomaly(cluster_id: int, request: AnomalieClusterIn, db: db_dependency,
+                                 user_id: Annotated[int, Depends(require_permission("anomalie", "create"))]):
+    result = await db.run_sync(lambda session: anomaly_for_cluster(session, cluster_id, user_id, request.severite))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Cluster non trouvé")
+    return result
@@ -0,0 +1,165 @@
+import json
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from db.replicas import get_async_read_db, read_session, replica_router, wants_primary
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from models.execution import ExecutionTest
+from routes.auth import require_permission
+from services.export import FORMATS, MEDIA_TYPES, astream_export, export_query
+from services.ingestion import INGEST_CHUNK_SIZE, INGEST_MAX_LINE_BYTES, ingest_chunk
+from services.log_writer import log_writer
+from services.scope import tests_of_sprint
+
+router = APIRouter(
+    prefix="/executions",
+    tags=["executions"]
+)
+
+# ================= SCHEMAS =================
+class ResultatIn(BaseModel):
+    statut: str | None = None
+    messageErreur: str | None = None
+    logs: str | None = None
+    captureEcran: str | None = None
+    captureEcranHash: str | None = Field(default=None, pattern=r"^[0-9a-f]{64}$")  # hash renvoyé par POST /captures
+    commentaire: str | None = None
+
+class ExecutionIn(BaseModel):
+    test_id: int
+    statut: str
+    dureeExecution: int | None = None
+    dateExecution: datetime | None = None
+    executeurId: int | None = None
+    resultat: ResultatIn | None = None
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# Lecture seule : servies par un réplica quand il y en a un d'assez à jour
+read_db_dependency = Annotated[AsyncSession, Depends(get_async_read_db)]
+
+# ================= LISTING =================
+@router.get("")
+async def list_executions(db: read_db_dependency,
+                          user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                          test_id: int | None = None,
+                          sprint_id: int | None = None,
+                          executeur_id: int | None = None,
+                          statut: str | None = None,
+                          cursor: str | None = None,
+                          limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    query = select(ExecutionTest.id, ExecutionTest.dateExecution, ExecutionTest.statut,
+                   ExecutionTest.dureeExecution, ExecutionTest.test_id, ExecutionTest.executeurId)
+    if test_id is not None:
+        query = query.where(ExecutionTest.test_id == test_id)
+    if sprint_id is not None:
+        query = query.where(ExecutionTest.test_id.in_(tests_of_sprint(sprint_id)))
+    if executeur_id is not None:
+        query = query.where(ExecutionTest.executeurId == executeur_id)
+    if statut is not None:
+        query = query.where(ExecutionTest.statut == statut)
+    return await paginate(db, query, ExecutionTest.dateExecution, ExecutionTest.id, cursor, limit)
+
+# ================= EXPORT =================
+# Exécutions + résultats + anomalies, en flux ; session propre au flux (celle de la requête
+# est fermée avant l'envoi du corps), sur un réplica s'il y en a un d'assez à jour
+@router.get("/export")
+async def export_executions(request: Request,
+                            user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                            format: str = "csv",
+                            projet_id: int | None = None,
+                            sprint_id: int | None = None,
+                            date_debut: datetime | None = None,
+                            date_fin: datetime | None = None):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format non disponible, attendu : {', '.join(FORMATS)}")
+    query = export_query(projet_id, sprint_id, date_debut, date_fin)
+
+    replica = replica_router.choose(prefer_primary=wants_primary(request))
+
+    async def body():
+        async with read_session(replica) as db:
+            async for data in astream_export(db, query, format):
+                yield data
+
+    await log_writer.aaudit("EXPORT", "ExecutionTest", userId=user_id,
+                            changes={"format": format, "projet_id": projet_id, "sprint_id": sprint_id})
+    filename = f"executions.{format}"
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# ================= BULK INGESTION =================
+def _line_too_long() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Ligne NDJSON trop longue (max {INGEST_MAX_LINE_BYTES} octets)")
+
+async def _ndjson_lines(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > INGEST_MAX_LINE_BYTES:
+                raise _line_too_long()
+            if line.strip():
+                yield line
+        # Ligne pas encore terminée : bornée elle aussi, le tampon ne grossit pas sans fin
+        if len(buffer) > INGEST_MAX_LINE_BYTES:
+            raise _line_too_long()
+    if buffer.strip():
+        yield buffer
+
+async def _json_items(request: Request):
+    payload = json.loads(await request.body())
+    if not isinstance(payload, list):
+        raise ValueError("Le corps doit être un tableau JSON")
+    for item in payload:
+        yield item
+
+# Accepte un tableau JSON ou un flux NDJSON (application/x-ndjson), inséré par lots
+@router.post("/bulk")
+async def bulk_ingest(request: Request, db: db_dependency,
+                      user_id: Annotated[int, Depends(require_permission("execution", "create"))]):
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    source = _ndjson_lines(request) if ndjson else _json_items(request)
+
+    results: list[dict] = []
+    chunk: list[tuple[int, dict]] = []
+    index = 0
+
+    async def flush():
+        if chunk:
+            results.extend(await db.run_sync(ingest_chunk, list(chunk)))
+            chunk.clear()
+
+    try:
+        async for raw in source:
+            try:
+                item = ExecutionIn.model_validate_json(raw) if ndjson else ExecutionIn.model_validate(raw)
+            except ValidationError as e:
+                results.append({"index": index, "error": e.errors(include_url=False)})
+            else:
+                chunk.append((index, item.model_dump()))
+                if len(chunk) >= INGEST_CHUNK_SIZE:
+                    await flush()
+            index += 1
+    except ValueError as e:
+        results.append({"index": index, "error": f"Corps invalide: {e}"})
+    await flush()
+
+    results.sort(key=lambda r: r["index"])
+    errors = sum(1 for r in results if "error" in r)
+    await log_writer.aaudit("BULK_INGEST", "ExecutionTest", userId=user_id,
+                            changes={"total": len(results), "errors": errors})
+    return {
+        "total": len(results),
+        "inserted": len(results) - errors,
+        "errors": errors,
+        "items": results
+    }
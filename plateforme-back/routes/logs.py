@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.replicas import get_async_read_db
+from db.partitioning import SPECS, entity_history, keyset_page, recent_errors
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from routes.auth import require_permission
+
+router = APIRouter(
+    prefix="/logs",
+    tags=["logs"]
+)
+
+# Lecture seule : servies par un réplica quand il y en a un d'assez à jour
+read_db_dependency = Annotated[AsyncSession, Depends(get_async_read_db)]
+
+# Listes paginées sur la table de base et, sous SQLite, ses tables de période archivées
+AUDIT_COLUMNS = ["id", "action", "timestamp", "entityType", "entityId", "changes", "ipAddress", "userAgent", "userId"]
+SYSTEM_COLUMNS = ["id", "niveau", "message", "date_time", "source", "details"]
+
+# ================= AUDIT =================
+@router.get("/audit")
+async def list_audit_logs(db: read_db_dependency,
+                          user_id: Annotated[int, Depends(require_permission("audit", "read"))],
+                          utilisateur_id: int | None = None,
+                          action: str | None = None,
+                          entity_type: str | None = None,
+                          entity_id: int | None = None,
+                          cursor: str | None = None,
+                          limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    def filters(t):
+        conditions = []
+        if utilisateur_id is not None:
+            conditions.append(t.c.userId == utilisateur_id)
+        if action is not None:
+            conditions.append(t.c.action == action)
+        if entity_type is not None:
+            conditions.append(t.c.entityType == entity_type)
+        if entity_id is not None:
+            conditions.append(t.c.entityId == entity_id)
+        return conditions
+
+    return await db.run_sync(lambda session: keyset_page(
+        session.connection(), SPECS["audit_log"], AUDIT_COLUMNS, filters, cursor, limit
+    ))
+
+# ================= SYSTEM LOGS =================
+@router.get("/systems")
+async def list_system_logs(db: read_db_dependency,
+                           user_id: Annotated[int, Depends(require_permission("log", "read"))],
+                           niveau: str | None = None,
+                           source: str | None = None,
+                           cursor: str | None = None,
+                           limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    def filters(t):
+        conditions = []
+        if niveau is not None:
+            conditions.append(t.c.niveau == niveau)
+        if source is not None:
+            conditions.append(t.c.source == source)
+        return conditions
+
+    return await db.run_sync(lambda session: keyset_page(
+        session.connection(), SPECS["log_systems"], SYSTEM_COLUMNS, filters, cursor, limit
+    ))
+
+
+# ================= PARTITION-AWARE QUERIES =================
+@router.get("/audit/entities/{entity_type}/{entity_id}")
+async def get_entity_history(entity_type: str, entity_id: int, db: read_db_dependency,
+                             user_id: Annotated[int, Depends(require_permission("audit", "read"))],
+                             since: datetime | None = None,
+                             until: datetime | None = None,
+                             limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    return await db.run_sync(
+        lambda session: entity_history(session.connection(), entity_type, entity_id, since, until, limit)
+    )
+
+
+@router.get("/systems/errors")
+async def get_recent_errors(db: read_db_dependency,
+                            user_id: Annotated[int, Depends(require_permission("log", "read"))],
+                            minutes: Annotated[int, Query(ge=1, le=7 * 24 * 60)] = 60,
+                            source: str | None = None,
+                            limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    return await db.run_sync(
+        lambda session: recent_errors(session.connection(), minutes, source=source, limit=limit)
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import os
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import AsyncSessionLocal, get_async_db
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from models.notification import Notification, TypeNotification
+from models.user import Utilisateur
+from routes.auth import get_current_user, get_stream_user, require_permission
+from services.notifications import (
+    fan_out, notification_hub, publish_unread, serialize, sse_event, unread_count, unread_counters,
+)
+
+NOTIF_KEEPALIVE_S = int(os.getenv("NOTIF_KEEPALIVE_S", 15))
+NOTIF_FANOUT_MAX = int(os.getenv("NOTIF_FANOUT_MAX", 10000))
+NOTIF_CATCH_UP_LIMIT = 100
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["notifications"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+class NotificationIn(BaseModel):
+    destinataires: list[int] = Field(min_length=1, max_length=NOTIF_FANOUT_MAX)
+    titre: str
+    message: str | None = None
+    type: TypeNotification | None = None
+    priorite: str | None = None
+
+# ================= LISTING =================
+# Notifications de l'utilisateur connecté uniquement
+@router.get("")
+async def list_notifications(db: db_dependency,
+                             user_id: Annotated[int, Depends(get_current_user)],
+                             lue: bool | None = None,
+                             type: TypeNotification | None = None,
+                             cursor: str | None = None,
+                             limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    query = (select(Notification.id, Notification.titre, Notification.message, Notification.type,
+                    Notification.dateEnvoi, Notification.lue, Notification.priorite)
+             .where(Notification.destinataireId == user_id))
+    if lue is not None:
+        query = query.where(Notification.lue == lue)
+    if type is not None:
+        query = query.where(Notification.type == type)
+    return await paginate(db, query, Notification.dateEnvoi, Notification.id, cursor, limit)
+
+
+# ================= ENVOI =================
+@router.post("", status_code=201)
+async def send_notification(request: NotificationIn, db: db_dependency,
+                            user_id: Annotated[int, Depends(require_permission("notification", "create"))]):
+    destinataires = set(request.destinataires)
+    existing = set(await db.scalars(select(Utilisateur.id).where(Utilisateur.id.in_(destinataires))))
+    if existing != destinataires:
+        raise HTTPException(status_code=400, detail=f"Destinataires inconnus: {sorted(destinataires - existing)}")
+    rows = await db.run_sync(
+        lambda session: fan_out(session, request.destinataires, request.titre, request.message,
+                                request.type, request.priorite)
+    )
+    await db.commit()
+    return {"count": len(rows)}
+
+
+# ================= COMPTEUR NON LUES =================
+@router.get("/unread-count")
+async def get_unread_count(db: db_dependency, user_id: Annotated[int, Depends(get_current_user)]):
+    return {"count": await unread_count(db, user_id)}
+
+
+@router.post("/read-all")
+async def mark_all_read(db: db_dependency, user_id: Annotated[int, Depends(get_current_user)]):
+    await db.execute(
+        update(Notification)
+        .where(Notification.destinataireId == user_id, Notification.lue.is_(False))
+        .values(lue=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    unread_counters.reset(user_id)
+    publish_unread(user_id, 0)
+    return {"count": 0}
+
+
+@router.post("/{notification_id}/read")
+async def mark_read(notification_id: int, db: db_dependency, user_id: Annotated[int, Depends(get_current_user)]):
+    result = await db.execute(
+        update(Notification)
+        .where(Notification.id == notification_id, Notification.destinataireId == user_id,
+               Notification.lue.is_(False))
+        .values(lue=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        owned = await db.scalar(select(Notification.id).where(Notification.id == notification_id,
+                                                              Notification.destinataireId == user_id))
+        if owned is None:
+            raise HTTPException(status_code=404, detail="Notification non trouvée")
+        return {"count": await unread_count(db, user_id)}
+    await db.commit()
+    count = unread_counters.add(user_id, -1)
+    publish_unread(user_id, count)
+    return {"count": count if count is not None else await unread_count(db, user_id)}
+
+
+# ================= PUSH (SSE) =================
+async def _catch_up(user_id: int, last_event_id: int | None) -> list[str]:
+    # Session courte : la connexion SSE ne doit pas garder une connexion du pool
+    async with AsyncSessionLocal() as db:
+        frames = []
+        if last_event_id is not None:
+            missed = await db.execute(
+                select(Notification.id, Notification.titre, Notification.message, Notification.type,
+                       Notification.dateEnvoi, Notification.lue, Notification.priorite, Notification.destinataireId)
+                .where(Notification.destinataireId == user_id, Notification.id > last_event_id)
+                .order_by(Notification.id)
+                .limit(NOTIF_CATCH_UP_LIMIT)
+            )
+            frames += [sse_event("notification", serialize(row), row["id"]) for row in missed.mappings()]
+        frames.append(sse_event("unread", {"count": await unread_count(db, user_id)}))
+        return frames
+
+
+@router.get("/stream")
+async def stream_notifications(user_id: Annotated[int, Depends(get_stream_user)],
+                               last_event_id: Annotated[int | None, Header()] = None):
+    async def events():
+        # Abonnement avant la lecture de l'état initial : aucun évènement perdu entre les deux
+        subscription = notification_hub.subscribe(user_id)
+        try:
+            yield f"retry: {NOTIF_KEEPALIVE_S * 1000}\n\n"
+            for frame in await _catch_up(user_id, last_event_id):
+                yield frame
+            while True:
+                if subscription.lagged:
+                    subscription.lagged = False
+                    async with AsyncSessionLocal() as db:
+                        yield sse_event("resync", {"count": await unread_count(db, user_id)})
+                try:
+                    kind, payload = await asyncio.wait_for(subscription.queue.get(), NOTIF_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_event(kind, payload, payload["id"] if kind == "notification" else None)
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
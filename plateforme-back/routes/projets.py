@@ -0,0 +1,24 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from routes.auth import require_permission
+from services.project_tree import load_project_tree
+
+router = APIRouter(
+    prefix="/projets",
+    tags=["projets"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+# ================= PROJECT TREE =================
+@router.get("/{projet_id}/tree")
+async def get_project_tree(projet_id: int, db: db_dependency,
+                           user_id: Annotated[int, Depends(require_permission("projet", "read"))]):
+    tree = await db.run_sync(load_project_tree, projet_id)
+    if tree is None:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    return tree
@@ -0,0 +1,32 @@
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from routes.auth import get_current_principal
+from services.principal_cache import Principal
+from services.recherche import allowed_types, search
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+TypeDocument = Literal["userstory", "test", "scenario", "anomalie"]
+
+# ================= RECHERCHE =================
+@router.get("")
+async def search_documents(db: db_dependency,
+                           principal: Annotated[Principal, Depends(get_current_principal)],
+                           q: Annotated[str, Query(min_length=1, max_length=200)],
+                           types: Annotated[list[TypeDocument] | None, Query()] = None,
+                           limit: Annotated[int, Query(ge=1, le=100)] = 20,
+                           offset: Annotated[int, Query(ge=0, le=1000)] = 0):
+    # Seuls les types que l'utilisateur peut lire sont cherchés
+    permitted = allowed_types(principal, types)
+    if not permitted:
+        raise HTTPException(status_code=403, detail="Permission refusée")
+    return await db.run_sync(lambda session: search(session.connection(), q, permitted, limit, offset))
@@ -0,0 +1,105 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from db.database import get_async_db
+from models.execution import ResultatTest
+from routes.auth import require_permission
+from routes.captures import describe, store_upload
+from services.http_range import RangeNotSatisfiable, parse_range
+from services.log_store import EXTERNAL_FIELDS, log_store
+
+router = APIRouter(
+    prefix="/resultats",
+    tags=["resultats"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+# ================= LOGS =================
+async def _serve_text(db: AsyncSession, resultat_id: int, field: str, range_header: str | None):
+    hash_field, size_field = EXTERNAL_FIELDS[field]
+    row = (await db.execute(
+        select(getattr(ResultatTest, hash_field), getattr(ResultatTest, size_field))
+        .where(ResultatTest.id == resultat_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Résultat non trouvé")
+    digest, size = row
+
+    if digest is None:
+        # Texte court resté dans la ligne : chargé explicitement (colonne différée)
+        inline = await db.scalar(select(getattr(ResultatTest, field)).where(ResultatTest.id == resultat_id))
+        data = (inline or "").encode("utf-8")
+        size = len(data)
+    elif not log_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Blob de log introuvable")
+
+    headers = {"Accept-Ranges": "bytes"}
+    if digest:
+        headers["ETag"] = f'"{digest}"'
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    start, end = byte_range or (0, size - 1)
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(0, end - start + 1))
+
+    media_type = "text/plain; charset=utf-8"
+    if digest is None:
+        return Response(content=data[start:end + 1], status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        log_store.stream(digest, start, end), status_code=status_code, headers=headers, media_type=media_type
+    )
+
+@router.get("/{resultat_id}/logs")
+async def get_logs(resultat_id: int, db: db_dependency,
+                   user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                   range_header: Annotated[str | None, Header(alias="Range")] = None):
+    return await _serve_text(db, resultat_id, "logs", range_header)
+
+@router.get("/{resultat_id}/message-erreur")
+async def get_message_erreur(resultat_id: int, db: db_dependency,
+                             user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                             range_header: Annotated[str | None, Header(alias="Range")] = None):
+    return await _serve_text(db, resultat_id, "messageErreur", range_header)
+
+# ================= CAPTURE D'ÉCRAN =================
+# Corps brut (image) ; une capture identique déjà stockée n'est pas réécrite
+@router.put("/{resultat_id}/capture")
+async def put_capture(resultat_id: int, request: Request, db: db_dependency,
+                      user_id: Annotated[int, Depends(require_permission("execution", "create"))]):
+    if await db.scalar(select(ResultatTest.id).where(ResultatTest.id == resultat_id)) is None:
+        raise HTTPException(status_code=404, detail="Résultat non trouvé")
+    stored = await store_upload(request)
+    await db.execute(update(ResultatTest).where(ResultatTest.id == resultat_id)
+                     .values(captureEcranHash=stored.digest))
+    await db.commit()
+    return describe(stored)
+
+@router.get("/{resultat_id}/capture")
+async def get_capture(resultat_id: int, db: db_dependency,
+                      user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                      miniature: bool = False):
+    row = (await db.execute(
+        select(ResultatTest.captureEcranHash).where(ResultatTest.id == resultat_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Résultat non trouvé")
+    if row.captureEcranHash is None:
+        raise HTTPException(status_code=404, detail="Aucune capture stockée pour ce résultat")
+    # URL adressée par contenu, cachable indéfiniment côté client
+    suffix = "/miniature" if miniature else ""
+    return RedirectResponse(f"/captures/{row.captureEcranHash}{suffix}", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
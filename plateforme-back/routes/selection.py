@@ -0,0 +1,36 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from routes.auth import require_permission
+from services.selection import select_tests
+
+router = APIRouter(
+    prefix="/selection",
+    tags=["selection"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+# ================= SCHEMAS =================
+class SelectionIn(BaseModel):
+    userstory_ids: list[int] = []
+    epic_ids: list[int] = []
+    module_ids: list[int] = []
+    budget_secondes: float | None = Field(default=None, gt=0)
+    types: list[str] | None = None  # par défaut : tous les tests non manuels
+    inclure_non_impactes: bool = True
+
+
+# ================= SELECTION =================
+@router.post("/tests")
+async def select_tests_for_run(request: SelectionIn, db: db_dependency,
+                               user_id: Annotated[int, Depends(require_permission("execution", "read"))]):
+    return await db.run_sync(lambda session: select_tests(
+        session.connection(), request.userstory_ids, request.epic_ids, request.module_ids,
+        request.budget_secondes, request.types, request.inclure_non_impactes,
+    ))
@@ -0,0 +1,46 @@
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from db.replicas import get_async_read_db
+from routes.auth import require_permission
+from services.statistiques import compute_statistics, sprint_statistics, test_statistics
+
+router = APIRouter(
+    prefix="/statistiques",
+    tags=["statistiques"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# Lecture seule : servies par un réplica quand il y en a un d'assez à jour
+read_db_dependency = Annotated[AsyncSession, Depends(get_async_read_db)]
+
+Tri = Literal["scoreInstabilite", "tauxEchec", "tauxBascule", "serieEchecsCourante", "echecsRecents", "dureeP95"]
+
+# ================= LECTURE =================
+@router.get("/tests/{test_id}")
+async def get_test_statistics(test_id: int, db: read_db_dependency,
+                              user_id: Annotated[int, Depends(require_permission("rapport", "read"))]):
+    rows = await db.run_sync(lambda session: test_statistics(session.connection(), test_id))
+    if not rows:
+        raise HTTPException(status_code=404, detail="Aucune statistique pour ce test")
+    return rows
+
+
+@router.get("/sprints/{sprint_id}/tests")
+async def get_sprint_statistics(sprint_id: int, db: read_db_dependency,
+                                user_id: Annotated[int, Depends(require_permission("rapport", "read"))],
+                                tri: Tri = "scoreInstabilite",
+                                limit: Annotated[int, Query(ge=1, le=500)] = 50):
+    return await db.run_sync(lambda session: sprint_statistics(session.connection(), sprint_id, tri, limit))
+
+
+# ================= RECALCUL =================
+@router.post("/sprints/{sprint_id}/recalcul")
+async def recompute_sprint_statistics(sprint_id: int, db: db_dependency,
+                                      user_id: Annotated[int, Depends(require_permission("rapport", "update"))]):
+    summary = await db.run_sync(lambda session: compute_statistics(session.connection(), [sprint_id]))
+    await db.commit()
+    return summary
@@ -0,0 +1,44 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from db.database import get_async_db
+from routes.auth import require_permission
+from services.http_range import etag_matches
+from services.tableau_bord import current_etag, get_snapshot, snapshot_stats
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+# Le client revalide à chaque affichage ; la réponse dépend des droits, pas de cache partagé
+CACHE_CONTROL = "private, no-cache"
+
+# ================= SPRINT =================
+@router.get("/sprints/{sprint_id}")
+async def get_sprint_dashboard(sprint_id: int, db: db_dependency,
+                               user_id: Annotated[int, Depends(require_permission("rapport", "read"))],
+                               if_none_match: Annotated[str | None, Header()] = None):
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if if_none_match:
+        # Chemin rapide : une lecture de clé primaire, sans charger le contenu
+        etag = await db.run_sync(lambda session: current_etag(session, sprint_id))
+        if etag is not None and etag_matches(if_none_match, etag):
+            snapshot_stats.count("not_modified")
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, "ETag": f'"{etag}"'})
+
+    snapshot = await db.run_sync(lambda session: get_snapshot(session, sprint_id))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Sprint non trouvé")
+    content, etag = snapshot
+    headers["ETag"] = f'"{etag}"'
+    if etag_matches(if_none_match, etag):
+        # Recalculé à l'identique : le client a déjà ce contenu
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
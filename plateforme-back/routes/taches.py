@@ -0,0 +1,80 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_db
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from models.execution import TacheExecution
+from routes.auth import require_permission
+from services.file_execution import (PRIORITE_MAX, PRIORITE_MIN, QUEUE_MAX_ATTEMPTS, STATUTS, cancel, enqueue,
+                                     queue_stats)
+
+router = APIRouter(
+    prefix="/taches",
+    tags=["taches"]
+)
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+# ================= SCHEMAS =================
+class TachesIn(BaseModel):
+    test_ids: list[int] = Field(min_length=1, max_length=10000)
+    priorite: int = Field(default=0, ge=PRIORITE_MIN, le=PRIORITE_MAX)
+    # Valeurs scalaires seulement : elles sont substituées dans la commande des workers
+    parametres: dict[str, str | int | float | bool] | None = None
+    maxTentatives: int = Field(default=QUEUE_MAX_ATTEMPTS, ge=1, le=20)
+
+
+# ================= FILE =================
+# Une tâche par test automatisé ; exécutée par les workers (python -m scripts.worker)
+@router.post("")
+async def enqueue_tests(request: TachesIn, db: db_dependency,
+                        user_id: Annotated[int, Depends(require_permission("execution", "create"))]):
+    result = await db.run_sync(lambda session: enqueue(
+        session.connection(), request.test_ids, request.priorite, request.parametres, user_id,
+        request.maxTentatives,
+    ))
+    await db.commit()
+    return result
+
+
+@router.get("")
+async def list_taches(db: db_dependency,
+                      user_id: Annotated[int, Depends(require_permission("execution", "read"))],
+                      statut: str | None = None,
+                      test_id: int | None = None,
+                      cursor: str | None = None,
+                      limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE):
+    query = select(TacheExecution.id, TacheExecution.test_id, TacheExecution.statut, TacheExecution.priorite,
+                   TacheExecution.tentatives, TacheExecution.maxTentatives, TacheExecution.workerId,
+                   TacheExecution.disponibleA, TacheExecution.derniereErreur, TacheExecution.executionId,
+                   TacheExecution.dateCreation, TacheExecution.dateDebut, TacheExecution.dateFin)
+    if statut is not None:
+        if statut not in STATUTS:
+            raise HTTPException(status_code=400, detail=f"Statut inconnu, attendu : {', '.join(STATUTS)}")
+        query = query.where(TacheExecution.statut == statut)
+    if test_id is not None:
+        query = query.where(TacheExecution.test_id == test_id)
+    return await paginate(db, query, TacheExecution.dateCreation, TacheExecution.id, cursor, limit)
+
+
+@router.get("/stats")
+async def get_queue_stats(db: db_dependency,
+                          user_id: Annotated[int, Depends(require_permission("execution", "read"))]):
+    return await db.run_sync(lambda session: queue_stats(session.connection()))
+
+
+@router.post("/{tache_id}/annuler")
+async def cancel_tache(tache_id: int, db: db_dependency,
+                       user_id: Annotated[int, Depends(require_permission("execution", "create"))]):
+    cancelled = await db.run_sync(lambda session: cancel(session.connection(), tache_id))
+    if not cancelled:
+        exists = await db.scalar(select(TacheExecution.id).where(TacheExecution.id == tache_id))
+        raise HTTPException(status_code=404 if exists is None else 409,
+                            detail="Tâche non trouvée" if exists is None else "Tâche déjà démarrée ou terminée")
+    await db.commit()
+    return {"id": tache_id, "statut": "ANNULEE"}
@@ -0,0 +1,58 @@
+"""Store de captures d'écran.
+
+    python -m scripts.captures gc [--grace 86400] [--dry-run]   # supprime les captures non référencées
+    python -m scripts.captures put capture1.png capture2.png    # stocke des fichiers, affiche leurs hashes
+    python -m scripts.captures miniatures                       # calcule les miniatures manquantes
+
+`gc` ne touche pas aux captures modifiées depuis moins de --grace secondes (par défaut
+SCREENSHOT_GC_GRACE_SECONDS) : envoyées mais pas encore référencées par un résultat.
+`miniatures` demande Pillow.
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import wait
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from services.captures import SCREENSHOT_GC_GRACE_SECONDS, collect_garbage, referenced_digests, screenshot_store, thumbnailer
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Store de captures d'écran")
+    parser.add_argument("command", choices=["gc", "put", "miniatures"])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--grace", type=int, default=SCREENSHOT_GC_GRACE_SECONDS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "gc":
+        with engine.connect() as connection:
+            summary = collect_garbage(connection, grace_seconds=args.grace, dry_run=args.dry_run)
+        print(json.dumps({**summary, "dry_run": args.dry_run}, indent=2))
+        return 0
+
+    if args.command == "put":
+        if not args.files:
+            parser.error("put : au moins un fichier")
+        for path in args.files:
+            with open(path, "rb") as f:
+                stored = screenshot_store.put(f.read())
+            print(json.dumps({"fichier": path, "hash": stored.digest, "existant": stored.existing}))
+        return 0
+
+    if not thumbnailer.available:
+        print("Miniatures indisponibles : Pillow n'est pas installé", file=sys.stderr)
+        return 1
+    with engine.connect() as connection:
+        digests = [digest.hex() for digest in referenced_digests(connection)]
+    futures = [future for digest in digests if screenshot_store.exists(digest)
+               if (future := thumbnailer.submit(digest)) is not None]
+    wait(futures)
+    thumbnailer.shutdown()
+    print(json.dumps({"references": len(digests), **thumbnailer.stats()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Regroupement des échecs quasi identiques.
+
+    python -m scripts.clusters backfill [--batch 5000] [--reset]   # rattache les échecs sans cluster
+    python -m scripts.clusters stats                               # clusters les plus fréquents
+
+--reset vide les clusters (et les rattachements) avant de tout recalculer, par exemple
+après un changement des règles de normalisation ou de CLUSTER_THRESHOLD.
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import func, select, update
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from models.execution import ClusterEchec, ResultatTest
+from services.clusters_echec import backfill, failure_index
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Clusters d'échecs")
+    parser.add_argument("command", choices=["backfill", "stats"])
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        if args.reset:
+            with engine.begin() as connection:
+                connection.execute(update(ResultatTest).values(clusterEchecId=None))
+                connection.execute(ClusterEchec.__table__.delete())
+            failure_index.clear()
+        print(json.dumps(backfill(engine, args.batch), indent=2))
+        return 0
+
+    with engine.connect() as connection:
+        total = connection.scalar(select(func.count()).select_from(ClusterEchec))
+        top = connection.execute(
+            select(ClusterEchec.id, ClusterEchec.nombreResultats, ClusterEchec.anomalieId, ClusterEchec.messageNormalise)
+            .order_by(ClusterEchec.nombreResultats.desc(), ClusterEchec.id)
+            .limit(args.limit)
+        ).mappings().all()
+    print(json.dumps({"clusters": total, "top": [dict(row) for row in top]}, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Export des exécutions, résultats et anomalies.
+
+    python -m scripts.export --format csv --projet 3 --debut 2024-01-01 --fin 2024-07-01 -o export.csv
+    python -m scripts.export --format ndjson --sprint 12 | gzip > sprint-12.ndjson.gz
+
+Sans `-o`, l'export est écrit sur la sortie standard ; le résumé (octets, durée)
+part sur la sortie d'erreur. Parquet demande pyarrow. Lu sur un réplica (REPLICA_DATABASE_URL)
+s'il y en a un d'assez à jour.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.replicas import read_engine
+from services.export import EXPORT_CHUNK_SIZE, FORMATS, export_query, stream_export
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export des exécutions, résultats et anomalies")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--projet", type=int)
+    parser.add_argument("--sprint", type=int)
+    parser.add_argument("--debut", type=datetime.fromisoformat, help="date ISO, incluse")
+    parser.add_argument("--fin", type=datetime.fromisoformat, help="date ISO, exclue")
+    parser.add_argument("--chunk", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args(argv)
+
+    query = export_query(args.projet, args.sprint, args.debut, args.fin)
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    start = time.perf_counter()
+    written = 0
+    try:
+        with read_engine().connect() as connection:
+            for data in stream_export(connection, query, args.format, args.chunk):
+                output.write(data)
+                written += len(data)
+    finally:
+        if args.output:
+            output.close()
+        else:
+            output.flush()
+    print(json.dumps({"format": args.format, "octets": written,
+                      "secondes": round(time.perf_counter() - start, 2)}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
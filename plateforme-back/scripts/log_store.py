@@ -0,0 +1,32 @@
+"""Store des logs volumineux (services/log_store.py).
+
+    python -m scripts.log_store gc [--grace 86400] [--dry-run]   # supprime les blobs non référencés
+
+Un blob est écrit avant le commit du résultat qui le référence : un lot annulé laisse des
+blobs orphelins. `gc` ne touche pas à ceux modifiés depuis moins de --grace secondes (par
+défaut LOG_GC_GRACE_SECONDS), qui peuvent appartenir à un lot en cours.
+"""
+import argparse
+import json
+import sys
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from services.log_store import LOG_GC_GRACE_SECONDS, collect_garbage
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Store des logs volumineux")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--grace", type=int, default=LOG_GC_GRACE_SECONDS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    with engine.connect() as connection:
+        summary = collect_garbage(connection, grace_seconds=args.grace, dry_run=args.dry_run)
+    print(json.dumps({**summary, "dry_run": args.dry_run}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
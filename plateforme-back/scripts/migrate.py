@@ -0,0 +1,30 @@
+"""Migrations du schéma (DDL hors démarrage de l'application).
+
+    python -m scripts.migrate           # amène la base à la version HEAD
+    python -m scripts.migrate status    # version actuelle vs. HEAD (code retour 1 si en retard)
+"""
+import argparse
+import sys
+
+from db.database import engine
+from db.schema import HEAD, current_version, migrate
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrations du schéma")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        with engine.connect() as connection:
+            version = current_version(connection)
+        print(f"version {version} / HEAD {HEAD}")
+        return 0 if version is not None and version >= HEAD else 1
+
+    applied = migrate(engine)
+    print(f"✓ Schéma en version {HEAD}" + (f" (appliqué : {applied})" if applied else " (déjà à jour)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Partitionnement et rétention de audit_log / log_systems.
+
+    python -m scripts.partitions init     # PostgreSQL : convertit les tables existantes en tables partitionnées
+    python -m scripts.partitions run      # création / archivage / agrégation / purge (une passe)
+    python -m scripts.partitions list     # partitions existantes
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from db.partitioning import SPECS, convert_to_partitioned, list_partitions, run_maintenance
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Partitionnement des tables de logs")
+    parser.add_argument("command", choices=["init", "run", "list"])
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="date de référence (ISO 8601), par défaut maintenant")
+    args = parser.parse_args(argv)
+    now = args.now or datetime.utcnow()
+
+    if args.command == "init":
+        with engine.begin() as connection:
+            for name, spec in SPECS.items():
+                converted = convert_to_partitioned(connection, spec, now)
+                print(f"{'✓' if converted else '-'} {name}{'' if converted else ' (déjà partitionnée ou SQLite)'}")
+        return 0
+
+    if args.command == "run":
+        print(json.dumps(run_maintenance(engine, now), indent=2))
+        return 0
+
+    with engine.connect() as connection:
+        listing = {
+            name: [{"name": p.name, "start": p.start, "end": p.end} for p in list_partitions(connection, spec)]
+            for name, spec in SPECS.items()
+        }
+    print(json.dumps(listing, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
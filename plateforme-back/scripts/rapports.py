@@ -0,0 +1,34 @@
+"""Maintenance des compteurs RapportQA / IndicateurQualite.
+
+    python -m scripts.rapports check  [--sprint ID ...]   # écarts incrémental vs. recalcul
+    python -m scripts.rapports rebuild [--sprint ID ...]  # réécrit les compteurs recalculés
+"""
+import argparse
+import json
+import sys
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import SessionLocal
+from services.rapport_aggregation import check_consistency, rebuild
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Maintenance des compteurs de rapports QA")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--sprint", type=int, action="append", dest="sprints")
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        if args.command == "check":
+            mismatches = check_consistency(db, args.sprints)
+            print(json.dumps(mismatches, indent=2))
+            return 1 if mismatches else 0
+
+        repaired = rebuild(db, args.sprints)
+        db.commit()
+        print(f"✓ {repaired} sprint(s) corrigé(s)")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Recherche plein texte.
+
+    python -m scripts.recherche query "connexion refusée" [--type anomalie ...] [--limit 20]
+    python -m scripts.recherche reindex     # recrée les index GIN (PostgreSQL) / construit l'index mémoire
+
+`reindex` sous PostgreSQL supprime puis recrée les index `ix_*_fts`, à lancer après un
+changement de SEARCH_TS_CONFIG ; ailleurs il construit un index en mémoire pour en afficher
+la taille et la durée de construction (celui du serveur est propre à son processus).
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import text
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import Base, engine
+from services.recherche import SOURCES, search, search_index, uses_postgres
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recherche plein texte")
+    parser.add_argument("command", choices=["query", "reindex"])
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--type", action="append", dest="types", choices=list(SOURCES))
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "query":
+        if not args.query:
+            parser.error("query : texte requis")
+        with engine.connect() as connection:
+            result = search(connection, args.query, args.types, args.limit)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        if uses_postgres(connection):
+            for source in SOURCES.values():
+                table = Base.metadata.tables[source.model.__tablename__]
+                for index in table.indexes:
+                    if index.name.endswith("_fts"):
+                        connection.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+                        index.create(connection)
+            summary = {"moteur": "postgresql"}
+        else:
+            search_index.clear()
+            search_index.ensure_loaded(connection)
+            summary = {"moteur": "memoire", **search_index.stats()}
+    summary["secondes"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
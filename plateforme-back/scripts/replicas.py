@@ -0,0 +1,63 @@
+"""Réplicas en lecture (REPLICA_DATABASE_URL).
+
+    python -m scripts.replicas status   # retard de chaque réplica, mesuré par battement
+    python -m scripts.replicas sync     # recopie le primaire SQLite sur les réplicas SQLite
+
+`sync` simule la réplication pour les essais locaux avec deux fichiers SQLite : la copie passe
+par l'API de sauvegarde de sqlite3, cohérente même pendant des écritures sur le primaire.
+En production (PostgreSQL), la réplication est celle du serveur ; seul `status` s'applique.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+from sqlalchemy.engine import make_url
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from db.replicas import is_sqlite, replica_router
+
+
+def _sqlite_path(url) -> str:
+    return make_url(str(url)).database
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Réplicas en lecture")
+    parser.add_argument("action", choices=["status", "sync"])
+    args = parser.parse_args(argv)
+
+    if not replica_router.enabled:
+        print("Aucun réplica configuré (REPLICA_DATABASE_URL)", file=sys.stderr)
+        return 1
+
+    if args.action == "status":
+        # Deux mesures : la seconde compare au battement que la première vient d'écrire
+        replica_router.check()
+        time.sleep(replica_router.interval)
+        replica_router.check()
+        print(json.dumps(replica_router.stats(), indent=2))
+        return 0
+
+    primary_url = engine.url.render_as_string(hide_password=False)
+    if not is_sqlite(primary_url):
+        print("sync : primaire SQLite uniquement (ailleurs, réplication du serveur)", file=sys.stderr)
+        return 1
+    copied = {}
+    with sqlite3.connect(_sqlite_path(primary_url)) as source:
+        for replica in replica_router.replicas:
+            if not is_sqlite(replica.url):
+                copied[replica.name] = "ignoré (pas SQLite)"
+                continue
+            replica.engine.dispose()
+            with sqlite3.connect(_sqlite_path(replica.url)) as target:
+                source.backup(target)
+            copied[replica.name] = _sqlite_path(replica.url)
+    print(json.dumps(copied, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Évaluation hors ligne de la sélection de tests sur l'historique enregistré.
+
+    python -m scripts.selection replay [--run-hours 24] [--budget-ratio 0.5] [--warmup-runs 5]
+
+Les exécutions sont regroupées en runs par fenêtre de --run-hours ; pour chaque run, la
+politique ne voit que les exécutions antérieures et dispose de --budget-ratio de la durée
+estimée du run complet. Sortie : temps économisé et échecs manqués, face à une sélection
+aléatoire de même budget.
+"""
+import argparse
+import json
+import sys
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from services.selection import replay
+from services.statistiques import load_history
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rejeu de la sélection de tests")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("--run-hours", type=float, default=24)
+    parser.add_argument("--budget-ratio", type=float, default=0.5)
+    parser.add_argument("--warmup-runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with engine.connect() as connection:
+        historique = load_history(connection)
+    print(json.dumps(replay(historique, args.run_hours, args.budget_ratio, args.warmup_runs, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
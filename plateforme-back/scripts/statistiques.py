@@ -0,0 +1,42 @@
+"""Statistiques d'historique par test et recommandations des rapports QA.
+
+    python -m scripts.statistiques run  [--sprint ID ...]   # recalcule (tous les tests par défaut)
+    python -m scripts.statistiques show --test ID           # lignes calculées d'un test
+    python -m scripts.statistiques show --sprint ID         # tests d'un sprint, plus instables d'abord
+"""
+import argparse
+import json
+import sys
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from services.statistiques import compute_statistics, sprint_statistics, test_statistics
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Statistiques d'historique des tests")
+    parser.add_argument("command", choices=["run", "show"])
+    parser.add_argument("--sprint", type=int, action="append", dest="sprints")
+    parser.add_argument("--test", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        with engine.begin() as connection:
+            summary = compute_statistics(connection, args.sprints)
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    with engine.connect() as connection:
+        if args.test is not None:
+            rows = test_statistics(connection, args.test)
+        elif args.sprints:
+            rows = [row for sprint_id in args.sprints for row in sprint_statistics(connection, sprint_id, limit=args.limit)]
+        else:
+            parser.error("show : --test ou --sprint requis")
+    print(json.dumps(rows, indent=2, default=str, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Worker de la file d'exécution des tests automatisés.
+
+    python -m scripts.worker --command "npx playwright test --grep @T{test_id}" [--concurrency 4]
+    python -m scripts.worker --command "pytest tests/{test_id}" --drain   # vide la file puis s'arrête
+    python -m scripts.worker requeue                                     # reprend les baux expirés
+
+La commande est formatée avec les champs de la tâche (test_id, framework, outil, typeTest,
+tentatives…) et ses `parametres` ; code retour 0 -> PASSED. Lancer autant de workers que
+voulu, sur une ou plusieurs machines : ils se partagent la file sans se bloquer.
+Arrêt propre sur SIGINT / SIGTERM : plus de réclamation, les tâches en cours vont à leur terme.
+"""
+import argparse
+import json
+import signal
+import sys
+
+import models  # noqa: F401  (enregistre toutes les tables)
+from db.database import engine
+from services.file_execution import (QUEUE_LEASE_SECONDS, WORKER_CONCURRENCY, WORKER_TASK_TIMEOUT, Worker,
+                                     command_runner, requeue_expired)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Worker de la file d'exécution")
+    parser.add_argument("action", nargs="?", choices=["run", "requeue"], default="run")
+    parser.add_argument("--command", help="commande par tâche, ex. \"pytest -k T{test_id}\"")
+    parser.add_argument("--id", dest="worker_id")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--lease", type=int, default=QUEUE_LEASE_SECONDS)
+    parser.add_argument("--timeout", type=int, default=WORKER_TASK_TIMEOUT)
+    parser.add_argument("--drain", action="store_true", help="s'arrête quand la file est vide")
+    args = parser.parse_args(argv)
+
+    if args.action == "requeue":
+        with engine.begin() as connection:
+            print(json.dumps(requeue_expired(connection), indent=2))
+        return 0
+
+    if not args.command:
+        parser.error("--command requis")
+    worker = Worker(engine, command_runner(args.command, args.timeout), worker_id=args.worker_id,
+                    concurrency=args.concurrency, lease_seconds=args.lease)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    print(f"Worker {worker.worker_id} : {worker.concurrency} tâche(s) à la fois", file=sys.stderr)
+    print(json.dumps({"worker": worker.worker_id, **worker.run(drain=args.drain)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""Captures d'écran : store adressé par contenu, miniatures en arrière-plan, ramasse-miettes.
+
+Une capture est rangée sous le SHA-256 de ses octets, telle quelle (les formats d'image sont
+déjà compressés) : une même capture envoyée par cent exécutions n'occupe qu'un fichier, et
+`ResultatTest.captureEcranHash` n'en garde que le hash. L'envoi est haché au fil de l'eau
+dans un fichier temporaire du store, puis renommé (ou jeté s'il existe déjà).
+
+Les miniatures WebP sont calculées par un pool de processus (Pillow, dépendance optionnelle),
+hors du chemin de la requête ; sans Pillow, la capture d'origine sert de miniature.
+
+Le ramasse-miettes supprime les blobs qu'aucun ResultatTest ne référence plus, sauf ceux
+modifiés depuis moins de SCREENSHOT_GC_GRACE_SECONDS : une capture est souvent envoyée avant
+que le résultat qui la référence soit ingéré, et un renvoi d'un contenu existant rafraîchit la
+date du blob.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+import anyio
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from models.execution import ResultatTest
+
+try:
+    from PIL import Image
+except ImportError:  # captures servies sans miniature
+    Image = None
+
+# ================= CONFIG =================
+load_dotenv()
+SCREENSHOT_STORE_DIR = os.getenv("SCREENSHOT_STORE_DIR", os.path.join("storage", "captures"))
+SCREENSHOT_MAX_BYTES = int(os.getenv("SCREENSHOT_MAX_BYTES", 20 * 1024 * 1024))
+SCREENSHOT_GC_GRACE_SECONDS = int(os.getenv("SCREENSHOT_GC_GRACE_SECONDS", 24 * 3600))
+THUMBNAIL_MAX_SIZE = int(os.getenv("THUMBNAIL_MAX_SIZE", 320))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 80))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+
+THUMBNAIL_DIR = "miniatures"
+UPLOAD_PREFIX = ".envoi-"
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Signatures reconnues -> type MIME
+MAGIC_NUMBERS = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UnsupportedMediaType(Exception):
+    pass
+
+
+def sniff_media_type(head: bytes) -> str | None:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, media_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return media_type
+    return None
+
+
+def is_digest(value: str) -> bool:
+    return DIGEST_PATTERN.match(value) is not None
+
+
+@dataclass(frozen=True)
+class StoredScreenshot:
+    digest: str
+    size: int
+    media_type: str
+    existing: bool  # contenu déjà présent : rien n'a été écrit
+
+
+class Upload:
+    """Envoi en cours : haché et écrit morceau par morceau dans un fichier temporaire du store."""
+
+    def __init__(self, store: "ScreenshotStore", max_bytes: int):
+        os.makedirs(store.root, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.root, prefix=UPLOAD_PREFIX)
+        self.file = os.fdopen(fd, "wb")
+        self.store = store
+        self.max_bytes = max_bytes
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Capture trop volumineuse (max {self.max_bytes} octets)")
+        if len(self.head) < 16:
+            self.head += chunk[:16 - len(self.head)]
+        self.hasher.update(chunk)
+        self.file.write(chunk)
+
+    def commit(self) -> StoredScreenshot:
+        self.file.close()
+        media_type = sniff_media_type(self.head)
+        if media_type is None:
+            self.abort()
+            raise UnsupportedMediaType("Format d'image non reconnu (PNG, JPEG, GIF ou WebP attendu)")
+        return self.store._adopt(self.tmp_path, self.hasher.hexdigest(), self.size, media_type)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class ScreenshotStore:
+    def __init__(self, root: str = SCREENSHOT_STORE_DIR):
+        self.root = root
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def thumbnail_path(self, digest: str) -> str:
+        return os.path.join(self.root, THUMBNAIL_DIR, digest[:2], digest[2:4], f"{digest}.webp")
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def open_upload(self, max_bytes: int = SCREENSHOT_MAX_BYTES) -> Upload:
+        return Upload(self, max_bytes)
+
+    def put(self, data: bytes) -> StoredScreenshot:
+        upload = self.open_upload(len(data))
+        try:
+            upload.write(data)
+        except BaseException:
+            upload.abort()
+            raise
+        return upload.commit()
+
+    def _adopt(self, tmp_path: str, digest: str, size: int, media_type: str) -> StoredScreenshot:
+        path = self.path_for(digest)
+        try:
+            # Déjà présent : repousse le ramasse-miettes, le contenu vient d'être renvoyé
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.stored += 1
+            return StoredScreenshot(digest, size, media_type, existing=False)
+        os.unlink(tmp_path)
+        with self._lock:
+            self.deduplicated += 1
+            self.bytes_saved += size
+        return StoredScreenshot(digest, size, media_type, existing=True)
+
+    def media_type(self, digest: str) -> str:
+        with open(self.path_for(digest), "rb") as f:
+            return sniff_media_type(f.read(16)) or "application/octet-stream"
+
+    def stats(self) -> dict:
+        return {"stored": self.stored, "deduplicated": self.deduplicated, "bytes_saved": self.bytes_saved}
+
+
+screenshot_store = ScreenshotStore()
+
+
+async def receive(chunks, store: ScreenshotStore = screenshot_store,
+                  max_bytes: int = SCREENSHOT_MAX_BYTES) -> StoredScreenshot:
+    """Stocke un envoi reçu en flux (corps de requête), écritures disque hors de la boucle."""
+    upload = await anyio.to_thread.run_sync(store.open_upload, max_bytes)
+    try:
+        async for chunk in chunks:
+            if chunk:
+                await anyio.to_thread.run_sync(upload.write, chunk)
+    except BaseException:
+        upload.abort()
+        raise
+    return await anyio.to_thread.run_sync(upload.commit)
+
+
+# ================= MINIATURES =================
+# Fonction de module pour rester picklable avec un ProcessPoolExecutor
+def _render_thumbnail(source: str, target: str, max_size: int, quality: int) -> int:
+    with Image.open(source) as image:
+        image.thumbnail((max_size, max_size))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, "WEBP", quality=quality)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return os.path.getsize(target)
+
+
+class Thumbnailer:
+    """Calcule les miniatures dans un pool de processus ; un seul calcul en vol par capture."""
+
+    def __init__(self, store: ScreenshotStore = screenshot_store, workers: int = THUMBNAIL_WORKERS):
+        self.store = store
+        self.workers = max(1, workers)
+        self.available = Image is not None
+        self.rendered = 0
+        self.failed = 0
+        self._pending: dict[str, Future] = {}
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, digest: str) -> Future | None:
+        """Planifie la miniature si elle manque ; None si rien à faire (ou Pillow absent)."""
+        if not self.available or os.path.exists(self.store.thumbnail_path(digest)):
+            return None
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is not None:
+                return future
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            future = self._executor.submit(_render_thumbnail, self.store.path_for(digest),
+                                           self.store.thumbnail_path(digest), THUMBNAIL_MAX_SIZE,
+                                           THUMBNAIL_QUALITY)
+            self._pending[digest] = future
+        # Hors verrou : le callback s'exécute tout de suite si le calcul est déjà fini
+        future.add_done_callback(lambda done: self._finished(digest, done))
+        return future
+
+    def _finished(self, digest: str, future: Future):
+        with self._lock:
+            self._pending.pop(digest, None)
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.rendered += 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"available": self.available, "workers": self.workers, "pending": len(self._pending),
+                "rendered": self.rendered, "failed": self.failed}
+
+
+thumbnailer = Thumbnailer()
+
+
+# ================= RAMASSE-MIETTES =================
+def referenced_digests(connection) -> set[bytes]:
+    result = connection.execute(
+        select(ResultatTest.captureEcranHash).where(ResultatTest.captureEcranHash.is_not(None)).distinct(),
+        execution_options={"stream_results": True, "yield_per": 10000},
+    )
+    # 32 octets par hash plutôt qu'une chaîne de 64 caractères
+    return {bytes.fromhex(digest) for digest, in result}
+
+
+def _files(directory: str):
+    """Fichiers des répertoires de second niveau (ab/cd/<fichier>)."""
+    if not os.path.isdir(directory):
+        return
+    for first in os.scandir(directory):
+        if first.is_dir() and len(first.name) == 2:
+            for second in os.scandir(first.path):
+                if second.is_dir():
+                    yield from (entry for entry in os.scandir(second.path) if entry.is_file())
+
+
+def collect_garbage(connection, store: ScreenshotStore = screenshot_store,
+                    grace_seconds: int = SCREENSHOT_GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    referenced = referenced_digests(connection)
+    cutoff = time.time() - grace_seconds
+    summary = {"references": len(referenced), "blobs": 0, "supprimes": 0, "octets_liberes": 0,
+               "miniatures_supprimees": 0, "envois_abandonnes": 0}
+    removed = set()
+
+    def remove(path: str):
+        if not dry_run:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    for entry in _files(store.root):
+        if not is_digest(entry.name):
+            continue
+        summary["blobs"] += 1
+        stat = entry.stat()
+        if bytes.fromhex(entry.name) in referenced or stat.st_mtime > cutoff:
+            continue
+        remove(entry.path)
+        removed.add(entry.name)
+        summary["supprimes"] += 1
+        summary["octets_liberes"] += stat.st_size
+
+    # Miniatures dont la capture a disparu (supprimée ci-dessus ou auparavant)
+    for entry in _files(os.path.join(store.root, THUMBNAIL_DIR)):
+        digest = entry.name.removesuffix(".webp")
+        if is_digest(digest) and (digest in removed or not store.exists(digest)):
+            remove(entry.path)
+            summary["miniatures_supprimees"] += 1
+
+    # Envois interrompus (processus tué entre l'écriture et le renommage)
+    if os.path.isdir(store.root):
+        for entry in os.scandir(store.root):
+            if entry.name.startswith(UPLOAD_PREFIX) and entry.stat().st_mtime <= cutoff:
+                remove(entry.path)
+                summary["envois_abandonnes"] += 1
+    return summary
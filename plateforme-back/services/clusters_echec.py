@@ -0,0 +1,402 @@
+"""Regroupement des échecs quasi identiques (index de signatures MinHash / LSH).
+
+Quand une dépendance commune casse, des centaines de ResultatTest portent le même message
+d'erreur à quelques identifiants près. Chaque message d'échec est :
+
+1. normalisé : horodatages, UUID, adresses, hash, URL, nombres remplacés par des jetons,
+   chemins réduits au nom de fichier, casse et espaces uniformisés ; seuls les
+   CLUSTER_MAX_CHARS premiers caractères comptent (l'aperçu conservé dans la ligne) ;
+2. découpé en triplets de mots, hachés (crc32) puis résumés par une signature MinHash de
+   CLUSTER_NUM_PERM permutations calculée en NumPy ;
+3. cherché dans l'index : empreinte exacte (SHA-256 du message normalisé), sinon
+   candidats LSH (CLUSTER_BANDS bandes) vérifiés par similarité de Jaccard estimée
+   >= CLUSTER_THRESHOLD ; sans correspondance, un nouveau cluster est créé.
+
+L'index est en mémoire, par processus : chargé au premier usage puis complété à chaque
+lot par les clusters créés depuis (id > dernier id chargé), y compris par d'autres workers.
+Une recherche coûte quelques dizaines de microsecondes. Les clusters créés dans une
+transaction ne sont ajoutés à l'index qu'au commit.
+
+La première Anomalie créée pour un résultat d'un cluster devient l'anomalie du cluster :
+les échecs suivants du même cluster la retrouvent au lieu d'en ouvrir une nouvelle.
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, case, event, func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models.anomalie import Anomalie
+from models.execution import ClusterEchec, ResultatTest
+from services.log_store import LOG_PREVIEW_CHARS
+from services.statuts import ECHOUE, classer_statut
+
+# ================= CONFIG =================
+load_dotenv()
+CLUSTER_NUM_PERM = int(os.getenv("CLUSTER_NUM_PERM", 128))
+CLUSTER_BANDS = int(os.getenv("CLUSTER_BANDS", 32))
+CLUSTER_THRESHOLD = float(os.getenv("CLUSTER_THRESHOLD", 0.7))
+CLUSTER_MAX_CHARS = int(os.getenv("CLUSTER_MAX_CHARS", LOG_PREVIEW_CHARS))
+SHINGLE_SIZE = 3
+
+if CLUSTER_NUM_PERM % CLUSTER_BANDS:
+    raise ValueError("CLUSTER_NUM_PERM doit être un multiple de CLUSTER_BANDS")
+
+PENDING_KEY = "clusters_echec_pending"
+
+# ================= NORMALISATION =================
+_RULES = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:z|[+-]\d{2}:?\d{2})?\b"), "<ts>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b"), "<date>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<time>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-f]+\b"), "<addr>"),
+    (re.compile(r"\b[a-z]+://\S+"), "<url>"),
+    (re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b"), "<email>"),
+    # Chemins : seuls les deux derniers segments comptent (même module, autre checkout / autre machine)
+    (re.compile(r"(?:[a-z]:)?(?:[\\/][\w.\-]+){2,}"), lambda m: "/".join(re.split(r"[\\/]", m.group(0))[-2:])),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize(message: str) -> str:
+    text = message[:CLUSTER_MAX_CHARS].lower()
+    for pattern, replacement in _RULES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# ================= MINHASH =================
+_PRIME = np.uint64((1 << 32) + 15)
+_rng = np.random.default_rng(20240611)  # graine fixe : signatures stables entre processus et redémarrages
+_A = _rng.integers(1, 1 << 31, CLUSTER_NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, CLUSTER_NUM_PERM, dtype=np.uint64)
+_EMPTY = np.full(CLUSTER_NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+
+def shingles(normalized: str) -> np.ndarray:
+    words = normalized.split(" ")
+    if len(words) <= SHINGLE_SIZE:
+        grams = {normalized}
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(normalized: str) -> np.ndarray:
+    hashes = shingles(normalized)
+    if not len(hashes):
+        return _EMPTY.copy()
+    # (a·x + b) mod p, a < 2^31 et x < 2^32 : pas de débordement en uint64
+    permuted = (hashes[:, None] * _A + _B) % _PRIME
+    return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Jaccard estimé : part des permutations dont les minimums coïncident."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+# ================= INDEX =================
+class FailureIndex:
+    def __init__(self, num_perm: int = CLUSTER_NUM_PERM, bands: int = CLUSTER_BANDS,
+                 threshold: float = CLUSTER_THRESHOLD):
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+        self._signatures: dict[int, np.ndarray] = {}
+        self._fingerprints: dict[str, int] = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.lsh_hits = 0
+        self.misses = 0
+
+    def _band_keys(self, signature: np.ndarray):
+        data = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [data[band * width:(band + 1) * width] for band in range(self.bands)]
+
+    def add(self, cluster_id: int, signature: np.ndarray | None, empreinte: str | None = None):
+        with self._lock:
+            if empreinte is not None:
+                self._fingerprints.setdefault(empreinte, cluster_id)
+            if signature is None or cluster_id in self._signatures:
+                return
+            self._signatures[cluster_id] = signature
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(key, []).append(cluster_id)
+
+    def query(self, signature: np.ndarray, empreinte: str | None = None) -> tuple[int | None, float]:
+        """(cluster, similarité) le plus proche au-dessus du seuil, ou (None, meilleure similarité)."""
+        with self._lock:
+            if empreinte is not None and empreinte in self._fingerprints:
+                self.exact_hits += 1
+                return self._fingerprints[empreinte], 1.0
+            candidates = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(key, ()))
+            best, best_score = None, 0.0
+            for cluster_id in candidates:
+                score = similarity(signature, self._signatures[cluster_id])
+                if score > best_score:
+                    best, best_score = cluster_id, score
+            if best is not None and best_score >= self.threshold:
+                self.lsh_hits += 1
+                return best, best_score
+            self.misses += 1
+            return None, best_score
+
+    def refresh(self, connection):
+        """Charge les clusters créés depuis le dernier chargement (tous au premier appel).
+
+        Seul ce parcours fait avancer le dernier id connu : un cluster ajouté au commit par
+        `add` peut précéder des clusters d'autres workers pas encore chargés.
+        """
+        rows = connection.execute(
+            select(ClusterEchec.id, ClusterEchec.signature, ClusterEchec.empreinte)
+            .where(ClusterEchec.id > self._last_id)
+            .order_by(ClusterEchec.id)
+        ).all()
+        for cluster_id, signature, empreinte in rows:
+            if signature is not None:
+                self.add(cluster_id, np.frombuffer(signature, dtype=np.uint32), empreinte)
+        if rows:
+            with self._lock:
+                self._last_id = max(self._last_id, rows[-1].id)
+
+    def clear(self):
+        with self._lock:
+            self._buckets = [{} for _ in range(self.bands)]
+            self._signatures.clear()
+            self._fingerprints.clear()
+            self._last_id = 0
+
+    def stats(self) -> dict:
+        return {
+            "clusters": len(self._signatures),
+            "fingerprints": len(self._fingerprints),
+            "exact_hits": self.exact_hits,
+            "lsh_hits": self.lsh_hits,
+            "misses": self.misses,
+        }
+
+
+failure_index = FailureIndex()
+
+
+# ================= AFFECTATION =================
+def is_failure(statut_resultat: str | None, statut_execution: str | None = None) -> bool:
+    return classer_statut(statut_resultat or statut_execution) == ECHOUE
+
+
+def assign_failures(connection, failures: list[tuple[int, str, datetime]],
+                    index: FailureIndex = failure_index) -> tuple[dict[int, int], list[tuple]]:
+    """Rattache chaque échec (resultat_id, message, date) à un cluster, créé au besoin.
+
+    Renvoie (resultat_id -> cluster_id, clusters à ajouter à l'index après commit).
+    Ne commit pas.
+    """
+    prepared = []
+    for resultat_id, message, date in failures:
+        normalized = normalize(message or "")
+        if normalized:
+            prepared.append((resultat_id, date, normalized, fingerprint(normalized), minhash(normalized)))
+    if not prepared:
+        return {}, []
+
+    index.refresh(connection)
+    # Clusters créés par ce lot : indexés à part (ids provisoires négatifs) jusqu'à l'insertion
+    batch_index = FailureIndex(threshold=index.threshold)
+    new_clusters: dict[int, dict] = {}
+    matched: list[tuple[int, int, datetime, str]] = []
+    for resultat_id, date, normalized, empreinte, signature in prepared:
+        cluster_id, _ = index.query(signature, empreinte)
+        if cluster_id is None:
+            cluster_id, _ = batch_index.query(signature, empreinte)
+        if cluster_id is None:
+            cluster_id = -(len(new_clusters) + 1)
+            batch_index.add(cluster_id, signature, empreinte)
+            new_clusters[cluster_id] = {
+                "empreinte": empreinte, "signature": signature.tobytes(), "messageNormalise": normalized,
+                "nombreResultats": 0, "premiereOccurrence": date, "derniereOccurrence": date,
+            }
+        matched.append((resultat_id, cluster_id, date, empreinte))
+
+    # Occurrences par cluster
+    counts: dict[int, list] = {}
+    for _, cluster_id, date, _ in matched:
+        entry = counts.setdefault(cluster_id, [0, date, date])
+        entry[0] += 1
+        entry[1], entry[2] = min(entry[1], date), max(entry[2], date)
+
+    real_ids = {}
+    if new_clusters:
+        temporary = list(new_clusters)
+        for cluster_id in temporary:
+            count, first, last = counts.pop(cluster_id)
+            new_clusters[cluster_id].update(nombreResultats=count, premiereOccurrence=first, derniereOccurrence=last)
+        created = connection.execute(
+            insert(ClusterEchec).returning(ClusterEchec.id, sort_by_parameter_order=True),
+            [new_clusters[cluster_id] for cluster_id in temporary],
+        ).scalars().all()
+        real_ids = dict(zip(temporary, created))
+
+    if counts:
+        table = ClusterEchec.__table__
+        derniere = func.coalesce(table.c.derniereOccurrence, bindparam("derniere"))
+        connection.execute(
+            update(table).where(table.c.id == bindparam("cluster_id")).values(
+                nombreResultats=func.coalesce(table.c.nombreResultats, 0) + bindparam("nombre"),
+                derniereOccurrence=case((derniere < bindparam("derniere"), bindparam("derniere")), else_=derniere),
+            ),
+            [{"cluster_id": cluster_id, "nombre": count, "derniere": last}
+             for cluster_id, (count, _, last) in counts.items()],
+        )
+
+    assignments = {resultat_id: real_ids.get(cluster_id, cluster_id) for resultat_id, cluster_id, _, _ in matched}
+    resultat = ResultatTest.__table__
+    connection.execute(
+        update(resultat).where(resultat.c.id == bindparam("resultat_id")).values(clusterEchecId=bindparam("cluster_id")),
+        [{"resultat_id": resultat_id, "cluster_id": cluster_id} for resultat_id, cluster_id in assignments.items()],
+    )
+
+    pending = [(real_ids[temp], np.frombuffer(values["signature"], dtype=np.uint32), values["empreinte"])
+               for temp, values in new_clusters.items()]
+    # Nouvelles empreintes exactes de clusters existants : retrouvées sans LSH ensuite
+    pending += [(assignments[resultat_id], None, empreinte) for resultat_id, cluster_id, _, empreinte in matched
+                if cluster_id > 0]
+    return assignments, pending
+
+
+def cluster_failures(db: Session, failures: list[tuple[int, str, datetime]]) -> dict[int, int]:
+    """`assign_failures` dans la transaction de la session ; index mis à jour au commit."""
+    assignments, pending = assign_failures(db.connection(), failures)
+    if pending:
+        db.info.setdefault(PENDING_KEY, []).extend(pending)
+    return assignments
+
+
+def index_pending(pending: list[tuple], index: FailureIndex = failure_index):
+    for cluster_id, signature, empreinte in pending:
+        index.add(cluster_id, signature, empreinte)
+
+
+# ================= ORM HOOKS =================
+@event.listens_for(Session, "after_flush")
+def _cluster_new_objects(session, flush_context):
+    # Résultats créés via l'ORM (db.add) : même traitement que l'ingestion en masse
+    resultats = []
+    for obj in session.new:
+        if isinstance(obj, ResultatTest) and obj.clusterEchecId is None:
+            execution = obj.__dict__.get("execution")
+            if is_failure(obj.statut, execution.statut if execution is not None else None) and obj.messageErreur:
+                resultats.append(obj)
+    if resultats:
+        now = datetime.utcnow()
+        assignments = cluster_failures(session, [(obj.id, obj.messageErreur, now) for obj in resultats])
+        for obj in resultats:
+            if obj.id in assignments:
+                set_committed_value(obj, "clusterEchecId", assignments[obj.id])
+
+    # Première anomalie d'un cluster : devient celle du cluster
+    anomalies = [obj for obj in session.new if isinstance(obj, Anomalie) and obj.resultat_id is not None]
+    if anomalies:
+        cluster = ClusterEchec.__table__
+        session.connection().execute(
+            update(cluster)
+            .where(cluster.c.id == select(ResultatTest.clusterEchecId)
+                   .where(ResultatTest.id == bindparam("resultat_id")).scalar_subquery())
+            .where(cluster.c.anomalieId.is_(None))
+            .values(anomalieId=bindparam("anomalie_id")),
+            [{"resultat_id": obj.resultat_id, "anomalie_id": obj.id} for obj in anomalies],
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _index_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        index_pending(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+# ================= ANOMALIES =================
+def anomaly_for_cluster(db: Session, cluster_id: int, reporter_id: int | None, severite: str = "MAJEURE") -> dict | None:
+    """Anomalie du cluster, créée si elle n'existe pas encore ; None si le cluster est inconnu.
+
+    L'anomalie passe par l'ORM (compteurs RapportQA tenus par services/rapport_aggregation.py) ;
+    le hook after_flush ne la rattache au cluster que s'il n'en a pas déjà une, ce qui
+    départage deux requêtes concurrentes : la perdante annule sa transaction.
+    """
+    cluster = db.execute(
+        select(ClusterEchec.anomalieId, ClusterEchec.messageNormalise, ClusterEchec.nombreResultats)
+        .where(ClusterEchec.id == cluster_id)
+    ).first()
+    if cluster is None:
+        return None
+    if cluster.anomalieId is not None:
+        return {"anomalie_id": cluster.anomalieId, "cree": False}
+
+    dernier_resultat = db.scalar(select(func.max(ResultatTest.id)).where(ResultatTest.clusterEchecId == cluster_id))
+    anomalie = Anomalie(
+        titre=f"Échec récurrent : {cluster.messageNormalise[:120]}",
+        description=f"{cluster.nombreResultats} résultat(s) en échec avec ce message :\n\n{cluster.messageNormalise}",
+        severite=severite, statut="OUVERTE", resultat_id=dernier_resultat, reporterId=reporter_id,
+    )
+    db.add(anomalie)
+    db.flush()
+    anomalie_id = db.scalar(select(ClusterEchec.anomalieId).where(ClusterEchec.id == cluster_id))
+    if anomalie_id != anomalie.id:
+        db.rollback()
+        return {"anomalie_id": anomalie_id, "cree": False}
+    db.commit()
+    return {"anomalie_id": anomalie_id, "cree": True}
+
+
+# ================= RATTRAPAGE =================
+def backfill(engine, batch_size: int = 5000, index: FailureIndex = failure_index) -> dict:
+    """Rattache les résultats en échec encore sans cluster, par lots (une transaction par lot)."""
+    from models.execution import ExecutionTest
+    from services.statuts import sql_est_echoue
+
+    last_id, scanned, assigned = 0, 0, 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(ResultatTest.id, ResultatTest.messageErreur, ExecutionTest.dateExecution)
+                .join(ExecutionTest, ExecutionTest.id == ResultatTest.execution_id)
+                .where(ResultatTest.id > last_id, ResultatTest.clusterEchecId.is_(None),
+                       ResultatTest.messageErreur.is_not(None),
+                       sql_est_echoue(func.coalesce(ResultatTest.statut, ExecutionTest.statut)))
+                .order_by(ResultatTest.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+            assignments, pending = assign_failures(
+                connection, [(row.id, row.messageErreur, row.dateExecution or datetime.utcnow()) for row in rows], index
+            )
+            assigned += len(assignments)
+        index_pending(pending, index)
+    return {"resultats": scanned, "rattaches": assigned, **index.stats()}
@@ -0,0 +1,225 @@
+"""Export en flux des exécutions, résultats et anomalies (CSV, NDJSON, Parquet).
+
+Une ligne par exécution et par anomalie de son résultat (une exécution sans anomalie donne
+une ligne aux colonnes anomalie vides), ordonnée par exécution. Les lignes sont lues par un
+curseur serveur (`stream_results` / `yield_per`, EXPORT_CHUNK_SIZE lignes à la fois) et
+encodées bloc par bloc : la mémoire reste bornée par un bloc (un groupe de lignes Parquet)
+quelle que soit la taille de l'export.
+
+Parquet passe par pyarrow, dépendance optionnelle : sans elle, seuls CSV et NDJSON sont
+proposés. Les colonnes de logs ne contiennent que l'aperçu gardé en ligne et le hash du blob
+(services/log_store.py), pas le texte complet.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from models.anomalie import Anomalie
+from models.execution import ExecutionTest, ResultatTest
+from services.scope import tests_of_projet, tests_of_sprint
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # CSV et NDJSON restent disponibles
+    pyarrow = None
+
+# ================= CONFIG =================
+load_dotenv()
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 10000))
+EXPORT_PARQUET_ROW_GROUP = int(os.getenv("EXPORT_PARQUET_ROW_GROUP", 100000))
+
+FORMATS = ("csv", "ndjson", "parquet") if pyarrow is not None else ("csv", "ndjson")
+MEDIA_TYPES = {
+    "csv": "text/csv",  # charset ajouté par Starlette
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (nom exporté, colonne, type Arrow)
+COLUMNS = [
+    ("execution_id", ExecutionTest.id, "int64"),
+    ("test_id", ExecutionTest.test_id, "int64"),
+    ("dateExecution", ExecutionTest.dateExecution, "timestamp"),
+    ("statut", ExecutionTest.statut, "string"),
+    ("dureeExecution", ExecutionTest.dureeExecution, "int64"),
+    ("executeurId", ExecutionTest.executeurId, "int64"),
+    ("resultat_id", ResultatTest.id, "int64"),
+    ("resultat_statut", ResultatTest.statut, "string"),
+    ("messageErreur", ResultatTest.messageErreur, "string"),
+    ("messageErreurHash", ResultatTest.messageErreurHash, "string"),
+    ("logsHash", ResultatTest.logsHash, "string"),
+    ("logsTaille", ResultatTest.logsTaille, "int64"),
+    ("captureEcranHash", ResultatTest.captureEcranHash, "string"),
+    ("commentaire", ResultatTest.commentaire, "string"),
+    ("clusterEchecId", ResultatTest.clusterEchecId, "int64"),
+    ("anomalie_id", Anomalie.id, "int64"),
+    ("anomalie_titre", Anomalie.titre, "string"),
+    ("anomalie_severite", Anomalie.severite, "string"),
+    ("anomalie_statut", Anomalie.statut, "string"),
+    ("anomalie_dateCreation", Anomalie.dateCreation, "timestamp"),
+    ("anomalie_dateResolution", Anomalie.dateResolution, "timestamp"),
+]
+NAMES = [name for name, _, _ in COLUMNS]
+
+
+def export_query(projet_id: int | None = None, sprint_id: int | None = None,
+                 debut: datetime | None = None, fin: datetime | None = None):
+    query = (
+        select(*(column.label(name) for name, column, _ in COLUMNS))
+        .select_from(ExecutionTest)
+        .outerjoin(ResultatTest, ResultatTest.execution_id == ExecutionTest.id)
+        .outerjoin(Anomalie, Anomalie.resultat_id == ResultatTest.id)
+        .order_by(ExecutionTest.id, ResultatTest.id, Anomalie.id)
+    )
+    if projet_id is not None:
+        query = query.where(ExecutionTest.test_id.in_(tests_of_projet(projet_id)))
+    if sprint_id is not None:
+        query = query.where(ExecutionTest.test_id.in_(tests_of_sprint(sprint_id)))
+    if debut is not None:
+        query = query.where(ExecutionTest.dateExecution >= debut)
+    if fin is not None:
+        query = query.where(ExecutionTest.dateExecution < fin)
+    return query
+
+
+# ================= ENCODEURS =================
+# Interface commune, utilisable depuis un générateur synchrone (CLI) ou asynchrone (route) :
+# header() puis encode(lignes) par bloc, enfin close() ; chacun renvoie des octets à émettre.
+class CsvEncoder:
+    def header(self) -> bytes:
+        return self._write([NAMES])
+
+    def encode(self, rows) -> bytes:
+        return self._write(rows)
+
+    def close(self) -> bytes:
+        return b""
+
+    @staticmethod
+    def _write(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+        )
+        return buffer.getvalue().encode("utf-8")
+
+
+class NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows) -> bytes:
+        dumps = json.JSONEncoder(ensure_ascii=False, default=_isoformat).encode
+        return "".join(dumps(dict(zip(NAMES, row))) + "\n" for row in rows).encode("utf-8")
+
+    def close(self) -> bytes:
+        return b""
+
+
+def _isoformat(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+
+class _Sink:
+    """Fichier en écriture dont le contenu est récupéré (et vidé) après chaque groupe de lignes."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Lignes accumulées jusqu'à EXPORT_PARQUET_ROW_GROUP, puis écrites en un groupe de lignes."""
+
+    def __init__(self, row_group: int = EXPORT_PARQUET_ROW_GROUP):
+        if pyarrow is None:
+            raise RuntimeError("Export Parquet indisponible : pyarrow n'est pas installé")
+        types = {"int64": pyarrow.int64(), "string": pyarrow.string(), "timestamp": pyarrow.timestamp("us")}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, _, kind in COLUMNS])
+        self.row_group = row_group
+        self.pending = []
+        self.sink = _Sink()
+        self.writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(self.sink, mode="w"), self.schema,
+                                                    compression="zstd")
+
+    def header(self) -> bytes:
+        return self.sink.drain()
+
+    def encode(self, rows) -> bytes:
+        self.pending.extend(rows)
+        if len(self.pending) < self.row_group:
+            return b""
+        self._write_group()
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        if self.pending:
+            self._write_group()
+        self.writer.close()
+        return self.sink.drain()
+
+    def _write_group(self):
+        columns = list(zip(*self.pending))
+        self.pending = []
+        batch = pyarrow.record_batch(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_batch(batch, row_group_size=len(columns[0]))
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+def make_encoder(format_: str):
+    if format_ not in FORMATS:
+        raise ValueError(f"Format d'export non disponible : {format_}")
+    return ENCODERS[format_]()
+
+
+# ================= FLUX =================
+def stream_export(connection, query, format_: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Octets de l'export, bloc par bloc, depuis une connexion synchrone (CLI, benchmark)."""
+    encoder = make_encoder(format_)
+    yield encoder.header()
+    result = connection.execute(query, execution_options={"stream_results": True, "yield_per": chunk_size})
+    for rows in result.partitions():
+        data = encoder.encode(rows)
+        if data:
+            yield data
+    yield encoder.close()
+
+
+async def astream_export(session, query, format_: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Même flux depuis une AsyncSession (curseur serveur via `session.stream`)."""
+    encoder = make_encoder(format_)
+    yield encoder.header()
+    result = await session.stream(query, execution_options={"yield_per": chunk_size})
+    async for rows in result.partitions():
+        data = encoder.encode(rows)
+        if data:
+            yield data
+    yield encoder.close()
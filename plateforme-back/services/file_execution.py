@@ -0,0 +1,397 @@
+"""File d'exécution des tests automatisés, stockée dans la base (table tache_execution).
+
+Plusieurs workers (processus, éventuellement sur plusieurs machines) réclament des tâches
+concurremment :
+- PostgreSQL : `SELECT … FOR UPDATE SKIP LOCKED` dans une CTE matérialisée, puis UPDATE …
+  RETURNING. Chaque worker saute les lignes verrouillées par les autres au lieu de les
+  attendre : pas de contention sur la tête de file.
+- SQLite : même UPDATE … WHERE id IN (SELECT …) RETURNING, en une instruction ; le verrou
+  d'écriture de la base sérialise les réclamations.
+
+Une tâche réclamée porte un bail (QUEUE_LEASE_SECONDS) prolongé par les heartbeats du worker.
+Un bail expiré (worker arrêté ou bloqué) remet la tâche en attente, ou la passe ECHOUEE si ses
+tentatives sont épuisées. Toutes les écritures d'un worker sont conditionnées à la possession
+de la tâche (workerId + EN_COURS) : un worker qui a perdu son bail n'écrit rien.
+
+Un test qui échoue est un résultat, pas une erreur : seule une exception du runner (outil
+absent, délai dépassé…) déclenche une nouvelle tentative, après un backoff exponentiel avec
+gigue ; `TacheInvalide` fait échouer la tâche sans nouvelle tentative. Les résultats sont écrits
+par `ingest_chunk`, comme une ingestion en masse, dans la transaction qui clôt la tâche.
+"""
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from models.execution import TacheExecution
+from models.tests import Test, TestAutomatise
+from services.ingestion import ingest_chunk
+
+# ================= CONFIG =================
+load_dotenv()
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", 60))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", 3))
+QUEUE_BACKOFF_BASE_SECONDS = float(os.getenv("QUEUE_BACKOFF_BASE_SECONDS", 5))
+QUEUE_BACKOFF_MAX_SECONDS = float(os.getenv("QUEUE_BACKOFF_MAX_SECONDS", 600))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 4))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", 1))
+WORKER_TASK_TIMEOUT = int(os.getenv("WORKER_TASK_TIMEOUT", 900))
+LOG_TAIL_CHARS = 2000
+PRIORITE_MIN, PRIORITE_MAX = -100, 100
+
+EN_ATTENTE = "EN_ATTENTE"
+EN_COURS = "EN_COURS"
+TERMINEE = "TERMINEE"
+ECHOUEE = "ECHOUEE"
+ANNULEE = "ANNULEE"
+STATUTS = (EN_ATTENTE, EN_COURS, TERMINEE, ECHOUEE, ANNULEE)
+
+
+class TacheInvalide(Exception):
+    """Levée par un runner quand réessayer ne changerait rien (tâche mal paramétrée)."""
+
+
+@dataclass
+class Tache:
+    id: int
+    test_id: int
+    tentatives: int
+    maxTentatives: int
+    demandeurId: int | None
+    parametres: dict = field(default_factory=dict)
+    framework: str | None = None
+    outil: str | None = None
+    typeTest: str | None = None
+
+
+def backoff_seconds(tentative: int, base: float = QUEUE_BACKOFF_BASE_SECONDS,
+                    maximum: float = QUEUE_BACKOFF_MAX_SECONDS) -> float:
+    """Délai avant la tentative suivante : exponentiel, plafonné, gigue de 50 %."""
+    delay = min(maximum, base * 2 ** max(0, tentative - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+# ================= PRODUCTEUR =================
+def enqueue(connection, test_ids: list[int], priorite: int = 0, parametres: dict | None = None,
+            demandeur_id: int | None = None, max_tentatives: int = QUEUE_MAX_ATTEMPTS) -> dict:
+    """Ajoute une tâche par test automatisé ; les autres ids sont renvoyés comme rejetés."""
+    automated = set(connection.scalars(
+        select(Test.id).where(Test.id.in_(set(test_ids)), Test.type == "automatise")
+    ))
+    accepted = [test_id for test_id in test_ids if test_id in automated]
+    ids = []
+    if accepted:
+        now = datetime.utcnow()
+        payload = json.dumps(parametres) if parametres else None
+        ids = list(connection.scalars(
+            insert(TacheExecution).returning(TacheExecution.id, sort_by_parameter_order=True),
+            [{"test_id": test_id, "statut": EN_ATTENTE, "priorite": priorite, "parametres": payload,
+              "tentatives": 0, "maxTentatives": max_tentatives, "disponibleA": now, "dateCreation": now,
+              "demandeurId": demandeur_id} for test_id in accepted],
+        ))
+    return {"tache_ids": ids, "rejetes": [test_id for test_id in test_ids if test_id not in automated]}
+
+
+def cancel(connection, tache_id: int) -> bool:
+    """Annule une tâche encore en attente (une tâche en cours va à son terme)."""
+    result = connection.execute(
+        update(TacheExecution)
+        .where(TacheExecution.id == tache_id, TacheExecution.statut == EN_ATTENTE)
+        .values(statut=ANNULEE, dateFin=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def queue_stats(connection) -> dict:
+    counts = dict(connection.execute(
+        select(TacheExecution.statut, func.count()).group_by(TacheExecution.statut)
+    ).all())
+    oldest = connection.scalar(
+        select(func.min(TacheExecution.disponibleA)).where(TacheExecution.statut == EN_ATTENTE)
+    )
+    return {
+        **{statut: counts.get(statut, 0) for statut in STATUTS},
+        "attente_max_s": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0,
+    }
+
+
+# ================= CONSOMMATEUR =================
+def claim(connection, worker_id: str, limit: int, lease_seconds: int = QUEUE_LEASE_SECONDS) -> list[Tache]:
+    """Réclame jusqu'à `limit` tâches disponibles pour `worker_id` (à valider par l'appelant)."""
+    now = datetime.utcnow()
+    candidates = (
+        select(TacheExecution.id)
+        .where(TacheExecution.statut == EN_ATTENTE, TacheExecution.disponibleA <= now)
+        .order_by(TacheExecution.priorite.desc(), TacheExecution.disponibleA, TacheExecution.id)
+        .limit(limit)
+    )
+    if connection.dialect.name == "postgresql":
+        # Matérialisée : le LIMIT et les verrous ne portent que sur les lignes réclamées
+        candidates = candidates.with_for_update(skip_locked=True).cte("candidates").prefix_with("MATERIALIZED")
+        candidates = select(candidates.c.id)
+    claimed = connection.execute(
+        update(TacheExecution)
+        .where(TacheExecution.id.in_(candidates))
+        .values(statut=EN_COURS, workerId=worker_id, tentatives=TacheExecution.tentatives + 1,
+                bailExpireA=now + timedelta(seconds=lease_seconds), dateDebut=now)
+        .returning(TacheExecution.id, TacheExecution.test_id, TacheExecution.tentatives,
+                   TacheExecution.maxTentatives, TacheExecution.demandeurId, TacheExecution.parametres)
+    ).all()
+    if not claimed:
+        return []
+
+    details = {row.id: row for row in connection.execute(
+        select(TestAutomatise.id, TestAutomatise.framework, TestAutomatise.outil, TestAutomatise.typeTest)
+        .where(TestAutomatise.id.in_({row.test_id for row in claimed}))
+    )}
+    taches = []
+    for row in sorted(claimed, key=lambda row: row.id):
+        test = details.get(row.test_id)
+        taches.append(Tache(
+            id=row.id, test_id=row.test_id, tentatives=row.tentatives, maxTentatives=row.maxTentatives,
+            demandeurId=row.demandeurId, parametres=json.loads(row.parametres) if row.parametres else {},
+            framework=test.framework if test else None, outil=test.outil if test else None,
+            typeTest=test.typeTest if test else None,
+        ))
+    return taches
+
+
+def _owned(worker_id: str, tache_ids):
+    return (TacheExecution.id.in_(tache_ids), TacheExecution.workerId == worker_id,
+            TacheExecution.statut == EN_COURS)
+
+
+def heartbeat(connection, worker_id: str, tache_ids: list[int],
+              lease_seconds: int = QUEUE_LEASE_SECONDS) -> set[int]:
+    """Prolonge les baux ; retourne les ids encore possédés (les autres ont été repris)."""
+    if not tache_ids:
+        return set()
+    return set(connection.scalars(
+        update(TacheExecution)
+        .where(*_owned(worker_id, tache_ids))
+        .values(bailExpireA=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        .returning(TacheExecution.id)
+    ))
+
+
+def requeue_expired(connection) -> dict:
+    """Baux expirés : remise en attente, ou ECHOUEE si les tentatives sont épuisées."""
+    now = datetime.utcnow()
+    expired = (TacheExecution.statut == EN_COURS, TacheExecution.bailExpireA < now)
+    exhausted = connection.execute(
+        update(TacheExecution)
+        .where(*expired, TacheExecution.tentatives >= TacheExecution.maxTentatives)
+        .values(statut=ECHOUEE, dateFin=now, bailExpireA=None,
+                derniereErreur=func.coalesce(TacheExecution.workerId, "") + " : bail expiré")
+    ).rowcount
+    requeued = connection.execute(
+        update(TacheExecution)
+        .where(*expired)
+        .values(statut=EN_ATTENTE, disponibleA=now, workerId=None, bailExpireA=None,
+                derniereErreur=func.coalesce(TacheExecution.workerId, "") + " : bail expiré")
+    ).rowcount
+    return {"remises_en_attente": requeued, "echouees": exhausted}
+
+
+def fail(connection, worker_id: str, tache: Tache, error: str, retryable: bool = True) -> str | None:
+    """Nouvelle tentative après backoff, ou ECHOUEE ; None si la tâche n'est plus possédée."""
+    now = datetime.utcnow()
+    if retryable and tache.tentatives < tache.maxTentatives:
+        values = {"statut": EN_ATTENTE, "disponibleA": now + timedelta(seconds=backoff_seconds(tache.tentatives))}
+    else:
+        values = {"statut": ECHOUEE, "dateFin": now}
+    result = connection.execute(
+        update(TacheExecution)
+        .where(*_owned(worker_id, [tache.id]))
+        .values(**values, workerId=None, bailExpireA=None, derniereErreur=error[-LOG_TAIL_CHARS:])
+    )
+    return values["statut"] if result.rowcount == 1 else None
+
+
+def complete(db: Session, worker_id: str, tache: Tache, outcome: dict) -> dict | None:
+    """Écrit ExecutionTest + ResultatTest et clôt la tâche (executionId compris) en une transaction.
+
+    `outcome` : statut, dureeExecution, et `resultat` (mêmes champs que l'ingestion en masse).
+    Retourne la sortie d'`ingest_chunk`, ou None si le bail a été perdu entre-temps.
+    """
+    now = datetime.utcnow()
+    owned = db.execute(
+        update(TacheExecution)
+        .where(*_owned(worker_id, [tache.id]))
+        .values(statut=TERMINEE, dateFin=now, bailExpireA=None)
+    ).rowcount
+    if owned != 1:
+        db.rollback()
+        return None
+    # Sans commit : la tâche n'est jamais TERMINEE sans son executionId
+    result, = ingest_chunk(db, [(0, {
+        "test_id": tache.test_id,
+        "statut": outcome["statut"],
+        "dureeExecution": outcome.get("dureeExecution"),
+        "dateExecution": now,
+        "executeurId": tache.demandeurId,
+        "resultat": {"commentaire": f"Tâche {tache.id}, {worker_id}, tentative {tache.tentatives}",
+                     **outcome.get("resultat", {})},
+    })], commit=False)
+    if "error" in result:
+        db.rollback()
+        return result
+    db.execute(update(TacheExecution).where(TacheExecution.id == tache.id)
+               .values(executionId=result["execution_id"]))
+    db.commit()
+    return result
+
+
+# ================= RUNNER =================
+def command_runner(template: str, timeout: int = WORKER_TASK_TIMEOUT):
+    """Runner qui lance une commande par tâche, formatée avec les champs de la tâche.
+
+    Exemple : "npx playwright test --grep @T{test_id}". Le modèle est découpé en arguments
+    avant formatage : une valeur de `parametres` reste un seul argument, quels que soient ses
+    espaces ou guillemets. Une valeur commençant par "-" est refusée (`TacheInvalide`) : elle
+    serait lue comme une option par la commande. Code retour 0 -> PASSED, sinon FAILED (avec
+    la fin de la sortie d'erreur) ; un délai dépassé lève une exception et la tâche est retentée.
+    """
+    tokens = shlex.split(template)
+
+    def run(tache: Tache) -> dict:
+        options = sorted(name for name, value in tache.parametres.items() if str(value).startswith("-"))
+        if options:
+            raise TacheInvalide(f"Paramètre commençant par '-' refusé : {', '.join(options)}")
+        fields = {**tache.parametres, **vars(tache)}
+        try:
+            command = [token.format(**fields) for token in tokens]
+        except KeyError as e:
+            raise TacheInvalide(f"Paramètre absent de la tâche : {e}")
+        start = time.monotonic()
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        output = (completed.stdout or "") + (completed.stderr or "")
+        passed = completed.returncode == 0
+        return {
+            "statut": "PASSED" if passed else "FAILED",
+            "dureeExecution": round(time.monotonic() - start),
+            "resultat": {
+                "statut": "PASSED" if passed else "FAILED",
+                "messageErreur": None if passed else (completed.stderr or output)[-LOG_TAIL_CHARS:],
+                "logs": output,
+            },
+        }
+    return run
+
+
+# ================= WORKER =================
+class Worker:
+    """Réclame au plus `concurrency` tâches à la fois et les exécute dans un pool de threads."""
+
+    def __init__(self, engine, runner, worker_id: str | None = None, concurrency: int = WORKER_CONCURRENCY,
+                 lease_seconds: int = QUEUE_LEASE_SECONDS, poll_seconds: float = WORKER_POLL_SECONDS):
+        self.engine = engine
+        self.sessions = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        self.runner = runner
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.counters = {"reclamees": 0, "terminees": 0, "retentees": 0, "echouees": 0, "perdues": 0}
+        self._running: dict[int, Tache] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _execute(self, tache: Tache):
+        try:
+            try:
+                outcome = self.runner(tache)
+            except Exception as e:
+                with self.engine.begin() as connection:
+                    statut = fail(connection, self.worker_id, tache, f"{e.__class__.__name__}: {e}",
+                                  retryable=not isinstance(e, TacheInvalide))
+                self._count({EN_ATTENTE: "retentees", ECHOUEE: "echouees"}.get(statut, "perdues"))
+                return
+            with self.sessions() as db:
+                result = complete(db, self.worker_id, tache, outcome)
+            if result is None:
+                self._count("perdues")
+            elif "error" in result:
+                # Erreur d'écriture (ou test supprimé entre-temps) : retentée jusqu'à maxTentatives
+                with self.engine.begin() as connection:
+                    statut = fail(connection, self.worker_id, tache, result["error"])
+                self._count({EN_ATTENTE: "retentees", ECHOUEE: "echouees"}.get(statut, "perdues"))
+            else:
+                self._count("terminees")
+        finally:
+            with self._lock:
+                self._running.pop(tache.id, None)
+            self._wakeup.set()
+
+    def _heartbeat(self):
+        with self._lock:
+            ids = list(self._running)
+        # Une tâche reprise par un autre worker n'est plus prolongée ; son résultat sera ignoré
+        with self.engine.begin() as connection:
+            heartbeat(connection, self.worker_id, ids, self.lease_seconds)
+            requeue_expired(connection)
+
+    def _has_waiting(self) -> bool:
+        """Tâches en attente, y compris celles dont le backoff n'est pas écoulé."""
+        with self.engine.connect() as connection:
+            return connection.scalar(
+                select(TacheExecution.id).where(TacheExecution.statut == EN_ATTENTE).limit(1)
+            ) is not None
+
+    def run(self, drain: bool = False) -> dict:
+        """Boucle jusqu'à `stop()` ; avec `drain`, s'arrête quand plus aucune tâche n'attend.
+
+        Après `stop()`, plus aucune réclamation, mais les heartbeats continuent jusqu'à la fin
+        des tâches en cours pour ne pas perdre leurs baux.
+        """
+        heartbeat_every = max(1.0, self.lease_seconds / 3)
+        next_heartbeat = 0.0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="worker") as pool:
+            while True:
+                self._wakeup.clear()
+                stopping = self._stop.is_set()
+                with self._lock:
+                    running = len(self._running)
+                if stopping and not running:
+                    break
+                if time.monotonic() >= next_heartbeat:
+                    self._heartbeat()
+                    next_heartbeat = time.monotonic() + heartbeat_every
+
+                free = 0 if stopping else self.concurrency - running
+                taches = []
+                if free > 0:
+                    with self.engine.begin() as connection:
+                        taches = claim(connection, self.worker_id, free, self.lease_seconds)
+                    with self._lock:
+                        self._running.update((tache.id, tache) for tache in taches)
+                        self.counters["reclamees"] += len(taches)
+                    for tache in taches:
+                        pool.submit(self._execute, tache)
+                if drain and not taches and not running and not self._has_waiting():
+                    break
+                if taches and len(taches) == free:
+                    continue  # file non vide : réclamer dès qu'une place se libère
+                # Réveillé par la fin d'une tâche, sinon nouvelle tentative après poll_seconds
+                self._wakeup.wait(self.poll_seconds)
+        return dict(self.counters)
@@ -0,0 +1,88 @@
+import anyio
+from starlette.responses import Response
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Interprète un en-tête `Range: bytes=...` (une seule plage).
+
+    Retourne (début, fin incluse), ou None si l'en-tête est absent ou ignoré
+    (unité inconnue, plages multiples) : la ressource est alors servie en entier.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            # Suffixe : les N derniers octets
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparaison faible de If-None-Match (RFC 9110) ; `*` correspond à tout."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/").strip('"') == etag:
+            return True
+    return False
+
+
+class FileRangeResponse(Response):
+    """Fichier servi sans recopie en mémoire, en entier ou sur la plage [start, end].
+
+    Passe par l'extension ASGI `http.response.zerocopysend` (sendfile) quand le serveur la
+    propose ; sinon le fichier est lu par morceaux dans un thread.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, start: int, end: int, status_code: int = 200,
+                 headers: dict | None = None, media_type: str | None = None):
+        self.path = path
+        self.start = start
+        self.count = max(0, end - start + 1)
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**(headers or {}), "Content-Length": str(self.count)})
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f,
+                            "offset": self.start, "count": self.count, "more_body": False})
+            return
+
+        remaining = self.count
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                remaining = remaining - len(chunk) if chunk else 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
@@ -0,0 +1,115 @@
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models.execution import ExecutionTest, ResultatTest
+from models.tests import Test
+from models.user import Utilisateur
+from services.clusters_echec import cluster_failures, is_failure
+from services.log_store import externalize_fields
+from services.rapport_aggregation import aggregate_new_executions
+
+# ================= CONFIG =================
+load_dotenv()
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 1000))
+# Taille maximale d'une ligne NDJSON (une exécution et ses logs)
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", 32 * 1024 * 1024))
+
+EXECUTION_FIELDS = ("test_id", "statut", "dureeExecution", "dateExecution", "executeurId")
+RESULTAT_FIELDS = ("statut", "messageErreur", "logs", "captureEcran", "captureEcranHash", "commentaire")
+
+
+def _existing_ids(db: Session, column, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(ids))))
+
+
+def ingest_chunk(db: Session, items: list[tuple[int, dict]], commit: bool = True) -> list[dict]:
+    """Insère un lot d'exécutions (+ résultats) en une transaction.
+
+    `items` contient des couples (index d'origine, exécution validée). Retourne un
+    statut par élément : ids créés ou message d'erreur. Avec `commit=False`, la transaction
+    reste ouverte pour l'appelant (elle est tout de même annulée sur erreur SQL).
+    """
+    outcomes: dict[int, dict] = {}
+
+    # Références vérifiées en bloc pour rejeter un élément plutôt que tout le lot
+    test_ids = _existing_ids(db, Test.id, {item["test_id"] for _, item in items})
+    user_ids = _existing_ids(db, Utilisateur.id, {item["executeurId"] for _, item in items if item.get("executeurId")})
+
+    accepted = []
+    for index, item in items:
+        if item["test_id"] not in test_ids:
+            outcomes[index] = {"index": index, "error": f"Test {item['test_id']} introuvable"}
+        elif item.get("executeurId") and item["executeurId"] not in user_ids:
+            outcomes[index] = {"index": index, "error": f"Utilisateur {item['executeurId']} introuvable"}
+        else:
+            accepted.append((index, item))
+
+    if accepted:
+        now = datetime.utcnow()
+        execution_rows = [
+            {**{field: item.get(field) for field in EXECUTION_FIELDS}, "dateExecution": item.get("dateExecution") or now}
+            for _, item in accepted
+        ]
+        try:
+            # executemany avec RETURNING (insertmanyvalues) : un aller-retour par page de lignes
+            execution_ids = list(db.scalars(
+                insert(ExecutionTest).returning(ExecutionTest.id, sort_by_parameter_order=True),
+                execution_rows,
+            ))
+
+            with_resultat = [
+                (index, execution_id, item["resultat"])
+                for (index, item), execution_id in zip(accepted, execution_ids)
+                if item.get("resultat") is not None
+            ]
+            resultat_ids, cluster_ids = {}, {}
+            if with_resultat:
+                # Les logs volumineux partent dans le store, la ligne garde hash + taille + aperçu
+                resultat_rows = [
+                    externalize_fields({
+                        **{field: resultat.get(field) for field in RESULTAT_FIELDS},
+                        "execution_id": execution_id
+                    })
+                    for _, execution_id, resultat in with_resultat
+                ]
+                ids = db.scalars(
+                    insert(ResultatTest).returning(ResultatTest.id, sort_by_parameter_order=True),
+                    resultat_rows,
+                )
+                resultat_ids = {index: resultat_id for (index, _, _), resultat_id in zip(with_resultat, ids)}
+
+                # Échecs rattachés à leur cluster (message normalisé sur l'aperçu gardé en ligne)
+                executions = {index: row for (index, _), row in zip(accepted, execution_rows)}
+                failures = [
+                    (resultat_ids[index], row["messageErreur"], executions[index]["dateExecution"])
+                    for (index, _, _), row in zip(with_resultat, resultat_rows)
+                    if row["messageErreur"] and is_failure(row["statut"], executions[index]["statut"])
+                ]
+                cluster_ids = cluster_failures(db, failures) if failures else {}
+
+            # Insert en masse hors unit of work : compteurs RapportQA mis à jour explicitement
+            aggregate_new_executions(db.connection(), execution_ids)
+            if commit:
+                db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            error = f"Échec d'insertion du lot: {e.__class__.__name__}"
+            for index, _ in accepted:
+                outcomes[index] = {"index": index, "error": error}
+        else:
+            for (index, _), execution_id in zip(accepted, execution_ids):
+                outcomes[index] = {
+                    "index": index,
+                    "execution_id": execution_id,
+                    "resultat_id": resultat_ids.get(index),
+                    "cluster_echec_id": cluster_ids.get(resultat_ids.get(index)),
+                }
+
+    return [outcomes[index] for index, _ in items]
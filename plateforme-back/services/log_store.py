@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect, select, union
+
+from models.execution import ResultatTest
+from services.captures import is_digest
+
+try:
+    import zstandard
+except ImportError:  # gzip (stdlib) reste disponible partout
+    zstandard = None
+
+# ================= CONFIG =================
+load_dotenv()
+LOG_STORE_DIR = os.getenv("LOG_STORE_DIR", os.path.join("storage", "logs"))
+# Au-delà de cette taille (octets UTF-8), le texte part dans le store et la ligne ne garde qu'un aperçu
+LOG_INLINE_MAX_BYTES = int(os.getenv("LOG_INLINE_MAX_BYTES", 4096))
+LOG_PREVIEW_CHARS = int(os.getenv("LOG_PREVIEW_CHARS", 512))
+LOG_COMPRESSION = os.getenv("LOG_COMPRESSION", "zstd" if zstandard else "gzip")
+# Les blobs sont écrits avant le commit de leur ligne : le GC épargne les plus récents
+LOG_GC_GRACE_SECONDS = int(os.getenv("LOG_GC_GRACE_SECONDS", 24 * 3600))
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+READ_CHUNK_SIZE = 64 * 1024
+
+# Colonnes externalisables de ResultatTest -> (colonne hash, colonne taille)
+EXTERNAL_FIELDS = {
+    "logs": ("logsHash", "logsTaille"),
+    "messageErreur": ("messageErreurHash", "messageErreurTaille"),
+}
+
+
+class LogStore:
+    """Blobs compressés adressés par le SHA-256 de leur contenu décompressé."""
+
+    def __init__(self, root: str = LOG_STORE_DIR, compression: str = LOG_COMPRESSION):
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("LOG_COMPRESSION=zstd nécessite le paquet 'zstandard'")
+        self.root = root
+        self.compression = compression
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            # Déduplication : même contenu, même blob ; rafraîchi pour le délai de grâce du GC
+            try:
+                os.utime(path)
+                return digest
+            except FileNotFoundError:
+                pass  # supprimé par le GC entre-temps : réécrit ci-dessous
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.compression == "zstd":
+            compressed = zstandard.ZstdCompressor(level=3).compress(data)
+        else:
+            compressed = gzip.compress(data, compresslevel=6)
+
+        # Écriture atomique : un lecteur ne voit jamais un blob partiel
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def _chunks(self, digest: str):
+        with open(self.path_for(digest), "rb") as f:
+            magic = f.read(4)
+            f.seek(0)
+            if magic.startswith(ZSTD_MAGIC):
+                if zstandard is None:
+                    raise RuntimeError("Blob zstd illisible sans le paquet 'zstandard'")
+                reader = zstandard.ZstdDecompressor().stream_reader(f)
+                while chunk := reader.read(READ_CHUNK_SIZE):
+                    yield chunk
+            elif magic.startswith(GZIP_MAGIC):
+                decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+                while raw := f.read(READ_CHUNK_SIZE):
+                    yield decompressor.decompress(raw)
+                yield decompressor.flush()
+            else:
+                raise ValueError(f"Format de blob inconnu: {digest}")
+
+    def stream(self, digest: str, start: int = 0, end: int | None = None):
+        """Octets décompressés [start, end] (fin incluse), produits par morceaux."""
+        position = 0
+        for chunk in self._chunks(digest):
+            chunk_end = position + len(chunk)
+            if chunk_end > start:
+                lo = max(0, start - position)
+                hi = len(chunk) if end is None else min(len(chunk), end + 1 - position)
+                if hi > lo:
+                    yield chunk[lo:hi]
+            position = chunk_end
+            if end is not None and position > end:
+                return
+
+    def read(self, digest: str) -> bytes:
+        return b"".join(self._chunks(digest))
+
+
+log_store = LogStore()
+
+
+def externalize(text: str | None, store: LogStore = log_store) -> tuple[str | None, str | None, int | None]:
+    """Retourne (texte à garder dans la ligne, hash, taille) pour un log ou message d'erreur."""
+    if text is None:
+        return None, None, None
+    data = text.encode("utf-8")
+    if len(data) <= LOG_INLINE_MAX_BYTES:
+        return text, None, None
+    return text[:LOG_PREVIEW_CHARS], store.put(data), len(data)
+
+
+def externalize_fields(values: dict) -> dict:
+    """Applique `externalize` aux colonnes concernées d'un dictionnaire de ligne resultat_test."""
+    for field, (hash_field, size_field) in EXTERNAL_FIELDS.items():
+        if field in values:
+            values[field], values[hash_field], values[size_field] = externalize(values[field])
+    return values
+
+
+# ================= GC =================
+def referenced_digests(connection) -> set[bytes]:
+    columns = [getattr(ResultatTest, hash_field) for hash_field, _ in EXTERNAL_FIELDS.values()]
+    result = connection.execute(
+        union(*[select(column).where(column.is_not(None)) for column in columns]),
+        execution_options={"stream_results": True, "yield_per": 10000},
+    )
+    return {bytes.fromhex(digest) for digest, in result}
+
+
+def _blobs(root: str):
+    """Fichiers du store (ab/cd/<hash>), temporaires d'écriture compris."""
+    if not os.path.isdir(root):
+        return
+    for first in os.scandir(root):
+        if first.is_dir() and len(first.name) == 2:
+            for second in os.scandir(first.path):
+                if second.is_dir():
+                    yield from (entry for entry in os.scandir(second.path) if entry.is_file())
+
+
+def collect_garbage(connection, store: LogStore = log_store, grace_seconds: int = LOG_GC_GRACE_SECONDS,
+                    dry_run: bool = False) -> dict:
+    """Supprime les blobs qu'aucun résultat ne référence (lot annulé, résultat supprimé).
+
+    Les blobs modifiés depuis moins de `grace_seconds` sont gardés : ceux d'un lot en cours
+    d'insertion ne sont pas encore référencés par une ligne commise.
+    """
+    referenced = referenced_digests(connection)
+    cutoff = time.time() - grace_seconds
+    summary = {"references": len(referenced), "blobs": 0, "supprimes": 0, "octets_liberes": 0}
+    for entry in _blobs(store.root):
+        stat = entry.stat()
+        is_blob = is_digest(entry.name)
+        summary["blobs"] += is_blob
+        if stat.st_mtime > cutoff or (is_blob and bytes.fromhex(entry.name) in referenced):
+            continue
+        if not dry_run:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                continue
+        summary["supprimes"] += 1
+        summary["octets_liberes"] += stat.st_size
+    return summary
+
+
+# ================= ORM HOOKS =================
+def _externalize_modified(target: ResultatTest):
+    state = inspect(target)
+    for field, (hash_field, size_field) in EXTERNAL_FIELDS.items():
+        # Historique passif : ne déclenche jamais le chargement d'une colonne différée
+        added = state.attrs[field].history.added
+        if added:
+            stored, digest, size = externalize(added[0])
+            setattr(target, field, stored)
+            setattr(target, hash_field, digest)
+            setattr(target, size_field, size)
+
+
+@event.listens_for(ResultatTest, "before_insert")
+def _before_insert(mapper, connection, target):
+    _externalize_modified(target)
+
+
+@event.listens_for(ResultatTest, "before_update")
+def _before_update(mapper, connection, target):
+    _externalize_modified(target)
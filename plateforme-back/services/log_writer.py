@@ -0,0 +1,204 @@
+"""Écriture différée et groupée des lignes AuditLog / LogSystems.
+
+Les handlers n'effectuent qu'un ajout dans une file bornée en mémoire ; un thread de
+fond vide la file toutes les AUDIT_FLUSH_INTERVAL_MS ou dès AUDIT_FLUSH_BATCH lignes,
+avec un INSERT multi-lignes par table. Quand la file est pleine, la politique
+AUDIT_OVERFLOW_POLICY s'applique : "drop_newest" (ligne refusée), "drop_oldest"
+(la plus ancienne est évincée) ou "block" (attente bornée puis refus).
+
+Depuis du code async (routes, middlewares), passer par `aaudit` / `alog` : en mode "block",
+l'attente se fait dans un thread au lieu de bloquer la boucle d'événements.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import anyio
+from dotenv import load_dotenv
+from sqlalchemy import insert
+
+from db.database import engine as default_engine
+from models.log_systems import AuditLog, LogSystems
+
+# ================= CONFIG =================
+load_dotenv()
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", 10000))
+AUDIT_FLUSH_BATCH = int(os.getenv("AUDIT_FLUSH_BATCH", 500))
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", 200))
+AUDIT_OVERFLOW_POLICY = os.getenv("AUDIT_OVERFLOW_POLICY", "drop_newest")
+AUDIT_BLOCK_TIMEOUT_MS = int(os.getenv("AUDIT_BLOCK_TIMEOUT_MS", 50))
+
+POLICIES = ("drop_newest", "drop_oldest", "block")
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedLogWriter:
+    def __init__(self, engine=default_engine, maxsize: int = AUDIT_BUFFER_SIZE, batch_size: int = AUDIT_FLUSH_BATCH,
+                 interval_ms: int = AUDIT_FLUSH_INTERVAL_MS, policy: str = AUDIT_OVERFLOW_POLICY,
+                 block_timeout_ms: int = AUDIT_BLOCK_TIMEOUT_MS):
+        if policy not in POLICIES:
+            raise ValueError(f"AUDIT_OVERFLOW_POLICY invalide: {policy}")
+        self.engine = engine
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.policy = policy
+        self.block_timeout = block_timeout_ms / 1000
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.flush_count = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    # ---------- producteurs ----------
+    def enqueue(self, table, row: dict) -> bool:
+        with self._cond:
+            if len(self._queue) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.policy == "block":
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._cond.wait(remaining):
+                            break
+                    if len(self._queue) >= self.maxsize:
+                        self.dropped += 1
+                        return False
+                else:
+                    self.dropped += 1
+                    return False
+            self._queue.append((table, row))
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def audit(self, action: str, entityType: str | None = None, entityId: int | None = None,
+              changes=None, userId: int | None = None, ipAddress: str | None = None,
+              userAgent: str | None = None) -> bool:
+        if changes is not None and not isinstance(changes, str):
+            changes = json.dumps(changes, default=str, ensure_ascii=False)
+        return self.enqueue(AuditLog.__table__, {
+            "action": action,
+            "timestamp": datetime.utcnow(),
+            "entityType": entityType,
+            "entityId": entityId,
+            "changes": changes,
+            "ipAddress": ipAddress,
+            "userAgent": userAgent,
+            "userId": userId,
+        })
+
+    def log(self, niveau: str, message: str, source: str | None = None, details=None) -> bool:
+        if details is not None and not isinstance(details, str):
+            details = json.dumps(details, default=str, ensure_ascii=False)
+        return self.enqueue(LogSystems.__table__, {
+            "niveau": niveau,
+            "message": message,
+            "date_time": datetime.utcnow(),
+            "source": source,
+            "details": details,
+        })
+
+    async def aaudit(self, action: str, *args, **kwargs) -> bool:
+        if self.policy == "block":
+            return await anyio.to_thread.run_sync(lambda: self.audit(action, *args, **kwargs))
+        return self.audit(action, *args, **kwargs)
+
+    async def alog(self, niveau: str, message: str, *args, **kwargs) -> bool:
+        if self.policy == "block":
+            return await anyio.to_thread.run_sync(lambda: self.log(niveau, message, *args, **kwargs))
+        return self.log(niveau, message, *args, **kwargs)
+
+    # ---------- consommateur ----------
+    def _take_batch(self) -> list:
+        with self._cond:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if batch:
+                self._cond.notify_all()  # libère les producteurs en mode "block"
+            return batch
+
+    def _write(self, batch: list):
+        by_table: dict = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as connection:
+                for table, rows in by_table.items():
+                    connection.execute(insert(table), rows)
+        except Exception:
+            self.failed_rows += len(batch)
+            logger.exception("Échec d'écriture de %d lignes d'audit/log", len(batch))
+            return
+        elapsed = time.perf_counter() - start
+        self.flushed_rows += len(batch)
+        self.flush_count += 1
+        self.flush_seconds_total += elapsed
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    def flush(self):
+        """Vide entièrement la file de façon synchrone."""
+        with self._flush_lock:
+            while batch := self._take_batch():
+                self._write(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": len(self._queue),
+            "queue_capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "flush_count": self.flush_count,
+            "flush_seconds_total": self.flush_seconds_total,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+        }
+
+
+log_writer = BufferedLogWriter()
@@ -0,0 +1,255 @@
+"""Métriques de l'application au format texte Prometheus (`GET /metrics`).
+
+- `MetricsMiddleware` (ASGI pur) : histogramme de latence et compteur de statuts par
+  route (gabarit de chemin, pas l'URL brute, pour borner la cardinalité).
+- `instrument_engine` : évènements before/after_cursor_execute qui cumulent, pour la
+  requête HTTP en cours (contextvar), le nombre de requêtes SQL et le temps DB ; attente
+  de checkout du pool (enveloppe de `_do_get`) et taille / connexions prises / overflow
+  lus au moment du scrape.
+- `register_stats` : expose les compteurs `stats()` / `metrics()` des sous-systèmes.
+
+Surcoût mesuré (`python -m benchmarks.bench_metrics`) : de l'ordre de 10 µs par requête
+HTTP et par requête SQL, négligeable devant un aller-retour réseau vers la base.
+METRICS_ENABLED=0 désactive le tout.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+# ================= CONFIG =================
+load_dotenv()
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ================= TYPES =================
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self.values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = buckets
+        self.series: dict[tuple, list] = {}  # labels -> [compte par seau (+Inf), somme]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self.series.get(labels)
+            if serie is None:
+                serie = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][index] += 1
+            serie[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self.series.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class GaugeCallback:
+    """Jauge évaluée au scrape : `fn()` renvoie des couples (valeurs de labels, valeur)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple, fn):
+        self.name, self.help, self.label_names, self.fn = name, help, labels, fn
+
+    def samples(self):
+        for labels, value in self.fn():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.add(Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")))
+http_latency = registry.add(Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route")))
+request_queries = registry.add(Histogram(
+    "http_request_db_queries", "Requêtes SQL par requête HTTP", ("route",), QUERY_COUNT_BUCKETS))
+request_db_time = registry.add(Histogram(
+    "http_request_db_seconds", "Temps DB cumulé par requête HTTP", ("route",)))
+db_queries = registry.add(Counter(
+    "db_queries_total", "Requêtes SQL exécutées", ("engine",)))
+db_query_seconds = registry.add(Counter(
+    "db_query_seconds_total", "Temps cumulé des requêtes SQL", ("engine",)))
+pool_wait = registry.add(Histogram(
+    "db_pool_checkout_wait_seconds", "Attente d'une connexion du pool", ("engine",), POOL_WAIT_BUCKETS))
+
+_pools: dict[str, object] = {}
+
+
+def _pool_samples(attribute: str):
+    for name, pool in list(_pools.items()):
+        method = getattr(pool, attribute, None)
+        if callable(method):
+            yield (name,), method()
+
+
+registry.add(GaugeCallback("db_pool_size", "Taille configurée du pool", ("engine",),
+                           lambda: _pool_samples("size")))
+registry.add(GaugeCallback("db_pool_checked_out", "Connexions actuellement prises", ("engine",),
+                           lambda: _pool_samples("checkedout")))
+registry.add(GaugeCallback("db_pool_overflow", "Connexions en débordement (négatif : marge restante)",
+                           ("engine",), lambda: _pool_samples("overflow")))
+
+
+# ================= CONTEXTE DE REQUÊTE =================
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Partagé par la greenlet du moteur async et par les threads de run_sync (contexte copié)
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+# ================= MOTEURS =================
+def instrument_engine(engine, name: str):
+    """Instrumente un moteur synchrone (pour un moteur async : `async_engine.sync_engine`)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        db_queries.inc((name,))
+        db_query_seconds.inc((name,), elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    pool = engine.pool
+    original = getattr(pool, "_do_get", None)
+    if original is not None:
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return original()
+            finally:
+                pool_wait.observe((name,), time.perf_counter() - start)
+
+        pool._do_get = timed_do_get
+    _pools[name] = pool
+
+
+def register_stats(prefix: str, fn, help: str = ""):
+    """Expose les valeurs numériques du dict renvoyé par `fn` en jauges `<prefix>_<clé>`."""
+    def samples(key):
+        return lambda: [((), fn()[key])]
+
+    for key, value in fn().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            registry.add(GaugeCallback(f"{prefix}_{key}", help or f"{prefix} {key}", (), samples(key)))
+
+
+# ================= MIDDLEWARE =================
+class MetricsMiddleware:
+    def __init__(self, app, excluded_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc((method, path, status[0]))
+            http_latency.observe((method, path), elapsed)
+            request_queries.observe((path,), stats.queries)
+            request_db_time.observe((path,), stats.db_seconds)
@@ -0,0 +1,244 @@
+"""Diffusion des notifications : insertion groupée, compteurs de non-lues et push en temps réel.
+
+- `fan_out` insère une notification pour N destinataires en une seule instruction.
+- Après commit (hook de session), chaque nouvelle notification incrémente le compteur de
+  non-lues du destinataire et est publiée dans le hub ; rien n'est publié en cas de rollback.
+- `UnreadCounters` garde les compteurs en mémoire ; une entrée plus vieille que
+  NOTIF_COUNTER_TTL_S est rechargée par COUNT(*), ce qui borne la dérive due aux autres
+  workers qui modifient les mêmes lignes.
+- `NotificationHub` répartit les évènements entre les connexions SSE du worker, une file
+  bornée par connexion ; un client trop lent perd des évènements et reçoit un "resync".
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+
+from models.notification import Notification, TypeNotification
+
+# ================= CONFIG =================
+load_dotenv()
+NOTIF_COUNTER_TTL_S = int(os.getenv("NOTIF_COUNTER_TTL_S", 60))
+NOTIF_QUEUE_SIZE = int(os.getenv("NOTIF_QUEUE_SIZE", 100))
+
+PENDING_KEY = "notifications_pending"
+
+
+def serialize(row) -> dict:
+    return {
+        "id": row["id"],
+        "titre": row["titre"],
+        "message": row["message"],
+        "type": row["type"].value if isinstance(row["type"], TypeNotification) else row["type"],
+        "dateEnvoi": row["dateEnvoi"].isoformat() if row["dateEnvoi"] else None,
+        "lue": row["lue"],
+        "priorite": row["priorite"],
+        "destinataireId": row["destinataireId"],
+    }
+
+
+# ================= COMPTEURS =================
+class UnreadCounters:
+    def __init__(self, ttl_s: int = NOTIF_COUNTER_TTL_S):
+        self.ttl = ttl_s
+        self._counts: dict[int, tuple[int, float]] = {}
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reloads = 0
+
+    def get(self, user_id: int) -> int | None:
+        with self._lock:
+            entry = self._counts.get(user_id)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def store(self, user_id: int, count: int, version: int) -> None:
+        """Enregistre une valeur lue en base, sauf si une modification a eu lieu pendant la lecture."""
+        with self._lock:
+            self.reloads += 1
+            if self._versions.get(user_id, 0) == version:
+                self._counts[user_id] = (count, time.monotonic())
+
+    def add(self, user_id: int, delta: int) -> int | None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            entry = self._counts.get(user_id)
+            if entry is None:
+                return None
+            count = max(0, entry[0] + delta)
+            self._counts[user_id] = (count, entry[1])
+            return count
+
+    def reset(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._counts[user_id] = (0, time.monotonic())
+
+    def stats(self) -> dict:
+        return {"entries": len(self._counts), "hits": self.hits, "reloads": self.reloads}
+
+
+unread_counters = UnreadCounters()
+
+
+def count_unread_query(user_id: int):
+    return (select(func.count()).select_from(Notification)
+            .where(Notification.destinataireId == user_id, Notification.lue.is_(False)))
+
+
+async def unread_count(db, user_id: int) -> int:
+    cached = unread_counters.get(user_id)
+    if cached is not None:
+        return cached
+    version = unread_counters.version(user_id)
+    count = await db.scalar(count_unread_query(user_id))
+    unread_counters.store(user_id, count, version)
+    return count
+
+
+# ================= HUB =================
+class Subscription:
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.lagged = False
+
+
+class NotificationHub:
+    def __init__(self, queue_size: int = NOTIF_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def _deliver(self, events: list[tuple[int, str, dict]]) -> None:
+        for user_id, kind, payload in events:
+            self.published += 1
+            for subscription in self._subscribers.get(user_id, ()):
+                try:
+                    subscription.queue.put_nowait((kind, payload))
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    # Le client relira son état (compteur + dernières notifications)
+                    subscription.lagged = True
+                    self.dropped += 1
+
+    def publish(self, events: list[tuple[int, str, dict]]) -> None:
+        """Publie des évènements (destinataire, type, données) ; appelable depuis n'importe quel thread."""
+        loop = self._loop
+        if not events or loop is None or loop.is_closed() or not self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(events)
+        else:
+            loop.call_soon_threadsafe(self._deliver, events)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+notification_hub = NotificationHub()
+
+
+def publish_unread(user_id: int, count: int | None) -> None:
+    if count is not None:
+        notification_hub.publish([(user_id, "unread", {"count": count})])
+
+
+# ================= DIFFUSION =================
+def fan_out(db: Session, destinataire_ids, titre: str, message: str | None = None,
+            type: TypeNotification | None = None, priorite: str | None = None) -> list[dict]:
+    """Une notification par destinataire, en une instruction ; publication au commit."""
+    destinataire_ids = list(dict.fromkeys(destinataire_ids))
+    if not destinataire_ids:
+        return []
+    now = datetime.utcnow()
+    result = db.execute(
+        insert(Notification).returning(
+            Notification.id, Notification.titre, Notification.message, Notification.type,
+            Notification.dateEnvoi, Notification.lue, Notification.priorite, Notification.destinataireId,
+            sort_by_parameter_order=True,
+        ),
+        [{"titre": titre, "message": message, "type": type, "priorite": priorite, "lue": False,
+          "dateEnvoi": now, "destinataireId": user_id} for user_id in destinataire_ids],
+    )
+    rows = [serialize(row) for row in result.mappings()]
+    db.info.setdefault(PENDING_KEY, []).extend(rows)
+    return rows
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_notifications(session, flush_context):
+    # Notifications créées via l'ORM (db.add) : même traitement que fan_out
+    rows = [
+        serialize({c: getattr(obj, c) for c in ("id", "titre", "message", "type", "dateEnvoi", "lue",
+                                                "priorite", "destinataireId")})
+        for obj in session.new if isinstance(obj, Notification) and not obj.lue
+    ]
+    if rows:
+        session.info.setdefault(PENDING_KEY, []).extend(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    rows = session.info.pop(PENDING_KEY, None)
+    if not rows:
+        return
+    events = []
+    for row in rows:
+        user_id = row["destinataireId"]
+        if user_id is None:
+            continue
+        events.append((user_id, "notification", row))
+        count = unread_counters.add(user_id, 1)
+        if count is not None:
+            events.append((user_id, "unread", {"count": count}))
+    notification_hub.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def sse_event(kind: str, payload: dict, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
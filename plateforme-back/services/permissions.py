@@ -0,0 +1,149 @@
+import base64
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.associations import role_permission
+from models.user import Permission, PermissionVersion, Role, Utilisateur
+
+# ================= CONFIG =================
+load_dotenv()
+# Délai max avant qu'un worker voie une version RBAC modifiée par un autre processus
+RBAC_VERSION_TTL = float(os.getenv("RBAC_VERSION_TTL", 5))
+
+VERSION_ROW_ID = 1
+
+
+# ================= MASK ENCODING =================
+def encode_mask(mask: int) -> str:
+    raw = mask.to_bytes(max(1, (mask.bit_length() + 7) // 8), "little")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_mask(value: str) -> int:
+    padded = value + "=" * (-len(value) % 4)
+    return int.from_bytes(base64.urlsafe_b64decode(padded), "little")
+
+
+# ================= COMPILER =================
+@dataclass(frozen=True)
+class CompiledPermissions:
+    version: int
+    bits: dict[tuple[str, str], int]
+    role_masks: dict[int, int]
+
+    def mask_for_roles(self, role_ids) -> int:
+        mask = 0
+        for role_id in role_ids:
+            mask |= self.role_masks.get(role_id, 0)
+        return mask
+
+    def allows(self, mask: int, resource: str, action: str) -> bool:
+        bit = self.bits.get((resource, action))
+        return bit is not None and bool(mask >> bit & 1)
+
+
+def read_version(db: Session) -> int:
+    version = db.scalar(select(PermissionVersion.version).where(PermissionVersion.id == VERSION_ROW_ID))
+    return version or 0
+
+
+def compile_permissions(db: Session, version: int | None = None) -> CompiledPermissions:
+    if version is None:
+        version = read_version(db)
+
+    # Index de bit stable : ordre de première apparition par id de permission
+    bits: dict[tuple[str, str], int] = {}
+    permission_bits: dict[int, int] = {}
+    for permission_id, resource, action in db.execute(
+        select(Permission.id, Permission.resource, Permission.action).order_by(Permission.id)
+    ):
+        bit = bits.setdefault((resource, action), len(bits))
+        permission_bits[permission_id] = bit
+
+    role_masks: dict[int, int] = {}
+    for role_id, permission_id in db.execute(select(role_permission.c.role_id, role_permission.c.permission_id)):
+        role_masks[role_id] = role_masks.get(role_id, 0) | (1 << permission_bits[permission_id])
+
+    return CompiledPermissions(version=version, bits=bits, role_masks=role_masks)
+
+
+class PermissionRegistry:
+    """Dernière compilation connue, revalidée contre la version stockée au plus tous les `ttl` secondes."""
+
+    def __init__(self, ttl: float = RBAC_VERSION_TTL):
+        self.ttl = ttl
+        self._compiled: CompiledPermissions | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session) -> CompiledPermissions:
+        version = read_version(db)
+        with self._lock:
+            if self._compiled is None or self._compiled.version != version:
+                self._compiled = compile_permissions(db, version)
+            self._checked_at = time.monotonic()
+            return self._compiled
+
+    def cached(self) -> CompiledPermissions | None:
+        if self._compiled is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._compiled
+        return None
+
+    async def current(self, db: AsyncSession) -> CompiledPermissions:
+        compiled = self.cached()
+        if compiled is None:
+            compiled = await db.run_sync(self.refresh)
+        return compiled
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+
+permission_registry = PermissionRegistry()
+
+
+# ================= VERSIONING =================
+def bump_permission_version(connection):
+    """À appeler explicitement après une modification RBAC faite hors ORM (ex: user_role en Core)."""
+    table = PermissionVersion.__table__
+    result = connection.execute(
+        update(table).where(table.c.id == VERSION_ROW_ID).values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(id=VERSION_ROW_ID, version=1))
+
+
+def _touches_rbac(session: Session) -> bool:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Role, Permission)):
+            return True
+        # Un changement de rôle rend le masque embarqué dans les tokens de l'utilisateur obsolète
+        if isinstance(obj, Utilisateur) and obj not in session.new:
+            if inspect(obj).attrs.role_id.history.has_changes() or obj in session.deleted:
+                return True
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_change(session, flush_context):
+    if _touches_rbac(session):
+        bump_permission_version(session.connection())
+        session.info["rbac_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_registry(session):
+    if session.info.pop("rbac_changed", False):
+        permission_registry.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_change(session):
+    session.info.pop("rbac_changed", None)
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from db.associations import role_permission, user_role
+from models.user import Permission, Role, Utilisateur
+
+# ================= CONFIG =================
+load_dotenv()
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Utilisateur authentifié résolu : ligne utilisateur + rôles + permissions compilées."""
+    id: int
+    nom: str | None
+    email: str | None
+    telephone: str | None
+    actif: bool
+    role_id: int | None
+    role_code: str | None
+    role_ids: frozenset[int]
+    permissions: frozenset[tuple[str, str]]
+
+    def has_permission(self, resource: str, action: str) -> bool:
+        return (resource, action) in self.permissions
+
+
+class PrincipalCache:
+    """Cache LRU à durée de vie limitée, propre au processus."""
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Principal | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, principal: Principal):
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_role(self, role_id: int):
+        with self._lock:
+            stale = [uid for uid, (_, p) in self._entries.items() if role_id in p.role_ids]
+            for uid in stale:
+                del self._entries[uid]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+# ================= LOADING =================
+def load_principal(db: Session, user_id: int) -> Principal | None:
+    user = db.scalar(
+        select(Utilisateur).options(joinedload(Utilisateur.role)).where(Utilisateur.id == user_id)
+    )
+    if user is None:
+        return None
+
+    # Rôle principal (Utilisateur.role_id) + rôles additionnels de user_role
+    role_ids = set(db.scalars(select(user_role.c.role_id).where(user_role.c.user_id == user_id)))
+    if user.role_id is not None:
+        role_ids.add(user.role_id)
+
+    permissions = set()
+    if role_ids:
+        rows = db.execute(
+            select(Permission.resource, Permission.action)
+            .join(role_permission, role_permission.c.permission_id == Permission.id)
+            .where(role_permission.c.role_id.in_(role_ids))
+        )
+        permissions = {(resource, action) for resource, action in rows}
+
+    return Principal(
+        id=user.id,
+        nom=user.nom,
+        email=user.email,
+        telephone=user.telephone,
+        actif=bool(user.actif),
+        role_id=user.role_id,
+        role_code=user.role.code if user.role else None,
+        role_ids=frozenset(role_ids),
+        permissions=frozenset(permissions),
+    )
+
+
+async def resolve_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = await db.run_sync(load_principal, user_id)
+        if principal is not None:
+            principal_cache.put(principal)
+    return principal
+
+
+# ================= INVALIDATION =================
+# Les changements sont collectés au flush et appliqués au commit, pour ne jamais
+# purger le cache au profit d'une donnée qui sera finalement annulée.
+_PENDING_KEY = "principal_cache_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {"users": set(), "roles": set(), "all": False})
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Utilisateur) and obj.id is not None:
+            pending["users"].add(obj.id)
+        elif isinstance(obj, Role) and obj.id is not None:
+            pending["roles"].add(obj.id)
+        elif isinstance(obj, Permission):
+            pending["all"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if pending["all"]:
+        principal_cache.clear()
+        return
+    for user_id in pending["users"]:
+        principal_cache.invalidate_user(user_id)
+    for role_id in pending["roles"]:
+        principal_cache.invalidate_role(role_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
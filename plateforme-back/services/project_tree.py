@@ -0,0 +1,133 @@
+"""Lecture de l'arbre complet d'un projet en un nombre fixe de requêtes.
+
+Projet -> Module -> Epic -> UserStory -> CahierDeTests -> Test -> Scenario / Validation,
+plus les sprints du projet. Chaque niveau est chargé par une seule requête filtrée sur
+le projet (équivalent d'un chargement « selectin »), les tests via `with_polymorphic`
+pour récupérer les colonnes des sous-classes sans requête par type. Seules des colonnes
+sont sélectionnées : aucun objet ORM n'entre dans l'identity map.
+"""
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, with_polymorphic
+
+from db.associations import sprint_userstory
+from models.scrum import Epic, Module, Projet, Sprint, UserStory
+from models.tests import CahierDeTests, ScenarioTest, Test, TestAutomatise, TestManuel, TestUnitaire, ValidationTest
+from services.scope import test_userstory_id, tests_of_projet
+
+# Colonnes propres à chaque sous-type de test
+SUBTYPE_FIELDS = {
+    TestUnitaire: ("framework", "langage", "fichierTest"),
+    TestAutomatise: ("framework", "typeTest", "outil", "dateGeneration"),
+    TestManuel: ("etapes", "donneeTest", "tempEstime"),
+}
+
+
+def _rows(db: Session, query) -> list[dict]:
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+def _group(rows: list[dict], key: str) -> dict[int, list[dict]]:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.pop(key)].append(row)
+    return grouped
+
+
+def load_project_tree(db: Session, projet_id: int) -> dict | None:
+    projet = db.execute(
+        select(Projet.id, Projet.nom, Projet.description, Projet.dateDebut, Projet.dateFin,
+               Projet.objectif, Projet.statut, Projet.productOwnerId)
+        .where(Projet.id == projet_id)
+    ).mappings().first()
+    if projet is None:
+        return None
+
+    modules = _rows(db, select(Module.id, Module.nom, Module.description, Module.ordre)
+                    .where(Module.projet_id == projet_id).order_by(Module.ordre, Module.id))
+    epics = _rows(db, select(Epic.id, Epic.module_id, Epic.titre, Epic.description, Epic.priorite,
+                             Epic.businessValue, Epic.statut, Epic.dateCreation, Epic.productOwnerId)
+                  .join(Module, Module.id == Epic.module_id)
+                  .where(Module.projet_id == projet_id).order_by(Epic.id))
+    userstories = _rows(db, select(UserStory.id, UserStory.epic_id, UserStory.titre, UserStory.description,
+                                   UserStory.criteresAcceptation, UserStory.points, UserStory.priorite,
+                                   UserStory.statut, UserStory.developerId)
+                        .join(Epic, Epic.id == UserStory.epic_id)
+                        .join(Module, Module.id == Epic.module_id)
+                        .where(Module.projet_id == projet_id).order_by(UserStory.id))
+    cahiers = _rows(db, select(CahierDeTests.id, CahierDeTests.userstory_id, CahierDeTests.dateGeneration,
+                               CahierDeTests.statut, CahierDeTests.nombreTests)
+                    .join(UserStory, UserStory.id == CahierDeTests.userstory_id)
+                    .join(Epic, Epic.id == UserStory.epic_id)
+                    .join(Module, Module.id == Epic.module_id)
+                    .where(Module.projet_id == projet_id).order_by(CahierDeTests.id))
+
+    # Tous les sous-types en une requête (LEFT OUTER JOIN sur chaque table fille)
+    test_ids = tests_of_projet(projet_id).scalar_subquery()
+    poly = with_polymorphic(Test, list(SUBTYPE_FIELDS))
+    subtype_columns = [
+        getattr(getattr(poly, subtype.__name__), field).label(f"{subtype.__name__}.{field}")
+        for subtype, fields in SUBTYPE_FIELDS.items()
+        for field in fields
+    ]
+    test_rows = db.execute(
+        select(poly.id, poly.nom, poly.description, poly.type, poly.cahier_id,
+               test_userstory_id().label("userstory_id"), *subtype_columns)
+        .outerjoin(CahierDeTests, CahierDeTests.id == poly.cahier_id)
+        .where(poly.id.in_(test_ids))
+        .order_by(poly.id)
+    ).mappings()
+
+    scenarios = _group(_rows(db, select(ScenarioTest.id, ScenarioTest.test_id, ScenarioTest.nom,
+                                        ScenarioTest.description, ScenarioTest.type)
+                             .where(ScenarioTest.test_id.in_(test_ids)).order_by(ScenarioTest.id)), "test_id")
+    validations = _group(_rows(db, select(ValidationTest.id, ValidationTest.testId, ValidationTest.dateValidation,
+                                          ValidationTest.statut, ValidationTest.decision,
+                                          ValidationTest.commentaires, ValidationTest.goNoGo,
+                                          ValidationTest.validatorId)
+                               .where(ValidationTest.testId.in_(test_ids)).order_by(ValidationTest.id)), "testId")
+
+    sprints = _rows(db, select(Sprint.id, Sprint.nom, Sprint.dateDebut, Sprint.dateFin, Sprint.objectifSprint,
+                               Sprint.capaciteEquipe, Sprint.velocite, Sprint.statut, Sprint.scrumMasterId)
+                    .where(Sprint.projet_id == projet_id).order_by(Sprint.id))
+    sprint_links = defaultdict(list)
+    for sprint_id, userstory_id in db.execute(
+        select(sprint_userstory.c.sprint_id, sprint_userstory.c.userstory_id)
+        .join(Sprint, Sprint.id == sprint_userstory.c.sprint_id)
+        .where(Sprint.projet_id == projet_id)
+    ):
+        sprint_links[userstory_id].append(sprint_id)
+
+    # ---- assemblage ----
+    tests_by_cahier, tests_by_userstory = defaultdict(list), defaultdict(list)
+    for row in test_rows:
+        test = {key: row[key] for key in ("id", "nom", "description", "type")}
+        for subtype, fields in SUBTYPE_FIELDS.items():
+            if test["type"] == subtype.__mapper__.polymorphic_identity:
+                test.update({field: row[f"{subtype.__name__}.{field}"] for field in fields})
+        test["scenarios"] = scenarios.get(test["id"], [])
+        test["validations"] = validations.get(test["id"], [])
+        if row["cahier_id"] is not None:
+            tests_by_cahier[row["cahier_id"]].append(test)
+        else:
+            tests_by_userstory[row["userstory_id"]].append(test)
+
+    for cahier in cahiers:
+        cahier["tests"] = tests_by_cahier.get(cahier["id"], [])
+    cahiers_by_userstory = {cahier.pop("userstory_id"): cahier for cahier in cahiers}
+
+    for userstory in userstories:
+        userstory["cahier_tests"] = cahiers_by_userstory.get(userstory["id"])
+        userstory["tests"] = tests_by_userstory.get(userstory["id"], [])
+        userstory["sprint_ids"] = sprint_links.get(userstory["id"], [])
+    userstories_by_epic = _group(userstories, "epic_id")
+
+    for epic in epics:
+        epic["userstories"] = userstories_by_epic.get(epic["id"], [])
+    epics_by_module = _group(epics, "module_id")
+
+    for module in modules:
+        module["epics"] = epics_by_module.get(module["id"], [])
+
+    return {**projet, "modules": modules, "sprints": sprints}
@@ -0,0 +1,217 @@
+"""Détection des requêtes lentes et des motifs N+1, par requête HTTP.
+
+QUERY_DIAGNOSTICS :
+- "off" (défaut) : aucun hook installé, coût nul ;
+- "header" : actif seulement pour les requêtes portant `X-Query-Diagnostics: 1` ;
+- "on" : actif pour toutes les requêtes.
+
+Pendant une requête diagnostiquée, chaque instruction SQL est normalisée (listes IN et
+littéraux repliés) et comptée par forme. En fin de requête :
+- une instruction plus longue que QUERY_SLOW_MS donne une entrée "slow_query" ;
+- une même forme de SELECT exécutée au moins QUERY_REPEAT_THRESHOLD fois donne une
+  entrée "repeated_query" (N+1 typique d'une relation paresseuse parcourue en boucle).
+Les constats sont écrits dans LogSystems (source = "MÉTHODE /route", détails = SQL
+normalisé, nombre, durée, emplacement dans le code) via le log_writer.
+
+`query_budget` / `assert_query_budget` font échouer un test quand une route dépasse un
+nombre de requêtes donné.
+"""
+import os
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import greenlet
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from services.log_writer import log_writer
+
+# ================= CONFIG =================
+load_dotenv()
+QUERY_DIAGNOSTICS = os.getenv("QUERY_DIAGNOSTICS", "off")
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", 200))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", 5))
+
+MODES = ("off", "header", "on")
+HEADER = b"x-query-diagnostics"
+MAX_SHAPES = 500
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+|'[^']*'|-?\d+(?:\.\d+)?)\s*,?)+\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    statement = _IN_LIST.sub("IN (…)", statement)
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def _project_frame(frames) -> str | None:
+    """Frame la plus interne appartenant au projet (hors ce module et hors dépendances)."""
+    for frame in reversed(frames):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+                and not filename.endswith("query_diagnostics.py")):
+            return f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.lineno} {frame.name}"
+    return None
+
+
+def stack_hint() -> str | None:
+    frames = traceback.extract_stack()
+    # Moteur async : la requête SQL s'exécute dans une greenlet fille ; le code appelant (route)
+    # est dans la pile suspendue de la greenlet parente
+    parent = greenlet.getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        frames = list(traceback.extract_stack(parent.gr_frame)) + list(frames)
+    return _project_frame(frames)
+
+
+# ================= TRACE =================
+class QueryTrace:
+    def __init__(self):
+        self.count = 0
+        self.shapes: dict[str, list] = {}  # forme -> [nombre, durée totale, emplacement]
+        self.slow: list[dict] = []
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        shape = normalize(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            if len(self.shapes) >= MAX_SHAPES:
+                return
+            entry = self.shapes[shape] = [0, 0.0, stack_hint()]
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed * 1000 >= QUERY_SLOW_MS:
+            self.slow.append({"sql": shape, "ms": round(elapsed * 1000, 2), "stack": stack_hint()})
+
+    def findings(self, repeat_threshold: int = QUERY_REPEAT_THRESHOLD) -> list[dict]:
+        findings = [{"kind": "slow_query", **slow} for slow in self.slow]
+        for shape, (count, total, hint) in self.shapes.items():
+            if count >= repeat_threshold and shape.upper().startswith("SELECT"):
+                findings.append({"kind": "repeated_query", "sql": shape, "count": count,
+                                 "total_ms": round(total * 1000, 2), "stack": hint})
+        return findings
+
+    def summary(self, top: int = 5) -> str:
+        ordered = sorted(self.shapes.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return "\n".join(f"  {count}× {shape[:160]} ({hint})" for shape, (count, _, hint) in ordered)
+
+
+_current: ContextVar[QueryTrace | None] = ContextVar("query_trace", default=None)
+# Traces globales (tests) : TestClient exécute l'application dans un autre thread que le test
+_global_traces: list[QueryTrace] = []
+_instrumented: set[int] = set()
+
+
+def instrument_engine(engine):
+    """Installe les hooks de chronométrage sur un moteur synchrone (idempotent)."""
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._diagnostics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        trace = _current.get()
+        if trace is None and not _global_traces:
+            return
+        elapsed = time.perf_counter() - context._diagnostics_start
+        if trace is not None:
+            trace.record(statement, elapsed)
+        for global_trace in _global_traces:
+            global_trace.record(statement, elapsed)
+
+
+# ================= MIDDLEWARE =================
+class QueryDiagnosticsMiddleware:
+    def __init__(self, app, mode: str = QUERY_DIAGNOSTICS):
+        if mode not in MODES:
+            raise ValueError(f"QUERY_DIAGNOSTICS invalide: {mode}")
+        self.app = app
+        self.mode = mode
+
+    def _enabled(self, scope) -> bool:
+        if self.mode == "on":
+            return True
+        return self.mode == "header" and any(
+            name == HEADER and value.strip() in (b"1", b"true") for name, value in scope["headers"]
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace()
+        token = _current.set(trace)
+
+        async def send_with_summary(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(trace.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_summary)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            source = f"{scope['method']} {route}"
+            for finding in trace.findings():
+                message = "Requête SQL lente" if finding["kind"] == "slow_query" else "Requête SQL répétée (N+1 probable)"
+                await log_writer.alog("WARNING", message, source=source, details={**finding, "queries": trace.count})
+
+
+# ================= TESTS =================
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, engines=None, repeat_threshold: int | None = None):
+    """Échoue si le bloc émet plus de `max_queries` requêtes (ou une forme répétée, si demandé).
+
+        with query_budget(3):
+            client.get("/auth/me", headers=...)
+    """
+    if engines is None:
+        from db.database import async_engine, engine
+        engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        instrument_engine(target)
+
+    trace = QueryTrace()
+    _global_traces.append(trace)
+    try:
+        yield trace
+    finally:
+        _global_traces.remove(trace)
+
+    if trace.count > max_queries:
+        raise QueryBudgetExceeded(f"{trace.count} requêtes SQL > budget {max_queries}\n{trace.summary()}")
+    if repeat_threshold is not None:
+        repeated = [f for f in trace.findings(repeat_threshold) if f["kind"] == "repeated_query"]
+        if repeated:
+            raise QueryBudgetExceeded(
+                "Requêtes répétées :\n" + "\n".join(f"  {f['count']}× {f['sql'][:160]} ({f['stack']})" for f in repeated)
+            )
+
+
+def assert_query_budget(client, method: str, url: str, max_queries: int, **kwargs):
+    """Appelle la route avec un client de test et vérifie son budget de requêtes ; renvoie la réponse."""
+    with query_budget(max_queries):
+        return client.request(method, url, **kwargs)
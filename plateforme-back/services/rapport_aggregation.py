@@ -0,0 +1,351 @@
+"""Compteurs RapportQA / IndicateurQualite maintenus incrémentalement par sprint.
+
+Le verdict d'une exécution est le statut de son ResultatTest s'il existe, sinon celui
+de l'ExecutionTest. À chaque flush touchant une exécution, un résultat ou une anomalie,
+l'état « avant » (lu en base dans before_flush) et l'état « après » (lu dans after_flush)
+des lignes concernées sont comparés, et la différence est appliquée aux compteurs des
+sprints dans la même transaction. `rebuild` et `check_consistency` recalculent tout
+depuis les tables sources pour réparer ou auditer.
+"""
+from collections import Counter, defaultdict
+
+from sqlalchemy import bindparam, case, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.anomalie import Anomalie
+from models.execution import ExecutionTest, ResultatTest
+from models.rapports import IndicateurQualite, RapportQA
+from services.scope import test_sprint_pairs
+from services.statuts import (
+    ECHOUE, REUSSI, classer_statut, est_critique, sql_est_critique, sql_est_echoue, sql_est_reussi
+)
+from services.tableau_bord import invalidate_snapshots
+
+# Compteurs suivis par sprint
+EXECUTES = "executes"
+REUSSIS = "reussis"
+ECHOUES = "echoues"
+ANOMALIES = "anomalies"
+CRITIQUES = "critiques"
+
+
+# ================= STATE SNAPSHOTS =================
+def _verdict():
+    return func.coalesce(ResultatTest.statut, ExecutionTest.statut)
+
+
+def _execution_contributions(connection, execution_ids) -> dict[int, Counter]:
+    """Contribution aux compteurs de chaque sprint des exécutions données."""
+    contributions: dict[int, Counter] = defaultdict(Counter)
+    if not execution_ids:
+        return contributions
+    pairs = test_sprint_pairs().subquery()
+    rows = connection.execute(
+        select(pairs.c.sprint_id, _verdict())
+        .select_from(ExecutionTest)
+        .outerjoin(ResultatTest, ResultatTest.execution_id == ExecutionTest.id)
+        .join(pairs, pairs.c.test_id == ExecutionTest.test_id)
+        .where(ExecutionTest.id.in_(execution_ids))
+    )
+    for sprint_id, verdict in rows:
+        counter = contributions[sprint_id]
+        counter[EXECUTES] += 1
+        classe = classer_statut(verdict)
+        if classe == REUSSI:
+            counter[REUSSIS] += 1
+        elif classe == ECHOUE:
+            counter[ECHOUES] += 1
+    return contributions
+
+
+def _anomaly_contributions(connection, anomaly_ids) -> dict[int, Counter]:
+    contributions: dict[int, Counter] = defaultdict(Counter)
+    if not anomaly_ids:
+        return contributions
+    pairs = test_sprint_pairs().subquery()
+    rows = connection.execute(
+        select(pairs.c.sprint_id, Anomalie.severite)
+        .select_from(Anomalie)
+        .join(ResultatTest, ResultatTest.id == Anomalie.resultat_id)
+        .join(ExecutionTest, ExecutionTest.id == ResultatTest.execution_id)
+        .join(pairs, pairs.c.test_id == ExecutionTest.test_id)
+        .where(Anomalie.id.in_(anomaly_ids))
+    )
+    for sprint_id, severite in rows:
+        contributions[sprint_id][ANOMALIES] += 1
+        if est_critique(severite):
+            contributions[sprint_id][CRITIQUES] += 1
+    return contributions
+
+
+def _difference(after: dict[int, Counter], before: dict[int, Counter]) -> dict[int, Counter]:
+    deltas: dict[int, Counter] = {}
+    for sprint_id in after.keys() | before.keys():
+        delta = Counter(after.get(sprint_id, {}))
+        delta.subtract(before.get(sprint_id, {}))
+        delta = Counter({key: value for key, value in delta.items() if value})
+        if delta:
+            deltas[sprint_id] = delta
+    return deltas
+
+
+# ================= COUNTER UPDATES =================
+def _insert_missing(connection, model, rows: list[dict], key: str):
+    """INSERT … ON CONFLICT DO NOTHING sur l'index unique `key` : sans doublon face à une
+    transaction concurrente qui crée la même ligne."""
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    connection.execute(dialect.insert(model).on_conflict_do_nothing(index_elements=[key]), rows)
+
+
+def ensure_rapports(connection, sprint_ids) -> dict[int, int]:
+    """Crée au besoin le RapportQA (et son IndicateurQualite) des sprints ; retourne sprint -> rapport."""
+    def existing_rapports():
+        return dict(connection.execute(
+            select(RapportQA.sprintId, RapportQA.id).where(RapportQA.sprintId.in_(sprint_ids))
+        ).all())
+
+    existing = existing_rapports()
+    missing = [sprint_id for sprint_id in sprint_ids if sprint_id not in existing]
+    if missing:
+        _insert_missing(connection, RapportQA, [{"sprintId": sprint_id, "statut": "EN_COURS"} for sprint_id in missing],
+                        "sprintId")
+        existing = existing_rapports()  # créés ici ou par une transaction concurrente
+
+    rapport_ids = list(existing.values())
+    with_indicateur = set(connection.scalars(
+        select(IndicateurQualite.rapportId).where(IndicateurQualite.rapportId.in_(rapport_ids))
+    ))
+    orphans = [rapport_id for rapport_id in rapport_ids if rapport_id not in with_indicateur]
+    if orphans:
+        _insert_missing(connection, IndicateurQualite, [{"rapportId": rapport_id} for rapport_id in orphans],
+                        "rapportId")
+    return existing
+
+
+def _taux(reussis, executes):
+    return case((executes > 0, reussis * 100.0 / executes), else_=None)
+
+
+def apply_deltas(connection, deltas: dict[int, Counter]):
+    if not deltas:
+        return
+    rapports = ensure_rapports(connection, list(deltas))
+    rapport = RapportQA.__table__
+    indicateur = IndicateurQualite.__table__
+
+    executes = func.coalesce(rapport.c.nombreTestsExecutes, 0) + bindparam("d_executes")
+    reussis = func.coalesce(rapport.c.nombreTestsReussis, 0) + bindparam("d_reussis")
+    connection.execute(
+        update(rapport)
+        .where(rapport.c.id == bindparam("rapport_id"))
+        .values(
+            nombreTestsExecutes=executes,
+            nombreTestsReussis=reussis,
+            nombreTestsEchoues=func.coalesce(rapport.c.nombreTestsEchoues, 0) + bindparam("d_echoues"),
+            tauxReussite=_taux(reussis, executes),
+        ),
+        [
+            {
+                "rapport_id": rapports[sprint_id],
+                "d_executes": delta[EXECUTES],
+                "d_reussis": delta[REUSSIS],
+                "d_echoues": delta[ECHOUES],
+            }
+            for sprint_id, delta in deltas.items()
+        ],
+    )
+    connection.execute(
+        update(indicateur)
+        .where(indicateur.c.rapportId == bindparam("rapport_id"))
+        .values(
+            nombreAnomalies=func.coalesce(indicateur.c.nombreAnomalies, 0) + bindparam("d_anomalies"),
+            nombreAnomaliesCritiques=func.coalesce(indicateur.c.nombreAnomaliesCritiques, 0) + bindparam("d_critiques"),
+            tauxReussite=select(rapport.c.tauxReussite).where(rapport.c.id == indicateur.c.rapportId).scalar_subquery(),
+        ),
+        [
+            {"rapport_id": rapports[sprint_id], "d_anomalies": delta[ANOMALIES], "d_critiques": delta[CRITIQUES]}
+            for sprint_id, delta in deltas.items()
+        ],
+    )
+
+
+def aggregate_new_executions(connection, execution_ids):
+    """Pour les insertions hors unit of work (insert en masse) : appeler avant le commit."""
+    deltas = _execution_contributions(connection, execution_ids)
+    apply_deltas(connection, deltas)
+    invalidate_snapshots(connection, deltas)
+
+
+# ================= ORM HOOKS =================
+_STATE_KEY = "rapport_aggregation_before"
+
+
+def _identity_id(obj) -> int | None:
+    # Identité connue sans recharger un objet expiré
+    identity = inspect(obj).identity
+    return identity[0] if identity else None
+
+
+def _execution_ids_of(resultat: ResultatTest) -> set[int]:
+    history = inspect(resultat).attrs.execution_id.history
+    ids = {value for value in (*history.deleted, *history.unchanged, *history.added) if value is not None}
+    if not ids and inspect(resultat).has_identity:
+        ids.add(resultat.execution_id)  # attribut expiré après commit : rechargé
+    # Relation déjà chargée uniquement : pas de lazy load pendant le flush
+    execution = resultat.__dict__.get("execution")
+    if execution is not None and _identity_id(execution) is not None:
+        ids.add(_identity_id(execution))
+    ids.discard(None)
+    return ids
+
+
+@event.listens_for(Session, "before_flush")
+def _snapshot_before(session, flush_context, instances):
+    # Les mêmes ids sont relus après le flush : seuls les objets nouveaux y sont ajoutés,
+    # leur contribution « avant » étant nulle par définition.
+    execution_ids, anomaly_ids = set(), set()
+    new_executions, new_resultats, new_anomalies = [], [], []
+    relevant = False
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, ExecutionTest):
+            relevant = True
+            if obj in session.new:
+                new_executions.append(obj)
+            else:
+                execution_ids.add(_identity_id(obj))
+        elif isinstance(obj, ResultatTest):
+            relevant = True
+            execution_ids |= _execution_ids_of(obj)
+            if obj in session.new:
+                new_resultats.append(obj)
+        elif isinstance(obj, Anomalie):
+            relevant = True
+            if obj in session.new:
+                new_anomalies.append(obj)
+            else:
+                anomaly_ids.add(_identity_id(obj))
+    if not relevant:
+        return
+
+    connection = session.connection()
+    session.info[_STATE_KEY] = (
+        execution_ids,
+        anomaly_ids,
+        (new_executions, new_resultats, new_anomalies),
+        _execution_contributions(connection, execution_ids),
+        _anomaly_contributions(connection, anomaly_ids),
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_after(session, flush_context):
+    state = session.info.pop(_STATE_KEY, None)
+    if state is None:
+        return
+    execution_ids, anomaly_ids, (executions, resultats, anomalies), executions_before, anomalies_before = state
+
+    # Les objets nouveaux ont maintenant un id
+    execution_ids = execution_ids | {e.id for e in executions}
+    for resultat in resultats:
+        execution_ids |= _execution_ids_of(resultat)
+    anomaly_ids = anomaly_ids | {a.id for a in anomalies}
+
+    connection = session.connection()
+    deltas = _difference(_execution_contributions(connection, execution_ids), executions_before)
+    for sprint_id, delta in _difference(_anomaly_contributions(connection, anomaly_ids), anomalies_before).items():
+        deltas.setdefault(sprint_id, Counter()).update(delta)
+    apply_deltas(connection, deltas)
+
+
+# ================= REBUILD / CHECK =================
+def compute_counters(db: Session, sprint_ids=None) -> dict[int, dict]:
+    """Recalcule les compteurs depuis les tables sources (scan complet)."""
+    pairs = test_sprint_pairs().subquery()
+    verdict = _verdict()
+    executions = (
+        select(
+            pairs.c.sprint_id,
+            func.count(ExecutionTest.id),
+            func.sum(case((sql_est_reussi(verdict), 1), else_=0)),
+            func.sum(case((sql_est_echoue(verdict), 1), else_=0)),
+        )
+        .select_from(ExecutionTest)
+        .outerjoin(ResultatTest, ResultatTest.execution_id == ExecutionTest.id)
+        .join(pairs, pairs.c.test_id == ExecutionTest.test_id)
+        .group_by(pairs.c.sprint_id)
+    )
+    anomalies = (
+        select(
+            pairs.c.sprint_id,
+            func.count(Anomalie.id),
+            func.sum(case((sql_est_critique(Anomalie.severite), 1), else_=0)),
+        )
+        .select_from(Anomalie)
+        .join(ResultatTest, ResultatTest.id == Anomalie.resultat_id)
+        .join(ExecutionTest, ExecutionTest.id == ResultatTest.execution_id)
+        .join(pairs, pairs.c.test_id == ExecutionTest.test_id)
+        .group_by(pairs.c.sprint_id)
+    )
+    if sprint_ids is not None:
+        executions = executions.where(pairs.c.sprint_id.in_(sprint_ids))
+        anomalies = anomalies.where(pairs.c.sprint_id.in_(sprint_ids))
+
+    counters: dict[int, dict] = defaultdict(lambda: dict.fromkeys((EXECUTES, REUSSIS, ECHOUES, ANOMALIES, CRITIQUES), 0))
+    for sprint_id, executes, reussis, echoues in db.execute(executions):
+        counters[sprint_id].update({EXECUTES: executes, REUSSIS: reussis or 0, ECHOUES: echoues or 0})
+    for sprint_id, total, critiques in db.execute(anomalies):
+        counters[sprint_id].update({ANOMALIES: total, CRITIQUES: critiques or 0})
+    return dict(counters)
+
+
+def stored_counters(db: Session, sprint_ids=None) -> dict[int, dict]:
+    query = (
+        select(
+            RapportQA.sprintId,
+            RapportQA.nombreTestsExecutes,
+            RapportQA.nombreTestsReussis,
+            RapportQA.nombreTestsEchoues,
+            IndicateurQualite.nombreAnomalies,
+            IndicateurQualite.nombreAnomaliesCritiques,
+        )
+        .outerjoin(IndicateurQualite, IndicateurQualite.rapportId == RapportQA.id)
+        .where(RapportQA.sprintId.is_not(None))
+    )
+    if sprint_ids is not None:
+        query = query.where(RapportQA.sprintId.in_(sprint_ids))
+    return {
+        sprint_id: {
+            EXECUTES: executes or 0,
+            REUSSIS: reussis or 0,
+            ECHOUES: echoues or 0,
+            ANOMALIES: anomalies or 0,
+            CRITIQUES: critiques or 0,
+        }
+        for sprint_id, executes, reussis, echoues, anomalies, critiques in db.execute(query)
+    }
+
+
+def check_consistency(db: Session, sprint_ids=None) -> list[dict]:
+    """Écarts entre compteurs stockés et recalculés ; liste vide si tout est cohérent."""
+    expected = compute_counters(db, sprint_ids)
+    stored = stored_counters(db, sprint_ids)
+    zero = dict.fromkeys((EXECUTES, REUSSIS, ECHOUES, ANOMALIES, CRITIQUES), 0)
+    mismatches = []
+    for sprint_id in sorted(expected.keys() | stored.keys()):
+        attendu, actuel = expected.get(sprint_id, zero), stored.get(sprint_id, zero)
+        if attendu != actuel:
+            mismatches.append({"sprint_id": sprint_id, "attendu": attendu, "stocke": actuel})
+    return mismatches
+
+
+def rebuild(db: Session, sprint_ids=None) -> int:
+    """Réécrit les compteurs des sprints à partir des valeurs recalculées. Ne commit pas."""
+    expected = compute_counters(db, sprint_ids)
+    stored = stored_counters(db, sprint_ids)
+    deltas = _difference(
+        {sprint_id: Counter(values) for sprint_id, values in expected.items()},
+        {sprint_id: Counter(values) for sprint_id, values in stored.items()},
+    )
+    apply_deltas(db.connection(), deltas)
+    return len(deltas)
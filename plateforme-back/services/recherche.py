@@ -0,0 +1,457 @@
+"""Recherche plein texte sur les user stories, tests, scénarios et anomalies.
+
+Deux moteurs, choisis selon la base :
+
+- PostgreSQL : `websearch_to_tsquery` sur l'expression `search_vector` (db/fulltext.py)
+  couverte par un index GIN par table ; classement `ts_rank_cd` (titre de poids A, corps de
+  poids B), extraits `ts_headline` calculés seulement pour la page renvoyée ;
+- autres bases (SQLite) : index inversé en mémoire, par processus. Chargé au premier appel,
+  tenu à jour au commit des sessions ORM (création, modification des champs indexés,
+  suppression) et complété toutes les SEARCH_REFRESH_SECONDS par les lignes insérées hors
+  ORM ou par un autre processus (id > dernier id lu en base). Les modifications faites hors ORM
+  ou par un autre processus ne sont vues qu'après un redémarrage. Classement BM25 en NumPy,
+  extraits calculés en Python.
+
+Syntaxe commune : mots (tous requis), `-mot` pour exclure ; sous PostgreSQL s'y ajoutent
+les expressions entre guillemets et `or` de `websearch_to_tsquery`.
+"""
+import html
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import event, func, inspect, literal, literal_column, select, union_all
+from sqlalchemy.orm import Session
+
+from db.fulltext import search_vector, ts_config
+from models.anomalie import Anomalie
+from models.scrum import UserStory
+from models.tests import ScenarioTest, Test
+
+# ================= CONFIG =================
+load_dotenv()
+SEARCH_REFRESH_SECONDS = float(os.getenv("SEARCH_REFRESH_SECONDS", 5))
+SEARCH_TITLE_WEIGHT = float(os.getenv("SEARCH_TITLE_WEIGHT", 3))
+SEARCH_LOAD_CHUNK = int(os.getenv("SEARCH_LOAD_CHUNK", 20000))
+SEARCH_EXCERPT_CHARS = 160
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<mark>", "</mark>"
+# Délimiteurs demandés à ts_headline : caractères de contrôle absents du HTML, remplacés par
+# <mark> une fois le texte échappé
+_SENTINEL_START, _SENTINEL_STOP = "\x02", "\x03"
+
+_PENDING_KEY = "recherche_pending"
+
+
+@dataclass(frozen=True)
+class Source:
+    type: str
+    model: type
+    title: object
+    body: tuple
+    permission: tuple[str, str]
+
+    @property
+    def columns(self) -> tuple:
+        return (self.title, *self.body)
+
+
+SOURCES = {
+    source.type: source for source in (
+        Source("userstory", UserStory, UserStory.titre, (UserStory.description, UserStory.criteresAcceptation),
+               ("projet", "read")),
+        Source("test", Test, Test.nom, (Test.description,), ("projet", "read")),
+        Source("scenario", ScenarioTest, ScenarioTest.nom, (ScenarioTest.description,), ("projet", "read")),
+        Source("anomalie", Anomalie, Anomalie.titre, (Anomalie.description,), ("anomalie", "read")),
+    )
+}
+TYPE_CODES = {name: code for code, name in enumerate(SOURCES)}
+
+
+def allowed_types(principal, requested: list[str] | None = None) -> list[str]:
+    return [name for name in (requested or SOURCES)
+            if name in SOURCES and principal.has_permission(*SOURCES[name].permission)]
+
+
+# ================= ANALYSE =================
+STOPWORDS = frozenset("""
+au aux avec ce ces dans de des du elle en et eux il je la le les leur lui ma mais me meme mes moi mon ne nos
+notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+est sont etre ete a an the of and to in is for on with by be as at or it this that from
+""".split())
+_WORD = re.compile(r"\w+")
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents."""
+    return "".join(c for c in unicodedata.normalize("NFKD", text.lower()) if not unicodedata.combining(c))
+
+
+def _stem(word: str) -> str:
+    # Pluriels réguliers seulement : « tests » et « test » doivent se retrouver
+    if len(word) > 3 and word[-1] in "sx" and word[-2] not in "su":
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return [_stem(word) for word in _WORD.findall(_fold(text)) if len(word) > 1 and word not in STOPWORDS]
+
+
+def parse_query(query: str) -> tuple[list[str], list[str]]:
+    """(termes requis, termes exclus) ; guillemets ignorés, `or` traité comme un mot vide."""
+    include, exclude = [], []
+    for raw in query.replace('"', " ").split():
+        target = exclude if raw.startswith("-") and len(raw) > 1 else include
+        for token in tokenize(raw.lstrip("-")):
+            if token != "or" and token not in target:
+                target.append(token)
+    return include, exclude
+
+
+def highlight(text: str | None, terms: set[str], max_chars: int = SEARCH_EXCERPT_CHARS) -> str | None:
+    """Extrait HTML centré sur la première occurrence : texte échappé, termes entourés de <mark>."""
+    if not text:
+        return None
+    matches = [m for m in _WORD.finditer(text) if _stem(_fold(m.group(0))) in terms]
+    if not matches:
+        return None
+    start = max(0, matches[0].start() - max_chars // 4)
+    if start:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < matches[0].start() else start
+    end = min(len(text), start + max_chars)
+    parts, position = [], start
+    for match in matches:
+        if match.end() > end:
+            break
+        parts += [html.escape(text[position:match.start()]), HIGHLIGHT_START, html.escape(match.group(0)),
+                  HIGHLIGHT_STOP]
+        position = match.end()
+    parts.append(html.escape(text[position:end]))
+    return ("…" if start else "") + "".join(parts).strip() + ("…" if end < len(text) else "")
+
+
+# ================= INDEX EN MÉMOIRE =================
+class InvertedIndex:
+    """Listes de postings (ordinal de document, poids) en tableaux compacts, BM25 en NumPy.
+
+    Les ordinaux ne font que croître : une mise à jour marque l'ancien ordinal comme supprimé
+    et en ajoute un nouveau ; les listes restent triées, ce qui permet les intersections
+    par fusion. Compactage quand plus d'un tiers des ordinaux sont morts.
+    """
+
+    def __init__(self, title_weight: float = SEARCH_TITLE_WEIGHT):
+        self.title_weight = title_weight
+        self._lock = threading.RLock()
+        self._reset()
+        self.queries = 0
+
+    def _reset(self):
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._keys: list[tuple[str, int]] = []
+        self._ordinals: dict[tuple[str, int], int] = {}
+        self._types = array("B")
+        self._lengths = array("f")
+        self._alive = bytearray()
+        self._live_length = 0.0
+        self._dead = 0
+        # Dernier id lu en base par `load` ; les ajouts du hook de commit ne le font pas avancer,
+        # sinon une ligne d'id inférieur commise entre-temps par un autre processus serait sautée
+        self.last_ids = {name: 0 for name in SOURCES}
+        self.loaded = False
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    # ---------- écriture ----------
+    def add(self, type_: str, doc_id: int, title: str | None, *body: str | None):
+        weights = Counter()
+        for token in tokenize(title):
+            weights[token] += self.title_weight
+        for text in body:
+            for token in tokenize(text):
+                weights[token] += 1.0
+        with self._lock:
+            self._remove((type_, doc_id))
+            if not weights:
+                return
+            ordinal = len(self._keys)
+            self._keys.append((type_, doc_id))
+            self._ordinals[(type_, doc_id)] = ordinal
+            self._types.append(TYPE_CODES[type_])
+            length = sum(weights.values())
+            self._lengths.append(length)
+            self._alive.append(1)
+            self._live_length += length
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = (array("I"), array("f"))
+                postings[0].append(ordinal)
+                postings[1].append(weight)
+
+    def remove(self, type_: str, doc_id: int):
+        with self._lock:
+            self._remove((type_, doc_id))
+            if self._dead > max(1000, len(self._keys) // 3):
+                self._compact()
+
+    def _remove(self, key):
+        ordinal = self._ordinals.pop(key, None)
+        if ordinal is not None:
+            self._alive[ordinal] = 0
+            self._live_length -= self._lengths[ordinal]
+            self._dead += 1
+
+    def _compact(self):
+        alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive) - 1
+        for token in list(self._postings):
+            ordinals, weights = (np.frombuffer(a, dtype=a.typecode).copy() for a in self._postings[token])
+            keep = alive[ordinals]
+            if not keep.any():
+                del self._postings[token]
+                continue
+            self._postings[token] = (array("I", remap[ordinals[keep]].astype(np.uint32).tobytes()),
+                                     array("f", weights[keep].tobytes()))
+        kept = np.flatnonzero(alive)
+        self._keys = [self._keys[i] for i in kept.tolist()]
+        self._ordinals = {key: ordinal for ordinal, key in enumerate(self._keys)}
+        self._types = array("B", np.frombuffer(self._types, dtype=np.uint8)[kept].tobytes())
+        self._lengths = array("f", np.frombuffer(self._lengths, dtype=np.float32)[kept].tobytes())
+        self._alive = bytearray(b"\x01" * len(self._keys))
+        self._dead = 0
+
+    # ---------- lecture ----------
+    def _snapshot(self, tokens):
+        # Copies : un tableau exporté via frombuffer ne peut plus être agrandi
+        postings = {}
+        for token in tokens:
+            if token in self._postings:
+                ordinals, weights = self._postings[token]
+                postings[token] = (np.frombuffer(ordinals, dtype=np.uint32).copy(),
+                                   np.frombuffer(weights, dtype=np.float32).copy())
+        return postings
+
+    def search(self, include: list[str], exclude: list[str] = (), types: list[str] | None = None,
+               limit: int = 20, offset: int = 0) -> list[tuple[str, int, float]]:
+        if not include:
+            return []
+        with self._lock:
+            self.queries += 1
+            postings = self._snapshot([*include, *exclude])
+            if any(token not in postings for token in include):
+                return []
+            documents = len(self._ordinals)
+            average_length = self._live_length / documents if documents else 1.0
+            # Intersection en partant de la liste la plus courte
+            terms = sorted(include, key=lambda token: len(postings[token][0]))
+            candidates = postings[terms[0]][0]
+            for token in terms[1:]:
+                candidates = np.intersect1d(candidates, postings[token][0], assume_unique=True)
+                if not len(candidates):
+                    return []
+            alive = np.frombuffer(self._alive, dtype=np.uint8)[candidates].astype(bool)
+            if types is not None:
+                codes = np.array([TYPE_CODES[name] for name in types], dtype=np.uint8)
+                alive &= np.isin(np.frombuffer(self._types, dtype=np.uint8)[candidates], codes)
+            candidates = candidates[alive]
+            for token in exclude:
+                if token in postings:
+                    candidates = candidates[~np.isin(candidates, postings[token][0], assume_unique=True)]
+            if not len(candidates):
+                return []
+            lengths = np.frombuffer(self._lengths, dtype=np.float32)[candidates].astype(np.float64)
+
+            scores = np.zeros(len(candidates))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+            for token in terms:
+                ordinals, weights = postings[token]
+                frequency = len(ordinals)
+                idf = np.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+                tf = weights[np.searchsorted(ordinals, candidates)].astype(np.float64)
+                scores += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            wanted = min(offset + limit, len(candidates))
+            top = np.argpartition(-scores, wanted - 1)[:wanted] if wanted < len(candidates) else np.arange(len(candidates))
+            top = top[np.lexsort((candidates[top], -scores[top]))][offset:]
+            return [(*self._keys[int(candidates[i])], float(scores[i])) for i in top]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._ordinals),
+                "termes": len(self._postings),
+                "postings": sum(len(ordinals) for ordinals, _ in self._postings.values()),
+                "ordinaux_morts": self._dead,
+                "requetes": self.queries,
+            }
+
+    # ---------- synchronisation avec la base ----------
+    def load(self, connection, since: dict[str, int] | None = None):
+        """Indexe les lignes de chaque source d'id > since[type] (toutes sans `since`)."""
+        for name, source in SOURCES.items():
+            primary = source.model.__table__.c.id
+            query = select(primary, *source.columns).order_by(primary)
+            if since:
+                query = query.where(primary > since[name])
+            result = connection.execute(query, execution_options={"stream_results": True,
+                                                                  "yield_per": SEARCH_LOAD_CHUNK})
+            for row in result:
+                self.add(name, *row)
+                self.last_ids[name] = max(self.last_ids[name], row[0])
+
+    def ensure_loaded(self, connection):
+        now = time.monotonic()
+        with self._lock:
+            if not self.loaded:
+                self.load(connection)
+                self.loaded, self.refreshed_at = True, now
+            elif now - self.refreshed_at >= SEARCH_REFRESH_SECONDS:
+                self.load(connection, dict(self.last_ids))
+                self.refreshed_at = now
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+
+search_index = InvertedIndex()
+
+
+def _render_headline(headline: str | None) -> str | None:
+    """Extrait ts_headline (délimiteurs sentinelles) en HTML : texte échappé, termes entourés de <mark>."""
+    if headline is None:
+        return None
+    return html.escape(headline).replace(_SENTINEL_START, HIGHLIGHT_START).replace(_SENTINEL_STOP, HIGHLIGHT_STOP)
+
+
+# ================= RECHERCHE =================
+def _pg_search(connection, query: str, types: list[str], limit: int, offset: int) -> list[dict]:
+    tsquery = func.websearch_to_tsquery(ts_config(), query)
+    ranked = union_all(*[
+        select(literal(name).label("type"), source.model.__table__.c.id.label("id"),
+               func.ts_rank_cd(search_vector(*source.columns), tsquery).label("score"))
+        .where(search_vector(*source.columns).op("@@")(tsquery))
+        for name, source in SOURCES.items() if name in types
+    ]).subquery()
+    page = connection.execute(
+        select(ranked.c.type, ranked.c.id, ranked.c.score)
+        .order_by(ranked.c.score.desc(), ranked.c.type, ranked.c.id)
+        .limit(limit).offset(offset)
+    ).all()
+
+    # Extraits pour la page seulement (ts_headline relit et réanalyse le texte)
+    options = literal(f'StartSel="{_SENTINEL_START}", StopSel="{_SENTINEL_STOP}", MaxWords=30, MinWords=10')
+    details = {}
+    for name in {row.type for row in page}:
+        source = SOURCES[name]
+        ids = [row.id for row in page if row.type == name]
+        body = source.body[0] if len(source.body) == 1 else func.concat_ws(" ", *source.body)
+        rows = connection.execute(
+            select(source.model.__table__.c.id, source.title,
+                   func.ts_headline(ts_config(), func.coalesce(body, literal_column("''")), tsquery, options))
+            .where(source.model.__table__.c.id.in_(ids))
+        )
+        details.update({(name, row[0]): (row[1], _render_headline(row[2])) for row in rows})
+    return [
+        {"type": row.type, "id": row.id, "titre": details[(row.type, row.id)][0], "score": round(float(row.score), 4),
+         "extrait": details[(row.type, row.id)][1]}
+        for row in page if (row.type, row.id) in details
+    ]
+
+
+def _memory_search(connection, query: str, types: list[str], limit: int, offset: int,
+                   index: InvertedIndex = search_index) -> list[dict]:
+    index.ensure_loaded(connection)
+    include, exclude = parse_query(query)
+    page = index.search(include, exclude, types, limit, offset)
+
+    terms = set(include)
+    details = {}
+    for name in {type_ for type_, _, _ in page}:
+        source = SOURCES[name]
+        primary = source.model.__table__.c.id
+        ids = [doc_id for type_, doc_id, _ in page if type_ == name]
+        for row in connection.execute(select(primary, *source.columns).where(primary.in_(ids))):
+            excerpts = (highlight(text, terms) for text in row[2:])
+            details[(name, row[0])] = (row[1], next((e for e in excerpts if e), None) or highlight(row[1], terms))
+    return [
+        {"type": type_, "id": doc_id, "titre": details[(type_, doc_id)][0], "score": round(score, 4),
+         "extrait": details[(type_, doc_id)][1]}
+        for type_, doc_id, score in page if (type_, doc_id) in details
+    ]
+
+
+def uses_postgres(connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def search(connection, query: str, types: list[str] | None = None, limit: int = 20, offset: int = 0) -> dict:
+    types = [name for name in (types or SOURCES) if name in SOURCES]
+    if not query.strip() or not types:
+        return {"moteur": None, "items": [], "next_offset": None}
+    engine = _pg_search if uses_postgres(connection) else _memory_search
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    items = engine(connection, query, types, limit + 1, offset)
+    return {
+        "moteur": "postgresql" if uses_postgres(connection) else "memoire",
+        "items": items[:limit],
+        "next_offset": offset + limit if len(items) > limit else None,
+    }
+
+
+# ================= SYNCHRONISATION ORM =================
+def _source_of(obj) -> Source | None:
+    for source in SOURCES.values():
+        if isinstance(obj, source.model):
+            return source
+    return None
+
+
+def _text_changed(obj, source: Source) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[column.key].history.has_changes() for column in source.columns)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_documents(session, flush_context):
+    if not search_index.loaded:
+        return  # le premier chargement lira la base
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in (*session.new, *session.dirty):
+        source = _source_of(obj)
+        if source is not None and obj.id is not None and (obj in session.new or _text_changed(obj, source)):
+            pending[(source.type, obj.id)] = tuple(getattr(obj, column.key) for column in source.columns)
+    for obj in session.deleted:
+        source = _source_of(obj)
+        if source is not None and obj.id is not None:
+            pending[(source.type, obj.id)] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_documents(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    for (type_, doc_id), texts in (pending or {}).items():
+        if texts is None:
+            search_index.remove(type_, doc_id)
+        else:
+            search_index.add(type_, doc_id, *texts)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_documents(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,42 @@
+"""Rattachement des tests à leurs sprints et à leur projet.
+
+Un test appartient à une user story soit directement (Test.userStoryId), soit via son
+cahier (CahierDeTests.userstory_id) ; la user story est rattachée aux sprints par
+sprint_userstory et au projet par Epic -> Module.
+"""
+from sqlalchemy import func, select
+
+from db.associations import sprint_userstory
+from models.scrum import Epic, Module, UserStory
+from models.tests import CahierDeTests, Test
+
+
+def test_userstory_id():
+    return func.coalesce(Test.userStoryId, CahierDeTests.userstory_id)
+
+
+def test_sprint_pairs():
+    """(test_id, sprint_id) pour chaque sprint contenant la user story du test."""
+    return (
+        select(Test.id.label("test_id"), sprint_userstory.c.sprint_id.label("sprint_id"))
+        .select_from(Test)
+        .outerjoin(CahierDeTests, CahierDeTests.id == Test.cahier_id)
+        .join(sprint_userstory, sprint_userstory.c.userstory_id == test_userstory_id())
+    )
+
+
+
+def tests_of_projet(projet_id: int):
+    return (
+        select(Test.id)
+        .outerjoin(CahierDeTests, CahierDeTests.id == Test.cahier_id)
+        .join(UserStory, UserStory.id == test_userstory_id())
+        .join(Epic, Epic.id == UserStory.epic_id)
+        .join(Module, Module.id == Epic.module_id)
+        .where(Module.projet_id == projet_id)
+    )
+
+
+def tests_of_sprint(sprint_id: int):
+    pairs = test_sprint_pairs().subquery()
+    return select(pairs.c.test_id).where(pairs.c.sprint_id == sprint_id)
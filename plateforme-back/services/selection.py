@@ -0,0 +1,247 @@
+"""Sélection et ordonnancement des tests d'un pipeline CI sous budget de temps.
+
+Les candidats sont les tests non manuels des projets touchés par le changement (user
+stories, epics, modules modifiés) ; ceux qui sont rattachés directement au changement
+sont « impactés ». Chaque candidat reçoit :
+
+- une probabilité d'échec estimée depuis statistique_test (historique complet, calculé par
+  services/statistiques.py) : moyenne de l'estimation lissée sur tout l'historique et sur
+  les STATS_RECENT_WINDOW dernières exécutions, relevée si le test est en échec à sa
+  dernière exécution ; 0,5 pour un test sans historique ;
+- un coût : sa durée moyenne (médiane des candidats à défaut).
+
+Valeur = probabilité × SELECTION_IMPACT_WEIGHT si impacté ; les tests sont pris par
+valeur par seconde décroissante tant qu'ils tiennent dans le budget (sac à dos glouton).
+Une seule requête indexée, puis NumPy : la réponse tient en quelques millisecondes.
+
+`replay` rejoue la même politique sur l'historique enregistré (exécutions regroupées en
+runs par fenêtre de temps, caractéristiques calculées uniquement sur le passé de chaque run)
+et mesure le temps économisé et les échecs manqués, comparés à une sélection aléatoire.
+"""
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, select, union
+
+from models.scrum import Epic, Module, UserStory
+from models.statistiques import StatistiqueTest
+from models.tests import CahierDeTests, Test
+from services.scope import test_userstory_id
+from services.statistiques import STATS_RECENT_WINDOW, Historique, test_segments
+
+# ================= CONFIG =================
+load_dotenv()
+SELECTION_IMPACT_WEIGHT = float(os.getenv("SELECTION_IMPACT_WEIGHT", 5.0))
+SELECTION_DEFAULT_DURATION = float(os.getenv("SELECTION_DEFAULT_DURATION", 60))  # secondes
+SELECTION_MIN_DURATION = 1.0
+
+TYPES_EXCLUS = ("manuel",)
+
+
+# ================= POLITIQUE =================
+def failure_probability(executions, echecs, echecs_recents, recent_executions, serie_courante) -> np.ndarray:
+    """Probabilité d'échec à la prochaine exécution (estimateurs de Laplace, donc 0,5 sans historique)."""
+    long_terme = (echecs + 1.0) / (executions + 2.0)
+    recente = (echecs_recents + 1.0) / (recent_executions + 2.0)
+    probabilite = (long_terme + recente) / 2
+    # Un test rouge à sa dernière exécution le reste le plus souvent
+    return np.maximum(probabilite, np.where(serie_courante > 0, (serie_courante + 1.0) / (serie_courante + 2.0), 0))
+
+
+def prioritize(value: np.ndarray, cost: np.ndarray, budget: float | None) -> np.ndarray:
+    """Indices retenus, par valeur par seconde décroissante ; sans budget, tous les tests ordonnés."""
+    order = np.argsort(-(value / cost), kind="stable")
+    if budget is None:
+        return order
+    cumulative = np.cumsum(cost[order])
+    fits = int(np.searchsorted(cumulative, budget, side="right"))
+    selected, remaining = list(order[:fits]), budget - (cumulative[fits - 1] if fits else 0.0)
+    # Au-delà du préfixe, les tests plus courts qui tiennent encore dans le reliquat
+    for index in order[fits:]:
+        if cost[index] <= remaining:
+            selected.append(index)
+            remaining -= cost[index]
+    return np.asarray(selected, dtype=np.int64)
+
+
+def _estimated_cost(durees: np.ndarray) -> np.ndarray:
+    known = durees[~np.isnan(durees)]
+    fallback = float(np.median(known)) if len(known) else SELECTION_DEFAULT_DURATION
+    return np.maximum(np.where(np.isnan(durees), fallback, durees), SELECTION_MIN_DURATION)
+
+
+# ================= SÉLECTION =================
+def _projets_of_changes(userstory_ids, epic_ids, module_ids):
+    return union(
+        select(Module.projet_id).where(Module.id.in_(module_ids)),
+        select(Module.projet_id).join(Epic, Epic.module_id == Module.id).where(Epic.id.in_(epic_ids)),
+        select(Module.projet_id).join(Epic, Epic.module_id == Module.id)
+        .join(UserStory, UserStory.epic_id == Epic.id).where(UserStory.id.in_(userstory_ids)),
+    )
+
+
+def select_tests(connection, userstory_ids=(), epic_ids=(), module_ids=(), budget: float | None = None,
+                 types: list[str] | None = None, inclure_non_impactes: bool = True) -> dict:
+    userstory_ids, epic_ids, module_ids = list(userstory_ids), list(epic_ids), list(module_ids)
+    impacte = or_(
+        test_userstory_id().in_(userstory_ids),
+        UserStory.epic_id.in_(epic_ids),
+        Epic.module_id.in_(module_ids),
+    )
+    query = (
+        select(Test.id, Test.nom, Test.type, impacte.label("impacte"),
+               StatistiqueTest.nombreExecutions, StatistiqueTest.nombreEchecs, StatistiqueTest.echecsRecents,
+               StatistiqueTest.serieEchecsCourante, StatistiqueTest.dureeMoyenne)
+        .select_from(Test)
+        .outerjoin(CahierDeTests, CahierDeTests.id == Test.cahier_id)
+        .join(UserStory, UserStory.id == test_userstory_id())
+        .join(Epic, Epic.id == UserStory.epic_id)
+        .join(Module, Module.id == Epic.module_id)
+        .outerjoin(StatistiqueTest, and_(StatistiqueTest.testId == Test.id, StatistiqueTest.sprintId.is_(None)))
+        .order_by(Test.id)
+    )
+    if not inclure_non_impactes:
+        query = query.where(impacte)
+    elif userstory_ids or epic_ids or module_ids:
+        query = query.where(Module.projet_id.in_(_projets_of_changes(userstory_ids, epic_ids, module_ids)))
+    # Sans changement connu : tous les tests, ordonnés sur l'historique seul
+    if types:
+        query = query.where(Test.type.in_(types))
+    else:
+        query = query.where(or_(Test.type.is_(None), Test.type.not_in(TYPES_EXCLUS)))
+
+    rows = connection.execute(query).all()
+    if not rows:
+        return {"budget": budget, "dureeEstimee": 0.0, "candidats": 0, "couvertureEchecs": None, "tests": []}
+
+    ids, noms, types_, impactes, executions, echecs, recents, series, durees = zip(*rows)
+    executions = np.nan_to_num(np.array(executions, dtype=np.float64))  # NULL : pas encore de statistiques
+    probabilite = failure_probability(
+        executions,
+        np.nan_to_num(np.array(echecs, dtype=np.float64)),
+        np.nan_to_num(np.array(recents, dtype=np.float64)),
+        np.minimum(executions, STATS_RECENT_WINDOW),
+        np.nan_to_num(np.array(series, dtype=np.float64)),
+    )
+    impactes = np.array(impactes, dtype=bool)
+    cost = _estimated_cost(np.array(durees, dtype=np.float64))
+    value = probabilite * np.where(impactes, SELECTION_IMPACT_WEIGHT, 1.0)
+
+    selected = prioritize(value, cost, budget)
+    return {
+        "budget": budget,
+        "dureeEstimee": round(float(cost[selected].sum()), 1),
+        "candidats": len(rows),
+        # Part de l'espérance du nombre d'échecs couverte par la sélection
+        "couvertureEchecs": round(float(probabilite[selected].sum() / probabilite.sum()), 4),
+        "tests": [
+            {
+                "test_id": ids[i],
+                "nom": noms[i],
+                "type": types_[i],
+                "impacte": bool(impactes[i]),
+                "probabiliteEchec": round(float(probabilite[i]), 4),
+                "dureeEstimee": round(float(cost[i]), 1),
+            }
+            for i in selected.tolist()
+        ],
+    }
+
+
+# ================= REJEU =================
+def history_features(historique: Historique, recent_window: int = STATS_RECENT_WINDOW) -> dict[str, np.ndarray]:
+    """Caractéristiques de chaque exécution calculées sur les exécutions antérieures du même test."""
+    total = len(historique)
+    _, counts = test_segments(historique)
+    groups = np.repeat(np.arange(len(counts)), counts)
+    starts = (np.cumsum(counts) - counts)[groups]
+    position = np.arange(total) - starts  # exécutions antérieures
+
+    fail = historique.echec.astype(np.float64)
+    before = np.cumsum(fail) - fail
+    prior_failures = before - before[starts]
+    lagged = np.where(position >= recent_window, np.arange(total) - recent_window, starts)
+    recent_failures = prior_failures - prior_failures[lagged]
+
+    # Série d'échecs en cours juste avant chaque exécution
+    run_start = np.ones(total, dtype=bool)
+    run_start[1:] = (historique.echec[1:] != historique.echec[:-1]) | (position[1:] == 0)
+    run_first = np.maximum.accumulate(np.where(run_start, np.arange(total), 0))
+    streak = np.where(historique.echec, np.arange(total) - run_first + 1, 0)
+    streak_before = np.where(position > 0, np.roll(streak, 1), 0)
+
+    known = ~np.isnan(historique.duree)
+    duration_before = np.cumsum(np.where(known, historique.duree, 0.0)) - np.where(known, historique.duree, 0.0)
+    known_before = np.cumsum(known) - known
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_duration = (duration_before - duration_before[starts]) / (known_before - known_before[starts])
+
+    return {
+        "executions": position.astype(np.float64),
+        "echecs": prior_failures,
+        "echecs_recents": recent_failures,
+        "recent_executions": np.minimum(position, recent_window).astype(np.float64),
+        "serie_courante": streak_before.astype(np.float64),
+        "duree_moyenne": mean_duration,
+    }
+
+
+def replay(historique: Historique, run_hours: float = 24, budget_ratio: float = 0.5, warmup_runs: int = 5,
+           seed: int = 0) -> dict:
+    """Rejoue la sélection run par run ; chaque test compte une fois par run (première exécution)."""
+    if not len(historique):
+        return {"runs": 0}
+    features = history_features(historique)
+    run = np.floor(historique.date / (run_hours * 3600)).astype(np.int64)
+
+    # Ordre (run, test, date) ; première exécution de chaque test dans chaque run
+    order = np.argsort(run, kind="stable")
+    run_sorted, test_sorted = run[order], historique.test_id[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (run_sorted[1:] != run_sorted[:-1]) | (test_sorted[1:] != test_sorted[:-1])
+    rows = order[first]
+    rows_run = run[rows]
+
+    probabilite = failure_probability(features["executions"][rows], features["echecs"][rows],
+                                      features["echecs_recents"][rows], features["recent_executions"][rows],
+                                      features["serie_courante"][rows])
+    estimated = _estimated_cost(features["duree_moyenne"][rows])
+    actual = np.where(np.isnan(historique.duree[rows]), estimated, historique.duree[rows])
+    failed = historique.echec[rows]
+
+    rng = np.random.default_rng(seed)
+    totals = {strategy: {"secondes": 0.0, "echecs_detectes": 0, "runs_detectes": 0}
+              for strategy in ("historique", "aleatoire")}
+    full_seconds, failures, runs_with_failures, runs = 0.0, 0, 0, 0
+    bounds = np.flatnonzero(np.diff(rows_run)) + 1
+    for index, members in enumerate(np.split(np.arange(len(rows)), bounds)):
+        if index < warmup_runs:
+            continue
+        runs += 1
+        full_seconds += float(actual[members].sum())
+        run_failures = int(failed[members].sum())
+        failures += run_failures
+        runs_with_failures += run_failures > 0
+        budget = budget_ratio * float(estimated[members].sum())
+        for strategy, value in (("historique", probabilite[members]), ("aleatoire", rng.random(len(members)))):
+            chosen = members[prioritize(value, estimated[members], budget)]
+            detected = int(failed[chosen].sum())
+            totals[strategy]["secondes"] += float(actual[chosen].sum())
+            totals[strategy]["echecs_detectes"] += detected
+            totals[strategy]["runs_detectes"] += detected > 0
+
+    for result in totals.values():
+        result["temps_economise"] = round(1 - result["secondes"] / full_seconds, 4) if full_seconds else None
+        result["echecs_manques"] = failures - result["echecs_detectes"]
+        result["rappel_echecs"] = round(result["echecs_detectes"] / failures, 4) if failures else None
+        result["secondes"] = round(result["secondes"], 1)
+    return {
+        "runs": runs,
+        "executions": len(historique),
+        "budget_ratio": budget_ratio,
+        "secondes_completes": round(full_seconds, 1),
+        "echecs": failures,
+        "runs_avec_echecs": runs_with_failures,
+        **totals,
+    }
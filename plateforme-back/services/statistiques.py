@@ -0,0 +1,495 @@
+"""Statistiques d'historique par test : instabilité, séries d'échecs, durées, régressions.
+
+L'historique est lu en colonnes et par blocs (`stream_results` + `yield_per`), trié par
+(test, date) via l'index ix_execution_test_test_date_id ; le verdict (ResultatTest sinon
+ExecutionTest) et la date en secondes sont calculés en SQL, si bien que chaque bloc devient
+directement un tableau NumPy float64. Les indicateurs sont ensuite calculés par segments
+contigus (un segment = un test, ou un couple test × sprint), sans boucle Python par ligne :
+
+- tauxBascule : exécutions dont le verdict diffère de la précédente / (n - 1) ;
+- scoreInstabilite : tauxBascule × 4p(1 - p), p = taux d'échec ;
+- serieEchecsMax / serieEchecsCourante : longueur des plages de verdicts identiques ;
+- dureeP50 / dureeP95 : interpolation linéaire (comme `np.percentile`) après un tri unique
+  de la clé segment × étendue + durée ;
+- régressions : les STATS_RECENT_WINDOW dernières exécutions comparées aux précédentes.
+
+Portée sprint : exécutions des tests du sprint (même rattachement que les rapports QA) datées
+entre dateDebut et dateFin. Chaque calcul remplace les lignes correspondantes de
+statistique_test et les RecommandationQualite encore « PROPOSEE » qu'il avait produites.
+"""
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import Float, and_, case, cast, delete, func, insert, or_, select
+
+from models.execution import ExecutionTest, ResultatTest
+from models.rapports import RapportQA, RecommandationQualite
+from models.scrum import Sprint
+from models.statistiques import StatistiqueTest
+from models.tests import Test
+from services.rapport_aggregation import ensure_rapports
+from services.scope import test_sprint_pairs
+from services.statuts import sql_est_echoue, sql_est_reussi
+from services.tableau_bord import invalidate_snapshots
+
+# ================= CONFIG =================
+load_dotenv()
+STATS_CHUNK_SIZE = int(os.getenv("STATS_CHUNK_SIZE", 50000))
+STATS_RECENT_WINDOW = int(os.getenv("STATS_RECENT_WINDOW", 10))
+STATS_MIN_EXECUTIONS = int(os.getenv("STATS_MIN_EXECUTIONS", 5))
+STATS_FLAKY_THRESHOLD = float(os.getenv("STATS_FLAKY_THRESHOLD", 0.3))
+STATS_STREAK_THRESHOLD = int(os.getenv("STATS_STREAK_THRESHOLD", 3))
+STATS_FAILURE_REGRESSION = float(os.getenv("STATS_FAILURE_REGRESSION", 0.3))  # hausse du taux d'échec
+STATS_DURATION_REGRESSION = float(os.getenv("STATS_DURATION_REGRESSION", 1.5))  # facteur sur la médiane
+
+# Recommandations produites par ce module (remplacées à chaque calcul tant qu'elles sont PROPOSEE)
+INSTABILITE = "INSTABILITE"
+ECHEC_PERSISTANT = "ECHEC_PERSISTANT"
+REGRESSION = "REGRESSION"
+PERFORMANCE = "PERFORMANCE"
+CATEGORIES = (INSTABILITE, ECHEC_PERSISTANT, REGRESSION, PERFORMANCE)
+PROPOSEE = "PROPOSEE"
+MAX_TESTS_LISTES = 10
+
+INSERT_BATCH = 5000
+
+
+# ================= CHARGEMENT =================
+@dataclass
+class Historique:
+    """Exécutions triées par (test, date) ; une entrée par exécution au verdict connu."""
+    test_id: np.ndarray  # int64
+    date: np.ndarray  # secondes depuis l'epoch (UTC naïf)
+    echec: np.ndarray  # bool
+    duree: np.ndarray  # float64, NaN si inconnue
+
+    def __len__(self):
+        return len(self.test_id)
+
+
+def _epoch(connection, column):
+    if connection.dialect.name == "postgresql":
+        return cast(func.extract("epoch", column), Float)
+    return (func.julianday(column) - 2440587.5) * 86400.0  # SQLite
+
+
+def _code_echec():
+    verdict = func.coalesce(ResultatTest.statut, ExecutionTest.statut)
+    return case((sql_est_echoue(verdict), 1), (sql_est_reussi(verdict), 0), else_=None)
+
+
+def load_history(connection, test_ids=None, chunk_size: int = STATS_CHUNK_SIZE) -> Historique:
+    """Historique en colonnes ; `test_ids` : liste ou sous-requête restreignant les tests."""
+    code = _code_echec()
+    query = (
+        select(ExecutionTest.test_id, _epoch(connection, ExecutionTest.dateExecution), code,
+               ExecutionTest.dureeExecution)
+        .select_from(ExecutionTest)
+        .outerjoin(ResultatTest, ResultatTest.execution_id == ExecutionTest.id)
+        .where(ExecutionTest.test_id.is_not(None), ExecutionTest.dateExecution.is_not(None), code.is_not(None))
+        .order_by(ExecutionTest.test_id, ExecutionTest.dateExecution, ExecutionTest.id)
+    )
+    if test_ids is not None:
+        query = query.where(ExecutionTest.test_id.in_(test_ids))
+
+    result = connection.execute(query, execution_options={"stream_results": True, "yield_per": chunk_size})
+    columns = [[] for _ in range(4)]
+    for rows in result.partitions():
+        # Transposé en colonnes avant conversion : bien plus rapide que np.array sur des Row
+        for column, values in zip(columns, zip(*rows)):
+            column.append(np.array(values, dtype=np.float64))
+    test_id, date, echec, duree = (np.concatenate(column) if column else np.empty(0) for column in columns)
+    return Historique(test_id=test_id.astype(np.int64), date=date, echec=echec == 1, duree=duree)
+
+
+# ================= CALCUL PAR SEGMENTS =================
+def _sort_within_groups(groups: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """`values` triées par (groupe, valeur), `groups` étant déjà croissant."""
+    low = values.min()
+    span = values.max() - low + 1
+    if size * span < 2 ** 52:
+        # Un seul tri de la clé groupe × span + valeur : ~20× plus rapide que lexsort
+        return np.sort(groups * span + (values - low)) - groups * span + low
+    return values[np.lexsort((values, groups))]
+
+
+def segment_quantiles(groups: np.ndarray, values: np.ndarray, qs: tuple, size: int) -> list[np.ndarray]:
+    """Quantiles `qs` de `values` par groupe (groupes 0..size-1 croissants), NaN pour un groupe vide."""
+    counts = np.bincount(groups, minlength=size)
+    results = [np.full(size, np.nan) for _ in qs]
+    if not len(values):
+        return results
+    ordered = _sort_within_groups(groups, values, size)
+    present = counts > 0
+    base = (np.cumsum(counts) - counts)[present]
+    last = counts[present] - 1
+    for q, result in zip(qs, results):
+        position = q * last
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, last)
+        result[present] = ordered[base + low] + (position - low) * (ordered[base + high] - ordered[base + low])
+    return results
+
+
+def segment_stats(echec: np.ndarray, duree: np.ndarray, date: np.ndarray, counts: np.ndarray,
+                  recent_window: int = STATS_RECENT_WINDOW) -> dict[str, np.ndarray]:
+    """Indicateurs de segments contigus (ordre chronologique, `counts` > 0) ; un tableau par colonne."""
+    size, total = len(counts), len(echec)
+    if not size:
+        return {}
+    groups = np.repeat(np.arange(size), counts)
+    starts = np.cumsum(counts) - counts
+    ends = starts + counts
+    fail = echec.astype(np.float64)
+
+    echecs = np.bincount(groups, weights=fail, minlength=size)
+    taux_echec = echecs / counts
+
+    # Bascules : verdict différent de l'exécution précédente du même segment
+    same_segment = groups[1:] == groups[:-1]
+    changed = echec[1:] != echec[:-1]
+    bascules = np.bincount(groups[1:][same_segment & changed], minlength=size)
+    taux_bascule = bascules / np.maximum(counts - 1, 1)
+
+    # Séries : plages de verdicts identiques
+    run_start = np.ones(total, dtype=bool)
+    run_start[1:] = ~same_segment | changed
+    run_id = np.cumsum(run_start) - 1
+    run_length = np.bincount(run_id)
+    run_failed = echec[run_start]
+    run_group = groups[run_start]
+    serie_max = np.zeros(size, dtype=np.int64)
+    np.maximum.at(serie_max, run_group[run_failed], run_length[run_failed])
+    last_run = run_id[ends - 1]
+    serie_courante = np.where(run_failed[last_run], run_length[last_run], 0)
+
+    # Fenêtre récente : les `recent_window` dernières exécutions de chaque segment
+    recent = (ends[groups] - np.arange(total)) <= recent_window
+    recent_counts = np.minimum(counts, recent_window)
+    echecs_recents = np.bincount(groups[recent], weights=fail[recent], minlength=size)
+    older_counts = counts - recent_counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        older_rate = (echecs - echecs_recents) / older_counts
+    regression_echec = (older_counts >= STATS_MIN_EXECUTIONS) & (
+        echecs_recents / recent_counts - older_rate >= STATS_FAILURE_REGRESSION)
+
+    # Durées
+    known = ~np.isnan(duree)
+    known_counts = np.bincount(groups[known], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        moyenne = np.bincount(groups[known], weights=duree[known], minlength=size) / known_counts
+    p50, p95 = segment_quantiles(groups[known], duree[known], (0.5, 0.95), size)
+    recent_known, older_known = known & recent, known & ~recent
+    median_recent, = segment_quantiles(groups[recent_known], duree[recent_known], (0.5,), size)
+    median_older, = segment_quantiles(groups[older_known], duree[older_known], (0.5,), size)
+    with np.errstate(invalid="ignore"):
+        regression_duree = (
+            (np.bincount(groups[older_known], minlength=size) >= STATS_MIN_EXECUTIONS)
+            & (median_recent > median_older * STATS_DURATION_REGRESSION)
+        )
+
+    return {
+        "nombreExecutions": counts,
+        "nombreEchecs": echecs.astype(np.int64),
+        "tauxEchec": taux_echec,
+        "tauxBascule": taux_bascule,
+        "scoreInstabilite": taux_bascule * 4 * taux_echec * (1 - taux_echec),
+        "serieEchecsMax": serie_max,
+        "serieEchecsCourante": serie_courante,
+        "echecsRecents": echecs_recents.astype(np.int64),
+        "dureeMoyenne": moyenne,
+        "dureeP50": p50,
+        "dureeP95": p95,
+        "regressionEchec": regression_echec,
+        "regressionDuree": regression_duree,
+        "derniereExecution": date[ends - 1],
+    }
+
+
+def test_segments(historique: Historique) -> tuple[np.ndarray, np.ndarray]:
+    """(test_id, nombre d'exécutions) de chaque test présent dans l'historique."""
+    if not len(historique):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    boundaries = np.flatnonzero(np.diff(historique.test_id)) + 1
+    starts = np.concatenate(([0], boundaries))
+    counts = np.diff(np.concatenate((starts, [len(historique)])))
+    return historique.test_id[starts], counts
+
+
+def sprint_segments(historique: Historique, pair_tests: np.ndarray, debuts: np.ndarray,
+                    fins: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Découpe l'historique par couple (test, fenêtre [début, fin]).
+
+    Renvoie (indices des couples non vides, nombre d'exécutions par couple, indices des lignes
+    de l'historique dans l'ordre des segments). Les fenêtres sont cherchées par dichotomie sur
+    une clé composite entière rang(test) × M + seconde, croissante dans l'historique trié.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if not len(historique) or not len(pair_tests):
+        return empty, empty, empty
+    tests, counts = test_segments(historique)
+    seconds = np.floor(historique.date).astype(np.int64)
+    origin = seconds.min()
+    span = int(seconds.max() - origin) + 2
+    key = np.repeat(np.arange(len(tests)), counts) * span + (seconds - origin)
+
+    rank = np.searchsorted(tests, pair_tests)
+    present = rank < len(tests)
+    present[present] = tests[rank[present]] == pair_tests[present]
+    rank = np.where(present, rank, 0)
+
+    # Bornes NaN (date de sprint absente) : fenêtre ouverte
+    low = np.clip(np.nan_to_num(np.floor(debuts) - origin, nan=-np.inf), 0, span - 1).astype(np.int64)
+    high = np.clip(np.nan_to_num(np.floor(fins) - origin, nan=np.inf), -1, span - 1).astype(np.int64)
+    first = np.searchsorted(key, rank * span + low, side="left")
+    last = np.searchsorted(key, rank * span + high, side="right")
+    lengths = np.where(present, np.maximum(last - first, 0), 0)
+
+    kept = np.flatnonzero(lengths)
+    lengths, first = lengths[kept], first[kept]
+    offsets = np.cumsum(lengths) - lengths
+    rows = np.repeat(first - offsets, lengths) + np.arange(lengths.sum())
+    return kept, lengths, rows
+
+
+def load_sprint_windows(connection, sprint_ids=None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(test_id, sprint_id, début, fin) de chaque couple test × sprint ; bornes en secondes, NaN si absentes."""
+    pairs = test_sprint_pairs().subquery()
+    query = (
+        select(pairs.c.test_id, pairs.c.sprint_id, _epoch(connection, Sprint.dateDebut),
+               _epoch(connection, Sprint.dateFin))
+        .join(Sprint, Sprint.id == pairs.c.sprint_id)
+        .order_by(pairs.c.test_id, pairs.c.sprint_id)
+    )
+    if sprint_ids is not None:
+        query = query.where(pairs.c.sprint_id.in_(sprint_ids))
+    data = np.array(connection.execute(query).all(), dtype=np.float64).reshape(-1, 4)
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2], data[:, 3]
+
+
+# ================= PERSISTANCE =================
+def _to_datetime(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _rows(stats: dict[str, np.ndarray], test_ids: np.ndarray, sprint_ids, now: datetime) -> list[dict]:
+    columns = {}
+    for name, values in stats.items():
+        if name == "derniereExecution":
+            columns[name] = [_to_datetime(value) for value in values.tolist()]
+        elif values.dtype.kind == "f":
+            columns[name] = [None if value != value else value for value in values.tolist()]  # NaN -> NULL
+        else:
+            columns[name] = values.tolist()
+    columns["testId"] = test_ids.tolist()
+    columns["sprintId"] = sprint_ids.tolist() if sprint_ids is not None else [None] * len(test_ids)
+    names = list(columns)
+    return [{"dateCalcul": now, **dict(zip(names, values))} for values in zip(*columns.values())]
+
+
+def _insert(connection, rows: list[dict]):
+    for offset in range(0, len(rows), INSERT_BATCH):
+        connection.execute(insert(StatistiqueTest), rows[offset:offset + INSERT_BATCH])
+
+
+# ================= RECOMMANDATIONS =================
+def _pourcentage(part, total) -> float:
+    return round(100.0 * part / total, 1) if total else 0.0
+
+
+def _ligne(nom, test_id, detail) -> str:
+    return f"- {nom or 'Test'} (#{test_id}) : {detail}"
+
+
+def build_recommendations(sprint_stats: dict[str, np.ndarray], tests: np.ndarray, noms: dict[int, str]) -> list[dict]:
+    """Recommandations d'un sprint à partir des statistiques de ses tests."""
+    executions = sprint_stats["nombreExecutions"]
+    echecs = sprint_stats["nombreEchecs"]
+    total_echecs = int(echecs.sum())
+    recommandations = []
+
+    def lister(mask, order, detail):
+        indexes = np.flatnonzero(mask)
+        indexes = indexes[np.argsort(-order[indexes], kind="stable")][:MAX_TESTS_LISTES]
+        lignes = [_ligne(noms.get(int(tests[i])), int(tests[i]), detail(i)) for i in indexes]
+        reste = int(mask.sum()) - len(indexes)
+        if reste > 0:
+            lignes.append(f"- … et {reste} autre(s)")
+        return "\n".join(lignes)
+
+    score = sprint_stats["scoreInstabilite"]
+    instables = (executions >= STATS_MIN_EXECUTIONS) & (score >= STATS_FLAKY_THRESHOLD)
+    if instables.any():
+        recommandations.append({
+            "titre": f"Stabiliser {int(instables.sum())} test(s) instable(s)",
+            "description": "Verdicts alternant sans changement identifié ; isoler la cause (données, "
+                           "ordre d'exécution, attentes asynchrones) ou mettre en quarantaine.\n" + lister(
+                instables, score, lambda i: f"score {score[i]:.2f}, "
+                                            f"{sprint_stats['tauxBascule'][i]:.0%} de bascules, "
+                                            f"{sprint_stats['tauxEchec'][i]:.0%} d'échecs"),
+            "categorie": INSTABILITE,
+            "priorite": "HAUTE" if score[instables].max() >= 2 * STATS_FLAKY_THRESHOLD else "MOYENNE",
+            "impact": _pourcentage(int(echecs[instables].sum()), total_echecs),
+        })
+
+    serie = sprint_stats["serieEchecsCourante"]
+    persistants = serie >= STATS_STREAK_THRESHOLD
+    if persistants.any():
+        recommandations.append({
+            "titre": f"Corriger {int(persistants.sum())} test(s) en échec continu",
+            "description": "Échecs consécutifs jusqu'à la dernière exécution.\n" + lister(
+                persistants, serie, lambda i: f"{serie[i]} échecs consécutifs"),
+            "categorie": ECHEC_PERSISTANT,
+            "priorite": "CRITIQUE",
+            "impact": _pourcentage(int(persistants.sum()), len(tests)),
+        })
+
+    recents = sprint_stats["echecsRecents"]
+    regressions = sprint_stats["regressionEchec"] & ~persistants
+    if regressions.any():
+        recommandations.append({
+            "titre": f"Analyser {int(regressions.sum())} test(s) en régression",
+            "description": f"Taux d'échec en hausse sur les {STATS_RECENT_WINDOW} dernières exécutions.\n" + lister(
+                regressions, recents, lambda i: f"{recents[i]} échec(s) récent(s), "
+                                                f"{sprint_stats['tauxEchec'][i]:.0%} sur la période"),
+            "categorie": REGRESSION,
+            "priorite": "HAUTE",
+            "impact": _pourcentage(int(echecs[regressions].sum()), total_echecs),
+        })
+
+    p95 = np.nan_to_num(sprint_stats["dureeP95"])
+    lents = sprint_stats["regressionDuree"]
+    if lents.any():
+        recommandations.append({
+            "titre": f"Examiner {int(lents.sum())} test(s) ralenti(s)",
+            "description": f"Durée médiane récente supérieure à {STATS_DURATION_REGRESSION:g}× la médiane "
+                           "antérieure.\n" + lister(
+                lents, p95, lambda i: f"médiane {sprint_stats['dureeP50'][i]:.0f} s, p95 {p95[i]:.0f} s"),
+            "categorie": PERFORMANCE,
+            "priorite": "MOYENNE",
+            "impact": _pourcentage(int(lents.sum()), len(tests)),
+        })
+    return recommandations
+
+
+def _replace_recommendations(connection, sprint_ids: list[int], par_sprint: dict[int, list[dict]]) -> int:
+    if sprint_ids:
+        connection.execute(
+            delete(RecommandationQualite)
+            .where(RecommandationQualite.rapportId.in_(select(RapportQA.id).where(RapportQA.sprintId.in_(sprint_ids))))
+            .where(RecommandationQualite.categorie.in_(CATEGORIES))
+            .where(RecommandationQualite.statut == PROPOSEE)
+        )
+    par_sprint = {sprint_id: recs for sprint_id, recs in par_sprint.items() if recs}
+    invalidate_snapshots(connection, {*sprint_ids, *par_sprint})
+    if not par_sprint:
+        return 0
+    rapports = ensure_rapports(connection, list(par_sprint))
+    rows = [
+        {**rec, "statut": PROPOSEE, "rapportId": rapports[sprint_id]}
+        for sprint_id, recs in par_sprint.items() for rec in recs
+    ]
+    connection.execute(insert(RecommandationQualite), rows)
+    return len(rows)
+
+
+# ================= POINT D'ENTRÉE =================
+def _take(stats: dict[str, np.ndarray], indexes) -> dict[str, np.ndarray]:
+    return {name: values[indexes] for name, values in stats.items()}
+
+
+def compute_statistics(connection, sprint_ids=None, now: datetime | None = None) -> dict:
+    """Recalcule statistique_test (tous les tests, ou ceux des sprints donnés) et les recommandations.
+
+    Ne commit pas ; renvoie volumes et durées par phase.
+    """
+    now = now or datetime.utcnow()
+    timings = {}
+    started = time.perf_counter()
+
+    tests_scope = None
+    if sprint_ids is not None:
+        pairs = test_sprint_pairs().subquery()
+        tests_scope = select(pairs.c.test_id).where(pairs.c.sprint_id.in_(sprint_ids))
+    historique = load_history(connection, tests_scope)
+    pair_tests, pair_sprints, debuts, fins = load_sprint_windows(connection, sprint_ids)
+    timings["chargement"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    tests, counts = test_segments(historique)
+    globales = segment_stats(historique.echec, historique.duree, historique.date, counts)
+    kept, lengths, rows = sprint_segments(historique, pair_tests, debuts, fins)
+    par_couple = segment_stats(historique.echec[rows], historique.duree[rows], historique.date[rows], lengths)
+    kept_tests, kept_sprints = pair_tests[kept], pair_sprints[kept]
+    timings["calcul"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if sprint_ids is None:
+        connection.execute(delete(StatistiqueTest))
+    else:
+        connection.execute(delete(StatistiqueTest).where(or_(
+            StatistiqueTest.sprintId.in_(sprint_ids),
+            and_(StatistiqueTest.sprintId.is_(None), StatistiqueTest.testId.in_(tests_scope)),
+        )))
+    lignes = _rows(globales, tests, None, now) + _rows(par_couple, kept_tests, kept_sprints, now)
+    _insert(connection, lignes)
+
+    # Recommandations : une passe par sprint sur les couples triés par sprint
+    sprints_calcules = sorted(set(sprint_ids) if sprint_ids is not None else set(pair_sprints.tolist()))
+    par_sprint = {}
+    if len(kept):
+        order = np.argsort(kept_sprints, kind="stable")
+        ordered_sprints = kept_sprints[order]
+        bounds = np.flatnonzero(np.diff(ordered_sprints)) + 1
+        groups = np.split(order, bounds)
+        # Noms chargés uniquement pour les tests susceptibles d'être cités
+        signales = (
+            (par_couple["nombreExecutions"] >= STATS_MIN_EXECUTIONS) & (par_couple["scoreInstabilite"] >= STATS_FLAKY_THRESHOLD)
+            | (par_couple["serieEchecsCourante"] >= STATS_STREAK_THRESHOLD)
+            | par_couple["regressionEchec"] | par_couple["regressionDuree"]
+        )
+        candidates = set(kept_tests[signales].tolist())
+        noms = dict(connection.execute(select(Test.id, Test.nom).where(Test.id.in_(candidates))).all()) if candidates else {}
+        for indexes in groups:
+            sprint_id = int(kept_sprints[indexes[0]])
+            par_sprint[sprint_id] = build_recommendations(_take(par_couple, indexes), kept_tests[indexes], noms)
+    recommandations = _replace_recommendations(connection, sprints_calcules, par_sprint)
+    timings["ecriture"] = time.perf_counter() - started
+
+    return {
+        "executions": len(historique),
+        "tests": len(tests),
+        "couples_test_sprint": len(kept),
+        "lignes": len(lignes),
+        "recommandations": recommandations,
+        "secondes": {phase: round(seconds, 3) for phase, seconds in timings.items()},
+    }
+
+
+# ================= LECTURE =================
+COLONNES = [column for column in StatistiqueTest.__table__.c if column.name != "id"]
+
+
+def test_statistics(connection, test_id: int) -> list[dict]:
+    """Lignes d'un test : historique complet (sprintId NULL) puis une ligne par sprint."""
+    rows = connection.execute(
+        select(*COLONNES).where(StatistiqueTest.testId == test_id)
+        .order_by(StatistiqueTest.sprintId.is_not(None), StatistiqueTest.sprintId)
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def sprint_statistics(connection, sprint_id: int, tri: str = "scoreInstabilite", limit: int = 50) -> list[dict]:
+    column = StatistiqueTest.__table__.c[tri]
+    rows = connection.execute(
+        select(*COLONNES, Test.nom)
+        .join(Test, Test.id == StatistiqueTest.testId)
+        .where(StatistiqueTest.sprintId == sprint_id)
+        .order_by(column.desc().nulls_last(), StatistiqueTest.testId)
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,60 @@
+from sqlalchemy import func
+
+# Vocabulaire accepté pour les statuts saisis par les outils de CI et les testeurs, comparé
+# après normalisation (« échoué », « Réussi », « succès » y compris) : ASCII uniquement
+STATUTS_REUSSIS = frozenset({"REUSSI", "PASSED", "PASS", "SUCCESS", "SUCCES", "OK"})
+STATUTS_ECHOUES = frozenset({"ECHOUE", "FAILED", "FAIL", "FAILURE", "ERROR", "ERREUR", "KO"})
+SEVERITES_CRITIQUES = frozenset({"CRITIQUE", "CRITICAL", "BLOQUANTE", "BLOCKER"})
+
+REUSSI = "REUSSI"
+ECHOUE = "ECHOUE"
+
+
+# Accents repliés avant la mise en majuscules : upper() de SQLite ne traite que l'ASCII
+ACCENTS = (("é", "E"), ("è", "E"), ("ê", "E"), ("É", "E"), ("È", "E"), ("Ê", "E"))
+
+
+def normaliser(valeur: str | None) -> str:
+    """Même résultat que `sql_normaliser` pour toute valeur du vocabulaire, sur toute base.
+
+    trim() SQL n'enlève que les espaces, upper() de SQLite ne touche pas au non-ASCII : une
+    valeur qui reste non ASCII après repli des accents n'est pas mise en majuscules (elle ne
+    peut de toute façon pas appartenir au vocabulaire).
+    """
+    valeur = (valeur or "").strip(" ")
+    for accent, lettre in ACCENTS:
+        valeur = valeur.replace(accent, lettre)
+    return valeur.upper() if valeur.isascii() else valeur
+
+
+def classer_statut(statut: str | None) -> str | None:
+    """REUSSI, ECHOUE ou None (statut en cours / inconnu)."""
+    valeur = normaliser(statut)
+    if valeur in STATUTS_REUSSIS:
+        return REUSSI
+    if valeur in STATUTS_ECHOUES:
+        return ECHOUE
+    return None
+
+
+def est_critique(severite: str | None) -> bool:
+    return normaliser(severite) in SEVERITES_CRITIQUES
+
+
+# Équivalents SQL, pour les agrégations faites en base
+def sql_normaliser(column):
+    for accent, lettre in ACCENTS:
+        column = func.replace(column, accent, lettre)
+    return func.upper(func.trim(column))
+
+
+def sql_est_reussi(column):
+    return sql_normaliser(column).in_(STATUTS_REUSSIS)
+
+
+def sql_est_echoue(column):
+    return sql_normaliser(column).in_(STATUTS_ECHOUES)
+
+
+def sql_est_critique(column):
+    return sql_normaliser(column).in_(SEVERITES_CRITIQUES)
@@ -0,0 +1,318 @@
+"""Instantanés de tableau de bord par sprint, servis avec ETag.
+
+Le tableau de bord d'un sprint assemble le sprint, ses user stories, la couverture de tests,
+les compteurs d'exécution du RapportQA, les anomalies ouvertes, les indicateurs et les
+recommandations : une douzaine de requêtes. Le résultat est sérialisé une fois et rangé
+dans tableau_bord_sprint avec son SHA-256, qui sert d'ETag fort.
+
+Fraîcheur : toute transaction qui modifie une donnée d'un sprint incrémente
+`generation` de sa ligne (hook ORM ci-dessous, `aggregate_new_executions` pour les
+insertions en masse, recalcul des recommandations). L'instantané est à jour tant que
+`generationContenu == generation`. Un recalcul lit la génération avant ses requêtes et
+n'enregistre son résultat que si elle n'a pas bougé entre-temps : une modification
+concurrente ne peut pas être masquée par un instantané calculé juste avant elle.
+
+Une vue répétée coûte une lecture de clé primaire et une comparaison d'ETag (304).
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from sqlalchemy import case, distinct, event, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.associations import sprint_userstory
+from models.anomalie import Anomalie
+from models.execution import ExecutionTest, ResultatTest
+from models.rapports import IndicateurQualite, RapportQA, RecommandationQualite, TableauDeBordSprint
+from models.scrum import Sprint, UserStory
+from models.tests import CahierDeTests, Test
+from services.scope import test_sprint_pairs
+from services.statuts import sql_est_critique
+
+DERNIERES_ANOMALIES = 10
+RECOMMANDATIONS = 5
+_DELETED_SPRINTS_KEY = "tableau_bord_sprints_supprimes"
+
+
+class SnapshotStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.served = 0
+        self.rebuilds = 0
+        self.discarded = 0
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict:
+        return {"not_modified": self.not_modified, "served": self.served,
+                "rebuilds": self.rebuilds, "discarded": self.discarded}
+
+
+snapshot_stats = SnapshotStats()
+
+
+# ================= CONSTRUCTION =================
+def build_dashboard(connection, sprint_id: int) -> dict | None:
+    sprint = connection.execute(
+        select(Sprint.id, Sprint.nom, Sprint.statut, Sprint.dateDebut, Sprint.dateFin, Sprint.objectifSprint,
+               Sprint.capaciteEquipe, Sprint.velocite, Sprint.projet_id)
+        .where(Sprint.id == sprint_id)
+    ).mappings().first()
+    if sprint is None:
+        return None
+
+    stories = connection.execute(
+        select(UserStory.statut, func.count(UserStory.id), func.coalesce(func.sum(UserStory.points), 0))
+        .join(sprint_userstory, sprint_userstory.c.userstory_id == UserStory.id)
+        .where(sprint_userstory.c.sprint_id == sprint_id)
+        .group_by(UserStory.statut)
+    ).all()
+
+    cahiers = connection.execute(
+        select(func.count(CahierDeTests.id), func.coalesce(func.sum(CahierDeTests.nombreTests), 0))
+        .join(sprint_userstory, sprint_userstory.c.userstory_id == CahierDeTests.userstory_id)
+        .where(sprint_userstory.c.sprint_id == sprint_id)
+    ).one()
+    pairs = test_sprint_pairs().where(sprint_userstory.c.sprint_id == sprint_id).subquery()
+    tests, tests_executes, derniere_execution = connection.execute(
+        select(func.count(distinct(pairs.c.test_id)), func.count(distinct(ExecutionTest.test_id)),
+               func.max(ExecutionTest.dateExecution))
+        .select_from(pairs)
+        .outerjoin(ExecutionTest, ExecutionTest.test_id == pairs.c.test_id)
+    ).one()
+
+    rapport = connection.execute(
+        select(RapportQA.id, RapportQA.statut, RapportQA.dateGeneration, RapportQA.tauxReussite,
+               RapportQA.nombreTestsExecutes, RapportQA.nombreTestsReussis, RapportQA.nombreTestsEchoues,
+               IndicateurQualite.tauxCouverture, IndicateurQualite.nombreAnomalies,
+               IndicateurQualite.nombreAnomaliesCritiques, IndicateurQualite.indiceQualite,
+               IndicateurQualite.tendance)
+        .outerjoin(IndicateurQualite, IndicateurQualite.rapportId == RapportQA.id)
+        .where(RapportQA.sprintId == sprint_id)
+        .order_by(RapportQA.id)
+        .limit(1)
+    ).mappings().first()
+
+    ouvertes = (
+        select(Anomalie.id, Anomalie.titre, Anomalie.severite, Anomalie.statut, Anomalie.dateCreation,
+               Anomalie.assignedTo)
+        .join(ResultatTest, ResultatTest.id == Anomalie.resultat_id)
+        .join(ExecutionTest, ExecutionTest.id == ResultatTest.execution_id)
+        .where(ExecutionTest.test_id.in_(select(pairs.c.test_id)), Anomalie.dateResolution.is_(None))
+    ).subquery()
+    par_severite = connection.execute(
+        select(ouvertes.c.severite, func.count(), func.sum(case((sql_est_critique(ouvertes.c.severite), 1), else_=0)))
+        .group_by(ouvertes.c.severite)
+    ).all()
+    dernieres = connection.execute(
+        select(ouvertes).order_by(ouvertes.c.dateCreation.desc(), ouvertes.c.id.desc()).limit(DERNIERES_ANOMALIES)
+    ).mappings().all()
+
+    recommandations = []
+    if rapport is not None:
+        recommandations = connection.execute(
+            select(RecommandationQualite.id, RecommandationQualite.titre, RecommandationQualite.categorie,
+                   RecommandationQualite.priorite, RecommandationQualite.impact, RecommandationQualite.statut)
+            .where(RecommandationQualite.rapportId == rapport["id"])
+            .order_by(RecommandationQualite.impact.desc(), RecommandationQualite.id)
+            .limit(RECOMMANDATIONS)
+        ).mappings().all()
+
+    return {
+        "sprint": dict(sprint),
+        "userstories": {
+            "total": sum(count for _, count, _ in stories),
+            "points": sum(points for _, _, points in stories),
+            "parStatut": {statut or "INCONNU": {"nombre": count, "points": points} for statut, count, points in stories},
+        },
+        "couverture": {
+            "userstoriesAvecCahier": cahiers[0],
+            "testsPrevus": cahiers[1],
+            "tests": tests,
+            "testsExecutes": tests_executes,
+            "tauxExecution": round(tests_executes / tests, 4) if tests else None,
+        },
+        "executions": {
+            "executes": rapport["nombreTestsExecutes"] if rapport else 0,
+            "reussis": rapport["nombreTestsReussis"] if rapport else 0,
+            "echoues": rapport["nombreTestsEchoues"] if rapport else 0,
+            "tauxReussite": rapport["tauxReussite"] if rapport else None,
+            "derniereExecution": derniere_execution,
+        },
+        "anomaliesOuvertes": {
+            "total": sum(count for _, count, _ in par_severite),
+            "critiques": sum(critiques or 0 for _, _, critiques in par_severite),
+            "parSeverite": {severite or "INCONNUE": count for severite, count, _ in par_severite},
+            "dernieres": [dict(row) for row in dernieres],
+        },
+        "rapport": dict(rapport) if rapport else None,
+        "recommandations": [dict(row) for row in recommandations],
+    }
+
+
+def serialize(dashboard: dict) -> tuple[bytes, str]:
+    content = json.dumps(dashboard, default=str, ensure_ascii=False, sort_keys=True,
+                         separators=(",", ":")).encode("utf-8")
+    return content, hashlib.sha256(content).hexdigest()
+
+
+# ================= INSTANTANÉS =================
+def _ensure_row(db: Session, sprint_id: int):
+    # Ligne créée (et validée) avant le calcul : une modification concurrente a dès lors
+    # une génération à incrémenter
+    try:
+        db.execute(TableauDeBordSprint.__table__.insert().values(sprintId=sprint_id, generation=0,
+                                                                 generationContenu=-1, version=0))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # créée en même temps par une autre requête
+
+
+def current_etag(db: Session, sprint_id: int) -> str | None:
+    """ETag de l'instantané s'il est à jour, sans charger le contenu."""
+    return db.scalar(
+        select(TableauDeBordSprint.etag)
+        .where(TableauDeBordSprint.sprintId == sprint_id,
+               TableauDeBordSprint.generationContenu == TableauDeBordSprint.generation)
+    )
+
+
+def get_snapshot(db: Session, sprint_id: int) -> tuple[bytes, str] | None:
+    """(contenu, etag) à jour, recalculé au besoin ; None si le sprint n'existe pas."""
+    table = TableauDeBordSprint.__table__
+    row = db.execute(
+        select(table.c.generation, table.c.generationContenu, table.c.contenu, table.c.etag)
+        .where(table.c.sprintId == sprint_id)
+    ).first()
+    if row is not None and row.generationContenu == row.generation:
+        snapshot_stats.count("served")
+        return row.contenu, row.etag
+
+    if row is None:
+        if db.scalar(select(Sprint.id).where(Sprint.id == sprint_id)) is None:
+            return None
+        _ensure_row(db, sprint_id)
+    generation = db.scalar(select(table.c.generation).where(table.c.sprintId == sprint_id))
+    db.commit()  # nouvelle transaction : le calcul voit tout ce qui est validé après cette lecture
+
+    dashboard = build_dashboard(db.connection(), sprint_id)
+    if dashboard is None:
+        db.rollback()
+        return None
+    content, etag = serialize(dashboard)
+    stored = db.execute(
+        update(table)
+        .where(table.c.sprintId == sprint_id, table.c.generation == generation)
+        .values(generationContenu=generation, contenu=content, etag=etag,
+                version=table.c.version + 1, dateCalcul=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    snapshot_stats.count("rebuilds" if stored else "discarded")
+    return content, etag
+
+
+def invalidate_snapshots(connection, sprint_ids):
+    """À appeler dans la transaction qui modifie les données des sprints."""
+    sprint_ids = sorted({sprint_id for sprint_id in sprint_ids if sprint_id is not None})
+    if sprint_ids:
+        table = TableauDeBordSprint.__table__
+        connection.execute(
+            update(table).where(table.c.sprintId.in_(sprint_ids)).values(generation=table.c.generation + 1)
+        )
+
+
+# ================= ORM HOOK =================
+def _values(obj, attribute: str) -> set:
+    """Valeurs actuelle et précédente d'une colonne, sans chargement pendant le flush."""
+    history = inspect(obj).attrs[attribute].history
+    values = {*history.added, *history.unchanged, *history.deleted}
+    if not values and attribute in obj.__dict__:
+        values.add(obj.__dict__[attribute])
+    values.discard(None)
+    return values
+
+
+def _sprints_of(connection, userstories: set, tests: set, executions: set, resultats: set, rapports: set) -> set:
+    """Sprints concernés, en remontant résultat -> exécution -> test -> user story."""
+    sprint_ids = set()
+    if resultats:
+        executions |= set(connection.scalars(
+            select(ResultatTest.execution_id).where(ResultatTest.id.in_(resultats))))
+    if executions:
+        tests |= set(connection.scalars(select(ExecutionTest.test_id).where(ExecutionTest.id.in_(executions))))
+    if tests:
+        pairs = test_sprint_pairs().subquery()
+        sprint_ids |= set(connection.scalars(select(pairs.c.sprint_id).where(pairs.c.test_id.in_(tests))))
+    if userstories:
+        sprint_ids |= set(connection.scalars(
+            select(sprint_userstory.c.sprint_id).where(sprint_userstory.c.userstory_id.in_(userstories))))
+    if rapports:
+        sprint_ids |= set(connection.scalars(select(RapportQA.sprintId).where(RapportQA.id.in_(rapports))))
+    return sprint_ids
+
+
+def _collect(objects) -> tuple[set, tuple]:
+    """Sprints touchés directement, et entités à remonter jusqu'à leurs sprints."""
+    sprint_ids, userstories, cahiers, tests, executions, resultats, rapports = (set() for _ in range(7))
+    for obj in objects:
+        if isinstance(obj, TableauDeBordSprint):
+            continue
+        if isinstance(obj, Sprint):
+            sprint_ids.add(obj.id)
+        elif isinstance(obj, UserStory):
+            userstories.add(obj.id)
+            # Changement d'appartenance : l'ancien sprint est dans l'historique de la relation
+            history = inspect(obj).attrs.sprints.history
+            sprint_ids |= {sprint.id for sprint in (*history.added, *history.unchanged, *history.deleted)}
+        elif isinstance(obj, CahierDeTests):
+            userstories |= _values(obj, "userstory_id")
+        elif isinstance(obj, Test):
+            tests.add(obj.id)
+            userstories |= _values(obj, "userStoryId")
+            cahiers |= _values(obj, "cahier_id")
+        elif isinstance(obj, ExecutionTest):
+            executions.add(obj.id)
+            tests |= _values(obj, "test_id")
+        elif isinstance(obj, ResultatTest):
+            resultats.add(obj.id)
+            executions |= _values(obj, "execution_id")
+        elif isinstance(obj, Anomalie):
+            resultats |= _values(obj, "resultat_id")
+        elif isinstance(obj, RapportQA):
+            sprint_ids |= _values(obj, "sprintId")
+        elif isinstance(obj, (IndicateurQualite, RecommandationQualite)):
+            rapports |= _values(obj, "rapportId")
+    return sprint_ids, (userstories, cahiers, tests, executions, resultats, rapports)
+
+
+def _resolve(session, objects) -> set:
+    sprint_ids, (userstories, cahiers, tests, executions, resultats, rapports) = _collect(objects)
+    if userstories or cahiers or tests or executions or resultats or rapports:
+        connection = session.connection()
+        if cahiers:
+            userstories |= set(connection.scalars(
+                select(CahierDeTests.userstory_id).where(CahierDeTests.id.in_(cahiers))))
+        sprint_ids |= _sprints_of(connection, userstories - {None}, tests - {None}, executions - {None},
+                                  resultats - {None}, rapports)
+    return sprint_ids
+
+
+@event.listens_for(Session, "before_flush")
+def _sprints_of_deleted(session, flush_context, instances):
+    # Après le flush, les lignes supprimées (et leurs liens sprint_userstory) ont disparu :
+    # les sprints des objets supprimés se résolvent avant
+    session.info[_DELETED_SPRINTS_KEY] = _resolve(session, session.deleted) if session.deleted else set()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_sprints(session, flush_context):
+    sprint_ids = session.info.pop(_DELETED_SPRINTS_KEY, set())
+    sprint_ids |= _resolve(session, (*session.new, *session.dirty))
+    if sprint_ids:
+        invalidate_snapshots(session.connection(), sprint_ids)
@@ -0,0 +1,64 @@
+"""Fixtures communes : base SQLite jetable migrée à HEAD, jeu de données, client HTTP.
+
+La configuration est lue à l'import des modules de l'application : les variables
+d'environnement sont donc fixées ici, avant tout import de `db` ou `main`.
+
+    cd plateforme-back && python -m pytest -q
+"""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'tests.db')}"
+os.environ["LOG_STORE_DIR"] = os.path.join(_TMP, "logs")
+os.environ["SCREENSHOT_STORE_DIR"] = os.path.join(_TMP, "captures")
+os.environ["REPLICA_DATABASE_URL"] = ""
+os.environ["METRICS_ENABLED"] = "0"
+os.environ["QUERY_DIAGNOSTICS"] = "off"
+os.environ["LOG_PARTITIONING"] = "0"
+
+import pytest  # noqa: E402
+
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def engine():
+    import models  # noqa: F401  (enregistre toutes les tables)
+    from db.database import engine
+    from db.schema import migrate
+
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def dataset(engine):
+    return seed_dataset(engine, DatasetSize().scaled(0.1))
+
+
+@pytest.fixture
+def db(engine):
+    from db.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client(dataset):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client, dataset):
+    response = client.post("/auth/sign_in", data={"username": dataset["users"][0]["email"],
+                                                  "password": dataset["password"]})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
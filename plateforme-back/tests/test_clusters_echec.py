@@ -0,0 +1,43 @@
+import warnings
+
+from sqlalchemy import create_engine, insert, inspect
+from sqlalchemy.exc import SAWarning
+
+from db.database import Base
+from db.schema import migrate
+from models.execution import ClusterEchec
+from services.clusters_echec import FailureIndex, fingerprint, minhash, normalize
+
+
+def test_schema_cycle_anomalie_cluster_sorts_without_warning(tmp_path):
+    # anomalie -> resultat_test -> cluster_echec -> anomalie : cassé par use_alter
+    engine = create_engine(f"sqlite:///{tmp_path / 'cycle.db'}")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SAWarning)
+        Base.metadata.create_all(engine)
+        foreign_keys = inspect(engine).get_foreign_keys("cluster_echec")
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+    assert [fk["name"] for fk in foreign_keys if fk["referred_table"] == "anomalie"] == ["fk_cluster_echec_anomalie"]
+
+
+def test_refresh_loads_clusters_committed_before_a_locally_added_one(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'clusters.db'}")
+    migrate(engine)
+    index = FailureIndex()
+    messages = {1: "connection refused by db host", 2: "assertion failed: expected 200 got 500 on login page"}
+    signatures = {cluster_id: minhash(normalize(message)) for cluster_id, message in messages.items()}
+    with engine.begin() as connection:
+        connection.execute(insert(ClusterEchec), [
+            {"id": cluster_id, "empreinte": fingerprint(normalize(message)), "messageNormalise": normalize(message),
+             "signature": signatures[cluster_id].tobytes(), "nombreResultats": 1}
+            for cluster_id, message in messages.items()
+        ])
+    # Cluster 2 indexé au commit de ce worker, cluster 1 créé par un autre worker, pas encore chargé
+    index.add(2, signatures[2], fingerprint(normalize(messages[2])))
+    with engine.connect() as connection:
+        index.refresh(connection)
+    engine.dispose()
+
+    assert index.query(signatures[1])[0] == 1
+    assert index.stats()["clusters"] == 2
@@ -0,0 +1,115 @@
+import sys
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import models
+from db.schema import migrate
+from models.execution import ExecutionTest, TacheExecution
+from services.file_execution import (ECHOUEE, EN_ATTENTE, EN_COURS, TERMINEE, TacheInvalide, claim, command_runner,
+                                     complete, enqueue, heartbeat, requeue_expired)
+
+
+@pytest.fixture
+def queue_engine(tmp_path):
+    """Base dédiée : `claim` prend toute tâche disponible."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'file.db'}")
+    migrate(engine)
+    with Session(engine) as session:
+        session.add_all([models.TestAutomatise(nom="Connexion", framework="playwright", outil="npx"),
+                         models.TestManuel(nom="Revue manuelle")])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def _test_ids(engine):
+    with engine.connect() as connection:
+        return dict(connection.execute(select(models.Test.type, models.Test.id)).all())
+
+
+def _statut(engine, tache_id):
+    with engine.connect() as connection:
+        return connection.execute(select(TacheExecution.statut, TacheExecution.executionId)
+                                  .where(TacheExecution.id == tache_id)).one()
+
+
+def test_enqueue_keeps_automated_tests_and_claims_by_priority(queue_engine):
+    ids = _test_ids(queue_engine)
+    with queue_engine.begin() as connection:
+        low = enqueue(connection, [ids["automatise"], ids["manuel"]])
+        high = enqueue(connection, [ids["automatise"]], priorite=10, parametres={"navigateur": "firefox"})
+    assert low["rejetes"] == [ids["manuel"]] and len(low["tache_ids"]) == 1
+
+    with queue_engine.begin() as connection:
+        [first] = claim(connection, "w1", 1)
+        [second] = claim(connection, "w2", 5)
+        assert claim(connection, "w3", 5) == []
+    assert first.id == high["tache_ids"][0] and first.parametres == {"navigateur": "firefox"}
+    assert first.framework == "playwright" and first.tentatives == 1
+    assert second.id == low["tache_ids"][0]
+
+
+def test_expired_lease_is_requeued_then_failed_when_attempts_are_exhausted(queue_engine):
+    ids = _test_ids(queue_engine)
+    with queue_engine.begin() as connection:
+        [tache_id] = enqueue(connection, [ids["automatise"]], max_tentatives=2)["tache_ids"]
+        [tache] = claim(connection, "w1", 1, lease_seconds=-1)
+        assert heartbeat(connection, "w2", [tache_id]) == set()
+        assert requeue_expired(connection) == {"remises_en_attente": 1, "echouees": 0}
+    assert _statut(queue_engine, tache_id).statut == EN_ATTENTE
+
+    with queue_engine.begin() as connection:
+        claim(connection, "w2", 1, lease_seconds=-1)
+        # Le premier worker a perdu son bail : plus de heartbeat possible
+        assert heartbeat(connection, "w1", [tache.id]) == set()
+        assert requeue_expired(connection) == {"remises_en_attente": 0, "echouees": 1}
+    assert _statut(queue_engine, tache_id).statut == ECHOUEE
+
+
+def test_complete_links_the_execution_in_the_same_transaction(queue_engine):
+    ids = _test_ids(queue_engine)
+    with queue_engine.begin() as connection:
+        enqueue(connection, [ids["automatise"]] * 2)
+        taches = claim(connection, "w1", 2)
+    outcome = {"statut": "PASSED", "dureeExecution": 2, "resultat": {"statut": "PASSED", "logs": "ok"}}
+
+    with Session(queue_engine) as db:
+        result = complete(db, "w1", taches[0], outcome)
+        assert complete(db, "autre", taches[1], outcome) is None
+    statut, execution_id = _statut(queue_engine, taches[0].id)
+    assert statut == TERMINEE and execution_id == result["execution_id"]
+    assert _statut(queue_engine, taches[1].id).statut == EN_COURS
+    with queue_engine.connect() as connection:
+        assert connection.scalar(select(ExecutionTest.test_id).where(ExecutionTest.id == execution_id)) == ids["automatise"]
+
+
+def test_command_runner_passes_each_parameter_as_one_argument(queue_engine):
+    ids = _test_ids(queue_engine)
+    with queue_engine.begin() as connection:
+        enqueue(connection, [ids["automatise"]], parametres={"grep": "connexion ok; echo"})
+        [tache] = claim(connection, "w1", 1)
+    check = "import sys; sys.exit(0 if sys.argv[1:] == ['connexion ok; echo', 'T{}'] else 1)".format(tache.test_id)
+    runner = command_runner(f'{sys.executable} -c "{check}" {{grep}} T{{test_id}}')
+
+    assert runner(tache)["statut"] == "PASSED"
+
+
+@pytest.mark.parametrize("valeur", ["--config=/etc/passwd", "-rf", -1])
+def test_command_runner_rejects_option_like_parameters(queue_engine, valeur):
+    ids = _test_ids(queue_engine)
+    with queue_engine.begin() as connection:
+        enqueue(connection, [ids["automatise"]], parametres={"grep": valeur})
+        [tache] = claim(connection, "w1", 1)
+    runner = command_runner(f"{sys.executable} -c pass {{grep}}")
+
+    with pytest.raises(TacheInvalide):
+        runner(tache)
+
+
+@pytest.mark.parametrize("priorite", [-101, 101, 10 ** 12])
+def test_enqueue_route_bounds_priority(client, auth_headers, dataset, priorite):
+    response = client.post("/taches", json={"test_ids": dataset["test_ids"][:1], "priorite": priorite},
+                           headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,69 @@
+import json
+import os
+
+from sqlalchemy import select
+
+import routes.executions
+from models.execution import ResultatTest
+from services.ingestion import ingest_chunk
+from services.log_store import LOG_INLINE_MAX_BYTES, collect_garbage, log_store
+
+
+def _item(test_id, **overrides):
+    return {"test_id": test_id, "statut": "FAILED", "dureeExecution": 3, "dateExecution": None,
+            "executeurId": None, "resultat": {"statut": "FAILED", "messageErreur": "assert 1 == 2", "logs": "ok"},
+            **overrides}
+
+
+def test_chunk_rejects_unknown_references_only(db, dataset):
+    test_id = dataset["test_ids"][0]
+    outcomes = ingest_chunk(db, [(0, _item(test_id)), (1, _item(10 ** 9)), (2, _item(test_id, executeurId=10 ** 9))])
+
+    assert outcomes[0]["execution_id"] and outcomes[0]["resultat_id"]
+    assert "introuvable" in outcomes[1]["error"]
+    assert "introuvable" in outcomes[2]["error"]
+
+
+def test_large_logs_go_to_the_store(db, dataset):
+    logs = "ligne de log\n" * (LOG_INLINE_MAX_BYTES // 10)
+    [outcome] = ingest_chunk(db, [(0, _item(dataset["test_ids"][0], resultat={"statut": "PASSED", "logs": logs}))])
+
+    row = db.execute(select(ResultatTest.logs, ResultatTest.logsHash, ResultatTest.logsTaille)
+                     .where(ResultatTest.id == outcome["resultat_id"])).one()
+    assert len(row.logs) < len(logs) and row.logsTaille == len(logs.encode())
+    assert log_store.read(row.logsHash).decode() == logs
+
+
+def test_bulk_ndjson(client, auth_headers, dataset):
+    body = "\n".join(json.dumps(_item(test_id)) for test_id in dataset["test_ids"][:3]) + "\nnot json\n"
+    response = client.post("/executions/bulk", content=body,
+                           headers={**auth_headers, "Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert (response.json()["inserted"], response.json()["errors"]) == (3, 1)
+
+
+def test_bulk_ndjson_line_too_long(client, auth_headers, dataset, monkeypatch):
+    monkeypatch.setattr(routes.executions, "INGEST_MAX_LINE_BYTES", 256)
+    line = json.dumps(_item(dataset["test_ids"][0], resultat={"logs": "x" * 1000}))
+    for body in (line, line + "\n"):  # ligne terminée ou non
+        response = client.post("/executions/bulk", content=body,
+                               headers={**auth_headers, "Content-Type": "application/x-ndjson"})
+        assert response.status_code == 413
+
+
+def test_gc_removes_orphan_blobs_only(engine, db, dataset):
+    # Blob d'un lot annulé : écrit dans le store, jamais référencé
+    orphan = log_store.put(os.urandom(64).hex().encode() * 100)
+    logs = "référencé\n" * LOG_INLINE_MAX_BYTES
+    [outcome] = ingest_chunk(db, [(0, _item(dataset["test_ids"][0], resultat={"logs": logs}))])
+    referenced = db.scalar(select(ResultatTest.logsHash).where(ResultatTest.id == outcome["resultat_id"]))
+
+    with engine.connect() as connection:
+        assert collect_garbage(connection, grace_seconds=3600)["supprimes"] == 0
+        dry = collect_garbage(connection, grace_seconds=0, dry_run=True)
+        assert dry["supprimes"] >= 1 and log_store.exists(orphan)
+        collect_garbage(connection, grace_seconds=0)
+
+    assert not log_store.exists(orphan)
+    assert log_store.exists(referenced)
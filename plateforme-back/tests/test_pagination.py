@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from db.pagination import InvalidCursor, decode_cursor, encode_cursor
+from models.execution import ExecutionTest
+
+
+def test_cursor_round_trip():
+    moment = datetime(2024, 5, 17, 13, 45, 12, 123456)
+    assert decode_cursor(encode_cursor(moment, 42)) == (moment, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "pas-un-curseur", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_walks_every_execution_once_in_order(client, auth_headers, db):
+    items, cursor = [], None
+    while True:
+        response = client.get("/executions", params={"limit": 37, "cursor": cursor}, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json()
+        items.extend(page["items"])
+        if not (cursor := page["next_cursor"]):
+            break
+
+    keys = [(item["dateExecution"], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=True)
+    assert len({item["id"] for item in items}) == len(items) == db.scalar(select(func.count(ExecutionTest.id)))
+
+
+def test_malformed_cursor_is_a_client_error(client, auth_headers):
+    response = client.get("/executions", params={"cursor": "%%%"}, headers=auth_headers)
+    assert response.status_code == 400
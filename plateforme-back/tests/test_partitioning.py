@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+
+from db.partitioning import SPECS, archive_closed_periods, keyset_page, list_partitions, partition_table
+from db.schema import _stamp, migrate
+from models.log_systems import AuditLog
+
+NOW = datetime(2024, 10, 15)
+AUDIT = SPECS["audit_log"]
+COLUMNS = ["id", "action", "timestamp"]
+
+
+@pytest.fixture
+def log_engine(tmp_path):
+    """Base dédiée : l'archivage vide la table de base partagée par les autres tests."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def _audit(connection, *timestamps):
+    connection.execute(insert(AuditLog), [{"action": f"A{i}", "timestamp": moment} for i, moment in enumerate(timestamps)])
+
+
+def _walk(connection, limit):
+    items, cursor = [], None
+    while True:
+        page = keyset_page(connection, AUDIT, COLUMNS, lambda t: (), cursor, limit)
+        items.extend(page.items)
+        if not (cursor := page.next_cursor):
+            return items
+
+
+def test_archive_moves_closed_periods(log_engine):
+    with log_engine.begin() as connection:
+        _audit(connection, datetime(2024, 8, 3), datetime(2024, 9, 1), datetime(2024, 9, 30, 23), NOW)
+        assert archive_closed_periods(connection, AUDIT, NOW, "month") == 3
+        assert [p.name for p in list_partitions(connection, AUDIT)] == ["audit_log_p202408", "audit_log_p202409"]
+        assert connection.execute(select(AuditLog.timestamp)).scalars().all() == [NOW]
+
+
+def test_ids_are_not_reused_after_the_base_table_empties(log_engine):
+    with log_engine.begin() as connection:
+        _audit(connection, datetime(2024, 9, 1), datetime(2024, 9, 2))
+        archive_closed_periods(connection, AUDIT, NOW, "month")
+        assert connection.scalar(select(AuditLog.id)) is None  # table de base vide
+        _audit(connection, NOW)
+
+        items = _walk(connection, limit=1)
+    assert [item["id"] for item in items] == [3, 2, 1]
+    assert [item["timestamp"] for item in items] == [NOW, datetime(2024, 9, 2), datetime(2024, 9, 1)]
+
+
+def test_keyset_page_spans_period_tables(log_engine):
+    moments = [datetime(2024, month, day) for month in (7, 8, 9, 10) for day in (1, 1, 2)]
+    with log_engine.begin() as connection:
+        _audit(connection, *moments)
+        archive_closed_periods(connection, AUDIT, NOW, "month")
+        items = _walk(connection, limit=4)
+
+    keys = [(item["timestamp"], item["id"]) for item in items]
+    assert len(keys) == len(moments) and keys == sorted(keys, reverse=True)
+
+
+def test_migration_switches_sqlite_log_tables_to_autoincrement(log_engine):
+    with log_engine.begin() as connection:
+        # Base en version 13 : table sans AUTOINCREMENT, lignes déjà archivées
+        connection.execute(text('DROP TABLE "audit_log"'))
+        partition_table(AUDIT, "audit_log").create(connection)
+        archived = partition_table(AUDIT, "audit_log_p202409")
+        archived.create(connection)
+        connection.execute(insert(archived), [{"id": 41, "action": "ancien", "timestamp": datetime(2024, 9, 5)}])
+        _stamp(connection, 13)
+
+    assert 14 in migrate(log_engine)
+    with log_engine.begin() as connection:
+        ddl = connection.scalar(text("SELECT sql FROM sqlite_master WHERE name = 'audit_log'"))
+        assert "AUTOINCREMENT" in ddl
+        _audit(connection, NOW)
+        assert connection.scalar(select(AuditLog.id)) == 42
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import select
+
+from models.user import Permission, Role, Utilisateur
+from services.permissions import compile_permissions, decode_mask, encode_mask
+
+
+@pytest.mark.parametrize("mask", [0, 1, 0b1011, 1 << 63, (1 << 200) - 1])
+def test_mask_round_trip(mask):
+    assert decode_mask(encode_mask(mask)) == mask
+
+
+def test_compiled_mask_allows_granted_permissions_only(db, dataset):
+    compiled = compile_permissions(db)
+    role_id = db.scalar(select(Utilisateur.role_id).where(Utilisateur.id == dataset["users"][0]["id"]))
+    mask = compiled.mask_for_roles([role_id])
+
+    assert compiled.allows(mask, "execution", "read")
+    assert not compiled.allows(mask, "execution", "inexistante")
+    assert not compiled.allows(0, "execution", "read")
+
+
+@pytest.fixture
+def reader(db, dataset):
+    """Utilisateur dont le rôle n'a que execution:read (même mot de passe que le jeu de données)."""
+    permission = db.scalar(select(Permission).where(Permission.resource == "execution", Permission.action == "read"))
+    role = Role(nom="Lecteur", code="LECTEUR", niveau_acces=1, permissions=[permission])
+    password = db.scalar(select(Utilisateur.motDePasse).where(Utilisateur.id == dataset["users"][0]["id"]))
+    user = Utilisateur(nom="Lecteur", email="lecteur@tests.local", motDePasse=password, role=role, actif=True)
+    db.add(user)
+    db.commit()
+    yield role
+    db.delete(user)
+    db.delete(role)
+    db.commit()
+
+
+def test_token_mask_and_revocation(client, dataset, db, reader):
+    token = client.post("/auth/sign_in", data={"username": "lecteur@tests.local",
+                                               "password": dataset["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/executions?limit=1", headers=headers).status_code == 200
+    assert client.get("/logs/audit?limit=1", headers=headers).status_code == 403
+
+    # Retrait de la permission : la version RBAC change, le masque du jeton n'est plus cru
+    reader.permissions.clear()
+    db.commit()
+    assert client.get("/executions?limit=1", headers=headers).status_code == 403
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# Sous-types de test importés via le module : pytest tenterait de collecter les classes Test*
+import models
+from models import CahierDeTests, Epic, Module, Projet, ScenarioTest, Sprint, UserStory, ValidationTest
+from services.project_tree import load_project_tree
+from services.query_diagnostics import query_budget
+
+# Une requête par niveau de l'arbre, quelle que soit sa taille
+TREE_QUERIES = 10
+
+
+def _seed_project(db, scale: int) -> int:
+    projet = Projet(nom=f"Arbre x{scale}")
+    sprint = Sprint(nom="Sprint 1", projet=projet)
+    for m in range(scale):
+        module = Module(nom=f"Module {m}", projet=projet)
+        for e in range(2):
+            epic = Epic(titre=f"Epic {m}.{e}", module=module)
+            for u in range(scale):
+                story = UserStory(titre=f"Story {m}.{e}.{u}", epic=epic, sprints=[sprint])
+                cahier = CahierDeTests(userstory=story, nombreTests=3)
+                for kind in (models.TestUnitaire, models.TestAutomatise, models.TestManuel):
+                    test = kind(nom=f"{kind.__name__} {m}.{e}.{u}", cahier=cahier)
+                    test.scenarios.append(ScenarioTest(nom="scénario"))
+                    test.validations.append(ValidationTest(statut="OK"))
+    db.add(projet)
+    db.commit()
+    return projet.id
+
+
+@pytest.fixture
+def isolated_engine(engine):
+    """Moteur dédié : les requêtes des threads de fond (journal d'audit…) ne sont pas comptées."""
+    isolated = create_engine(engine.url)
+    yield isolated
+    isolated.dispose()
+
+
+@pytest.mark.parametrize("scale", [1, 3, 6])
+def test_tree_loads_in_constant_queries(db, isolated_engine, scale):
+    projet_id = _seed_project(db, scale)
+
+    with Session(isolated_engine) as session, query_budget(TREE_QUERIES, engines=(isolated_engine,)) as trace:
+        tree = load_project_tree(session, projet_id)
+
+    assert trace.count == TREE_QUERIES
+    stories = [s for m in tree["modules"] for e in m["epics"] for s in e["userstories"]]
+    assert len(tree["modules"]) == scale
+    assert len(stories) == 2 * scale * scale
+    assert all(len(s["cahier_tests"]["tests"]) == 3 for s in stories)
+    assert all(len(t["scenarios"]) == 1 and len(t["validations"]) == 1
+               for s in stories for t in s["cahier_tests"]["tests"])
+
+
+def test_missing_project(db, engine):
+    assert load_project_tree(db, 10 ** 9) is None
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from services.query_diagnostics import QueryBudgetExceeded, assert_query_budget, normalize, query_budget
+
+
+@pytest.fixture
+def memory_engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_normalize_merges_literals_and_in_lists():
+    assert normalize("SELECT * FROM t WHERE a = 3 AND b = 'x'  AND c IN (1, 2, 3)") == \
+        normalize("SELECT * FROM t WHERE a = 42 AND b = 'yz' AND c IN (?, ?)")
+
+
+def test_budget_counts_queries(memory_engine):
+    with memory_engine.connect() as connection, query_budget(2, engines=(memory_engine,)) as trace:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+    assert trace.count == 2
+
+    with pytest.raises(QueryBudgetExceeded, match="3 requêtes SQL > budget 2"):
+        with memory_engine.connect() as connection, query_budget(2, engines=(memory_engine,)):
+            for i in range(3):
+                connection.execute(text(f"SELECT {i}"))
+
+
+def test_budget_flags_repeated_queries(memory_engine):
+    with pytest.raises(QueryBudgetExceeded, match="Requêtes répétées"):
+        with memory_engine.connect() as connection, \
+                query_budget(100, engines=(memory_engine,), repeat_threshold=5) as trace:
+            for i in range(5):  # N+1 : une requête par élément
+                connection.execute(text(f"SELECT {i} WHERE 1 = 1"))
+    assert trace.count == 5
+
+
+def test_route_budget(client, auth_headers):
+    response = assert_query_budget(client, "GET", "/auth/me", 5, headers=auth_headers)
+    assert response.status_code == 200
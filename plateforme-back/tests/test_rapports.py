@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine, func, literal, select, text
+
+from db.schema import MIGRATIONS, _stamp, migrate
+from models.rapports import IndicateurQualite, RapportQA
+from models.scrum import Sprint
+from services.ingestion import ingest_chunk
+from services.rapport_aggregation import check_consistency, ensure_rapports, rebuild
+from services.scope import test_sprint_pairs
+from services.statuts import classer_statut, sql_est_echoue, sql_est_reussi
+
+
+@pytest.mark.parametrize("statut", ["échoué", "Réussi", "succès", "ÉCHOUÉ", " passed ", "ko", "PASSED\n",
+                                    "pending", "faıl", ""])
+def test_python_and_sql_classification_agree(engine, statut):
+    with engine.connect() as connection:
+        reussi, echoue = connection.execute(select(sql_est_reussi(literal(statut)), sql_est_echoue(literal(statut)))).one()
+    assert classer_statut(statut) == ("REUSSI" if reussi else "ECHOUE" if echoue else None)
+
+
+def test_incremental_counters_match_recount(db, dataset):
+    test_id, sprint_id = db.execute(select(*test_sprint_pairs().subquery().c).limit(1)).one()
+    rebuild(db, [sprint_id])  # le jeu de données est inséré en masse, sans compteurs
+    db.commit()
+    items = [(i, {"test_id": test_id, "statut": statut, "dureeExecution": 1, "dateExecution": None,
+                  "executeurId": None, "resultat": {"statut": statut}})
+             for i, statut in enumerate(["réussi", "échoué", "PASSED", "en cours"])]
+    assert all("execution_id" in outcome for outcome in ingest_chunk(db, items))
+
+    assert check_consistency(db, [sprint_id]) == []
+
+
+def test_ensure_rapports_creates_one_report_per_sprint(db):
+    sprint = Sprint(nom="Sprint sans rapport")
+    db.add(sprint)
+    db.commit()
+
+    first = ensure_rapports(db.connection(), [sprint.id])
+    second = ensure_rapports(db.connection(), [sprint.id])
+    db.commit()
+
+    assert first == second
+    assert db.scalar(select(func.count()).where(RapportQA.sprintId == sprint.id)) == 1
+    assert db.scalar(select(func.count()).where(IndicateurQualite.rapportId == first[sprint.id])) == 1
+
+
+def test_migration_merges_duplicate_reports(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v12.db'}")
+    migrate(engine)
+    with engine.begin() as connection:
+        # Base en version 12, avec les doublons que l'absence d'index unique permettait
+        connection.execute(text("DROP INDEX ix_rapport_qa_sprint"))
+        connection.execute(text("DROP INDEX ix_indicateur_qualite_rapport"))
+        connection.execute(RapportQA.__table__.insert(), [{"id": 1, "sprintId": 7}, {"id": 2, "sprintId": 7}])
+        connection.execute(IndicateurQualite.__table__.insert(), [{"rapportId": 1}, {"rapportId": 2}, {"rapportId": 1}])
+        _stamp(connection, 12)
+
+    assert migrate(engine) == [m.version for m in MIGRATIONS if m.version > 12]
+    with engine.connect() as connection:
+        assert connection.execute(select(RapportQA.id)).scalars().all() == [1]
+        assert connection.execute(select(IndicateurQualite.rapportId)).scalars().all() == [1]
+    engine.dispose()
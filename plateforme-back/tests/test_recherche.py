@@ -0,0 +1,38 @@
+from services.recherche import _render_headline, highlight, parse_query
+
+PAYLOAD = 'Connexion <img src=x onerror="alert(1)"> refusée & <script>alert(2)</script>'
+
+
+def test_highlight_escapes_text_around_marks():
+    include, _ = parse_query("connexion")
+    excerpt = highlight(PAYLOAD, set(include))
+
+    assert excerpt.startswith("<mark>Connexion</mark>")
+    assert "<img" not in excerpt and "<script>" not in excerpt
+    assert "&lt;img src=x onerror=&quot;alert(1)&quot;&gt;" in excerpt
+    assert "&amp;" in excerpt
+
+
+def test_headline_sentinels_become_marks_after_escaping():
+    headline = "\x02Connexion\x03 <script>alert(2)</script> \x02refusée\x03"
+
+    assert _render_headline(headline) == (
+        "<mark>Connexion</mark> &lt;script&gt;alert(2)&lt;/script&gt; <mark>refusée</mark>"
+    )
+    assert _render_headline(None) is None
+
+
+def test_search_excerpt_is_escaped(client, auth_headers, db):
+    from models.scrum import UserStory
+
+    story = UserStory(titre="Connexion XSS", description=PAYLOAD)
+    db.add(story)
+    db.commit()
+    try:
+        response = client.get("/search", params={"q": "onerror", "types": "userstory"}, headers=auth_headers)
+        assert response.status_code == 200
+        excerpts = [item["extrait"] for item in response.json()["items"] if item["id"] == story.id]
+        assert excerpts and "<img" not in excerpts[0] and "<mark>onerror</mark>" in excerpts[0]
+    finally:
+        db.delete(story)
+        db.commit()
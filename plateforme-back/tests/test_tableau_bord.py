@@ -0,0 +1,28 @@
+from sqlalchemy import insert, select
+
+from db.associations import sprint_userstory
+from models.rapports import TableauDeBordSprint
+from models.scrum import Sprint, UserStory
+from services.tableau_bord import get_snapshot
+
+
+def _generation(db, sprint_id):
+    return db.scalar(select(TableauDeBordSprint.generation).where(TableauDeBordSprint.sprintId == sprint_id))
+
+
+def test_deleting_a_userstory_invalidates_its_sprint_snapshot(db, dataset):
+    sprint = Sprint(nom="Sprint suppression", statut="EN_COURS")
+    story = UserStory(titre="Story supprimée", statut="A_FAIRE")
+    db.add_all([sprint, story])
+    db.flush()
+    db.execute(insert(sprint_userstory).values(sprint_id=sprint.id, userstory_id=story.id))
+    db.commit()
+    assert get_snapshot(db, sprint.id) is not None
+    before = _generation(db, sprint.id)
+
+    # Relation `sprints` jamais chargée : le lien n'est connu qu'en base, supprimé par le flush
+    db.expire_all()
+    db.delete(db.get(UserStory, story.id))
+    db.commit()
+
+    assert _generation(db, sprint.id) == before + 1